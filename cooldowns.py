@@ -0,0 +1,168 @@
+from discord.ext import commands
+from cogs.utils import checks
+from cogs.utils.dataIO import dataIO
+from .jsonstore import load_json, save_json
+import asyncio
+import heapq
+import math
+import time
+import os
+
+PATH = "data/cooldowns/"
+COOLDOWNS = PATH + "cooldowns.json"
+# seconds between sweeps that drop expired cooldowns and write changed ones
+SAVE_INTERVAL = 5
+# in-memory fallback size that triggers a sweep of expired entries
+LOCAL_LIMIT = 1000
+
+# used while the Cooldowns cog isn't loaded, lost on restart
+local_cooldowns = {}
+
+
+class Cooldowns:
+    """Wall-clock cooldowns shared by every cog, kept across restarts.
+
+    A cooldown is a name ("economy.payday") and a string key ("server:user")
+    with an expiry time. Only running cooldowns are stored, expired ones are
+    swept out of an expiry-ordered heap. Changes are written at most once
+    per SAVE_INTERVAL, so start and clear never rewrite the file themselves.
+    Other cogs use the functions below, which fall back to in-memory
+    cooldowns when it isn't loaded."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        # name -> key -> expiry, what gets saved
+        self.expiries = {}
+        # (expiry, name, key), entries replaced by a later start are skipped when popped
+        self.heap = []
+        now = time.time()
+        self.dirty = False
+        for name, keys in load_json(bot, COOLDOWNS).items():
+            for key, expiry in keys.items():
+                if expiry > now:
+                    self.expiries.setdefault(name, {})[key] = expiry
+                    self.heap.append((expiry, name, key))
+        heapq.heapify(self.heap)
+        self.saver = bot.loop.create_task(self.save_loop())
+
+    def __unload(self):
+        self.saver.cancel()
+        save_json(self.bot, COOLDOWNS, self.expiries)
+
+    def start(self, name, key, seconds):
+        """Starts or restarts a cooldown, seconds <= 0 clears it."""
+        if seconds <= 0:
+            self.clear(name, key)
+            return
+        expiry = time.time() + seconds
+        self.expiries.setdefault(name, {})[key] = expiry
+        heapq.heappush(self.heap, (expiry, name, key))
+        # restarts leave stale entries behind, rebuild before they pile up
+        if len(self.heap) > 2 * self.running() + 64:
+            self.heap = [(expiry, name, key) for name, keys in self.expiries.items()
+                         for key, expiry in keys.items()]
+            heapq.heapify(self.heap)
+        self.dirty = True
+
+    def clear(self, name, key):
+        keys = self.expiries.get(name)
+        if keys and keys.pop(key, None) is not None:
+            if not keys:
+                del self.expiries[name]
+            self.dirty = True
+
+    def remaining(self, name, key):
+        """Whole seconds left on a cooldown, 0 once it has expired."""
+        expiry = self.expiries.get(name, {}).get(key)
+        if expiry is None:
+            return 0
+        return max(0, math.ceil(expiry - time.time()))
+
+    def running(self):
+        return sum(len(keys) for keys in self.expiries.values())
+
+    def prune(self):
+        now = time.time()
+        pruned = 0
+        while self.heap and self.heap[0][0] <= now:
+            expiry, name, key = heapq.heappop(self.heap)
+            keys = self.expiries.get(name)
+            if keys is not None and keys.get(key) == expiry:
+                del keys[key]
+                if not keys:
+                    del self.expiries[name]
+                pruned += 1
+        if pruned:
+            self.dirty = True
+        return pruned
+
+    async def save_loop(self):
+        try:
+            while True:
+                await asyncio.sleep(SAVE_INTERVAL)
+                self.prune()
+                if self.dirty:
+                    self.dirty = False
+                    save_json(self.bot, COOLDOWNS, self.expiries)
+        except asyncio.CancelledError:
+            pass
+
+    @checks.is_owner()
+    @commands.command()
+    async def cooldownstats(self):
+        """Shows running cooldowns by name."""
+        msg = "```\n"
+        msg += "Running:      {}\n".format(self.running())
+        msg += "Heap entries: {}\n".format(len(self.heap))
+        for name, keys in sorted(self.expiries.items()):
+            msg += "  {} - {}\n".format(name, len(keys))
+        msg += "```"
+        await self.bot.say(msg)
+
+
+def cooldown_remaining(bot, name, key):
+    """Whole seconds left on a cooldown, through the Cooldowns cog when it's loaded."""
+    cooldowns = bot.get_cog('Cooldowns')
+    if cooldowns is not None:
+        return cooldowns.remaining(name, key)
+    expiry = local_cooldowns.get((name, key), 0)
+    return max(0, math.ceil(expiry - time.time()))
+
+
+def start_cooldown(bot, name, key, seconds):
+    cooldowns = bot.get_cog('Cooldowns')
+    if cooldowns is not None:
+        cooldowns.start(name, key, seconds)
+        return
+    local_cooldowns[(name, key)] = time.time() + seconds
+    if len(local_cooldowns) > LOCAL_LIMIT:
+        now = time.time()
+        for entry, expiry in list(local_cooldowns.items()):
+            if expiry <= now:
+                del local_cooldowns[entry]
+
+
+def clear_cooldown(bot, name, key):
+    cooldowns = bot.get_cog('Cooldowns')
+    if cooldowns is not None:
+        cooldowns.clear(name, key)
+    else:
+        local_cooldowns.pop((name, key), None)
+
+
+def check_folders():
+    if not os.path.exists(PATH):
+        print("Creating %s folder..." % PATH)
+        os.makedirs(PATH)
+
+
+def check_files():
+    if not dataIO.is_valid_json(COOLDOWNS):
+        print("Creating empty cooldowns.json...")
+        dataIO.save_json(COOLDOWNS, {})
+
+
+def setup(bot):
+    check_folders()
+    check_files()
+    bot.add_cog(Cooldowns(bot))
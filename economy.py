@@ -1,22 +1,73 @@
 import discord
 from discord.ext import commands
 from cogs.utils.dataIO import dataIO
-from collections import namedtuple, defaultdict, deque
+from .cooldowns import cooldown_remaining, start_cooldown
+from collections import defaultdict, deque
 from datetime import datetime
-from copy import deepcopy
 from .utils import checks
 from cogs.utils.chat_formatting import pagify, box
 from enum import Enum
 from __main__ import send_cmd_help
 import os
-import time
 import logging
 import random
+import sqlite3
 
 default_settings = {"PAYDAY_TIME": 3600, "PAYDAY_CREDITS": 2000,
                     "SLOT_MIN": 100, "SLOT_MAX": 1500, "SLOT_TIME": 0,
                     "REGISTER_CREDITS": 500}
 
+BANK_PATH = "data/economy/bank.db"
+# the old bank, imported once when bank.db is first created
+LEGACY_BANK = "data/economy/bank.json"
+BANK_SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    server_id TEXT NOT NULL,
+    user_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    balance INTEGER NOT NULL,
+    created_at TEXT NOT NULL,
+    PRIMARY KEY (server_id, user_id)
+);
+CREATE INDEX IF NOT EXISTS accounts_balance ON accounts (server_id, balance DESC);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+CREATE TABLE IF NOT EXISTS legacy_accounts (
+    user_id TEXT PRIMARY KEY,
+    balance INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS accounts_user ON accounts (user_id, balance DESC);
+CREATE TABLE IF NOT EXISTS global_balances (
+    user_id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    total INTEGER NOT NULL,
+    best INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS global_total ON global_balances (total DESC);
+CREATE INDEX IF NOT EXISTS global_best ON global_balances (best DESC);
+CREATE TRIGGER IF NOT EXISTS global_insert AFTER INSERT ON accounts BEGIN
+    INSERT OR IGNORE INTO global_balances VALUES (NEW.user_id, NEW.name, 0, 0);
+    UPDATE global_balances SET name = NEW.name, total = total + NEW.balance,
+        best = MAX(best, NEW.balance) WHERE user_id = NEW.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS global_update AFTER UPDATE OF balance ON accounts BEGIN
+    UPDATE global_balances SET total = total + NEW.balance - OLD.balance,
+        best = (SELECT MAX(balance) FROM accounts WHERE user_id = NEW.user_id)
+        WHERE user_id = NEW.user_id;
+END;
+CREATE TRIGGER IF NOT EXISTS global_delete AFTER DELETE ON accounts BEGIN
+    DELETE FROM global_balances WHERE user_id = OLD.user_id AND NOT EXISTS
+        (SELECT 1 FROM accounts WHERE user_id = OLD.user_id);
+    UPDATE global_balances SET total = total - OLD.balance,
+        best = (SELECT MAX(balance) FROM accounts WHERE user_id = OLD.user_id)
+        WHERE user_id = OLD.user_id;
+END;
+"""
+# per-user aggregate the global leaderboard ranks by
+GLOBAL_MODES = {"sum": "total", "max": "best"}
+
 
 class EconomyError(Exception):
     pass
@@ -110,70 +161,151 @@ SLOT_PAYOUTS_MSG = ("Slot machine payouts:\n"
                     "Two symbols: Bet * 2".format(**SMReel.__dict__))
 
 
+class Account:
+    """A snapshot of one bank account. member and created_at are only
+    looked up when they are used."""
+
+    __slots__ = ("id", "name", "balance", "server", "_created_at", "_member")
+
+    def __init__(self, id, name, balance, created_at, server):
+        self.id = id
+        self.name = name
+        self.balance = balance
+        self.server = server
+        self._created_at = created_at
+        self._member = None
+
+    @property
+    def created_at(self):
+        if isinstance(self._created_at, str):
+            self._created_at = datetime.strptime(self._created_at,
+                                                 "%Y-%m-%d %H:%M:%S")
+        return self._created_at
+
+    @property
+    def member(self):
+        if self._member is None:
+            self._member = self.server.get_member(self.id)
+        return self._member
+
+    def __repr__(self):
+        return "<Account id={} server={} balance={}>".format(
+            self.id, self.server.id, self.balance)
+
+
 class Bank:
+    """Accounts live in an SQLite database, one row per account.
+
+    Every change is a single UPDATE, so nothing rewrites the whole bank and
+    leaderboards read the top rows straight from the balance index."""
 
     def __init__(self, bot, file_path):
-        self.accounts = dataIO.load_json(file_path)
         self.bot = bot
+        # (server id, user id) -> balance, filled by reads and dropped by writes
+        self.balances = {}
+        self.db = sqlite3.connect(file_path)
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.executescript(BANK_SCHEMA)
+        migrated = self.db.execute("SELECT 1 FROM meta WHERE key = 'migrated'").fetchone()
+        if migrated is None and os.path.exists(LEGACY_BANK):
+            self._migrate(LEGACY_BANK)
+        if self.db.execute("SELECT NOT EXISTS (SELECT 1 FROM global_balances)"
+                             " AND EXISTS (SELECT 1 FROM accounts)").fetchone()[0]:
+            self._rebuild_global()
+
+    def close(self):
+        self.db.close()
+
+    # retried on every start until the meta row commits with the accounts
+    def _migrate(self, path):
+        raw = dataIO.load_json(path)
+        now = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
+        accounts = []
+        legacy = []
+        skipped = 0
+        for key, value in raw.items():
+            if not isinstance(value, dict):
+                skipped += 1
+            elif "balance" in value:  # Legacy account, keyed by user id only
+                legacy.append((key, value["balance"]))
+            else:
+                for user_id, acc in value.items():
+                    if not isinstance(acc, dict) or "balance" not in acc:
+                        skipped += 1
+                        continue
+                    accounts.append((key, user_id, acc.get("name", ""),
+                                     acc["balance"], acc.get("created_at", now)))
+        # accounts opened since an earlier failed attempt are kept
+        with self.db:
+            self.db.executemany("INSERT OR IGNORE INTO accounts VALUES "
+                                "(?, ?, ?, ?, ?)", accounts)
+            self.db.executemany("INSERT OR IGNORE INTO legacy_accounts "
+                                "VALUES (?, ?)", legacy)
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES ('migrated', ?)",
+                            (now,))
+        print("Migrated {} bank accounts from {}, skipped {} malformed entries"
+              "".format(len(accounts), path, skipped))
+        try:
+            os.rename(path, path + ".migrated")
+        except OSError as e:
+            print("Couldn't rename {}, it won't be imported again: {}".format(path, e))
+
+    def _rebuild_global(self):
+        # banks created before the aggregate existed, triggers keep it current after this
+        with self.db:
+            self.db.execute("DELETE FROM global_balances")
+            self.db.execute("INSERT INTO global_balances SELECT user_id, "
+                            "MAX(name), SUM(balance), MAX(balance) "
+                            "FROM accounts GROUP BY user_id")
 
     def create_account(self, user, *, initial_balance=0):
         server = user.server
         if not self.account_exists(user):
-            if server.id not in self.accounts:
-                self.accounts[server.id] = {}
-            if user.id in self.accounts:  # Legacy account
-                balance = self.accounts[user.id]["balance"]
+            row = self.db.execute("SELECT balance FROM legacy_accounts "
+                                  "WHERE user_id = ?", (user.id,)).fetchone()
+            if row is not None:  # Legacy account
+                balance = row[0]
             else:
                 balance = initial_balance
             timestamp = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
-            account = {"name": user.name,
-                       "balance": balance,
-                       "created_at": timestamp
-                       }
-            self.accounts[server.id][user.id] = account
-            self._save_bank()
+            with self.db:
+                self.db.execute("INSERT INTO accounts VALUES (?, ?, ?, ?, ?)",
+                                (server.id, user.id, user.name, balance,
+                                 timestamp))
             return self.get_account(user)
         else:
             raise AccountAlreadyExists()
 
     def account_exists(self, user):
         try:
-            self._get_account(user)
+            self._get_balance(user)
         except NoAccount:
             return False
         return True
 
     def withdraw_credits(self, user, amount):
-        server = user.server
-
         if amount < 0:
             raise NegativeValue()
-
-        account = self._get_account(user)
-        if account["balance"] >= amount:
-            account["balance"] -= amount
-            self.accounts[server.id][user.id] = account
-            self._save_bank()
-        else:
-            raise InsufficientBalance()
+        with self.db:
+            self._withdraw(user, amount)
 
     def deposit_credits(self, user, amount):
-        server = user.server
         if amount < 0:
             raise NegativeValue()
-        account = self._get_account(user)
-        account["balance"] += amount
-        self.accounts[server.id][user.id] = account
-        self._save_bank()
+        with self.db:
+            self._deposit(user, amount)
 
     def set_credits(self, user, amount):
-        server = user.server
         if amount < 0:
             raise NegativeValue()
-        account = self._get_account(user)
-        account["balance"] = amount
-        self.accounts[server.id][user.id] = account
-        self._save_bank()
+        self.balances.pop((user.server.id, user.id), None)
+        with self.db:
+            cur = self.db.execute("UPDATE accounts SET balance = ? "
+                                  "WHERE server_id = ? AND user_id = ?",
+                                  (amount, user.server.id, user.id))
+            if cur.rowcount == 0:
+                raise NoAccount()
 
     def transfer_credits(self, sender, receiver, amount):
         if amount < 0:
@@ -181,81 +313,107 @@ class Bank:
         if sender is receiver:
             raise SameSenderAndReceiver()
         if self.account_exists(sender) and self.account_exists(receiver):
-            sender_acc = self._get_account(sender)
-            if sender_acc["balance"] < amount:
-                raise InsufficientBalance()
-            self.withdraw_credits(sender, amount)
-            self.deposit_credits(receiver, amount)
+            # both updates commit together or not at all
+            with self.db:
+                self._withdraw(sender, amount)
+                self._deposit(receiver, amount)
         else:
             raise NoAccount()
 
+    def _withdraw(self, user, amount):
+        self.balances.pop((user.server.id, user.id), None)
+        cur = self.db.execute("UPDATE accounts SET balance = balance - ? "
+                              "WHERE server_id = ? AND user_id = ? "
+                              "AND balance >= ?",
+                              (amount, user.server.id, user.id, amount))
+        if cur.rowcount == 0:
+            self._get_balance(user)
+            raise InsufficientBalance()
+
+    def _deposit(self, user, amount):
+        self.balances.pop((user.server.id, user.id), None)
+        cur = self.db.execute("UPDATE accounts SET balance = balance + ? "
+                              "WHERE server_id = ? AND user_id = ?",
+                              (amount, user.server.id, user.id))
+        if cur.rowcount == 0:
+            raise NoAccount()
+
     def can_spend(self, user, amount):
-        account = self._get_account(user)
-        if account["balance"] >= amount:
-            return True
-        else:
-            return False
+        return self._get_balance(user) >= amount
 
     def wipe_bank(self, server):
-        self.accounts[server.id] = {}
-        self._save_bank()
+        self.balances.clear()
+        with self.db:
+            self.db.execute("DELETE FROM accounts WHERE server_id = ?",
+                            (server.id,))
 
     def get_server_accounts(self, server):
-        if server.id in self.accounts:
-            raw_server_accounts = deepcopy(self.accounts[server.id])
-            accounts = []
-            for k, v in raw_server_accounts.items():
-                v["id"] = k
-                v["server"] = server
-                acc = self._create_account_obj(v)
-                accounts.append(acc)
-            return accounts
-        else:
-            return []
+        return self.get_top_accounts(server, -1)
+
+    def get_top_accounts(self, server, top):
+        """The server's accounts richest first, only the first top rows are
+        read (-1 for all of them)."""
+        rows = self.db.execute("SELECT user_id, name, balance, created_at "
+                               "FROM accounts WHERE server_id = ? "
+                               "ORDER BY balance DESC LIMIT ?",
+                               (server.id, top))
+        return [Account(*row, server=server) for row in rows]
+
+    def get_global_top(self, top, mode="sum"):
+        """(user id, name, credits) for the top users across every server,
+        credits being the sum or the max of their balances."""
+        column = GLOBAL_MODES[mode]
+        return self.db.execute("SELECT user_id, name, {0} FROM global_balances "
+                               "ORDER BY {0} DESC LIMIT ?".format(column),
+                               (top,)).fetchall()
+
+    def get_meta(self, key, default=None):
+        """Bank-wide settings and bookkeeping that don't belong to a server."""
+        row = self.db.execute("SELECT value FROM meta WHERE key = ?",
+                              (key,)).fetchone()
+        return default if row is None else row[0]
+
+    def set_meta(self, key, value):
+        with self.db:
+            self.db.execute("INSERT OR REPLACE INTO meta VALUES (?, ?)",
+                            (key, value))
 
     def get_all_accounts(self):
         accounts = []
-        for server_id, v in self.accounts.items():
-            server = self.bot.get_server(server_id)
+        rows = self.db.execute("SELECT server_id, user_id, name, balance, "
+                               "created_at FROM accounts")
+        for row in rows:
+            server = self.bot.get_server(row[0])
             if server is None:
                 # Servers that have since been left will be ignored
-                # Same for users_id from the old bank format
                 continue
-            raw_server_accounts = deepcopy(self.accounts[server.id])
-            for k, v in raw_server_accounts.items():
-                v["id"] = k
-                v["server"] = server
-                acc = self._create_account_obj(v)
-                accounts.append(acc)
+            accounts.append(Account(*row[1:], server=server))
         return accounts
 
     def get_balance(self, user):
-        account = self._get_account(user)
-        return account["balance"]
+        return self._get_balance(user)
 
     def get_account(self, user):
-        acc = self._get_account(user)
-        acc["id"] = user.id
-        acc["server"] = user.server
-        return self._create_account_obj(acc)
-
-    def _create_account_obj(self, account):
-        account["member"] = account["server"].get_member(account["id"])
-        account["created_at"] = datetime.strptime(account["created_at"],
-                                                  "%Y-%m-%d %H:%M:%S")
-        Account = namedtuple("Account", "id name balance "
-                             "created_at server member")
-        return Account(**account)
-
-    def _save_bank(self):
-        dataIO.save_json("data/economy/bank.json", self.accounts)
-
-    def _get_account(self, user):
-        server = user.server
+        row = self.db.execute("SELECT name, balance, created_at FROM accounts "
+                              "WHERE server_id = ? AND user_id = ?",
+                              (user.server.id, user.id)).fetchone()
+        if row is None:
+            raise NoAccount()
+        return Account(user.id, *row, server=user.server)
+
+    def _get_balance(self, user):
+        key = (user.server.id, user.id)
         try:
-            return deepcopy(self.accounts[server.id][user.id])
+            return self.balances[key]
         except KeyError:
+            pass
+        row = self.db.execute("SELECT balance FROM accounts "
+                              "WHERE server_id = ? AND user_id = ?",
+                              key).fetchone()
+        if row is None:
             raise NoAccount()
+        self.balances[key] = row[0]
+        return row[0]
 
 
 class SetParser:
@@ -288,15 +446,22 @@ class Economy:
     def __init__(self, bot):
         global default_settings
         self.bot = bot
-        self.bank = Bank(bot, "data/economy/bank.json")
+        self.bank = Bank(bot, BANK_PATH)
         self.file_path = "data/economy/settings.json"
         self.settings = dataIO.load_json(self.file_path)
         if "PAYDAY_TIME" in self.settings:  # old format
             default_settings = self.settings
             self.settings = {}
+        # settings only holds servers, the global mode lives in the bank
+        if "GLOBAL_LEADERBOARD" in self.settings:
+            mode = self.settings.pop("GLOBAL_LEADERBOARD")
+            if self.bank.get_meta("global_leaderboard") is None:
+                self.bank.set_meta("global_leaderboard", mode)
+            dataIO.save_json(self.file_path, self.settings)
         self.settings = defaultdict(lambda: default_settings, self.settings)
-        self.payday_register = defaultdict(dict)
-        self.slot_register = defaultdict(dict)
+
+    def __unload(self):
+        self.bank.close()
 
     @commands.group(name="bank", pass_context=True)
     async def _bank(self, ctx):
@@ -418,33 +583,23 @@ class Economy:
         server = author.server
         id = author.id
         if self.bank.account_exists(author):
-            if id in self.payday_register[server.id]:
-                seconds = abs(self.payday_register[server.id][
-                              id] - int(time.perf_counter()))
-                if seconds >= self.settings[server.id]["PAYDAY_TIME"]:
-                    self.bank.deposit_credits(author, self.settings[
-                                              server.id]["PAYDAY_CREDITS"])
-                    self.payday_register[server.id][
-                        id] = int(time.perf_counter())
-                    await self.bot.say(
-                        "{} Here, take some credits. Enjoy! (+{}"
-                        " credits!)".format(
-                            author.mention,
-                            str(self.settings[server.id]["PAYDAY_CREDITS"])))
-                else:
-                    dtime = self.display_time(
-                        self.settings[server.id]["PAYDAY_TIME"] - seconds)
-                    await self.bot.say(
-                        "{} Too soon. For your next payday you have to"
-                        " wait {}.".format(author.mention, dtime))
-            else:
-                self.payday_register[server.id][id] = int(time.perf_counter())
+            key = "{}:{}".format(server.id, id)
+            seconds = cooldown_remaining(self.bot, "economy.payday", key)
+            if not seconds:
                 self.bank.deposit_credits(author, self.settings[
                                           server.id]["PAYDAY_CREDITS"])
+                start_cooldown(self.bot, "economy.payday", key,
+                                    self.settings[server.id]["PAYDAY_TIME"])
                 await self.bot.say(
-                    "{} Here, take some credits. Enjoy! (+{} credits!)".format(
+                    "{} Here, take some credits. Enjoy! (+{}"
+                    " credits!)".format(
                         author.mention,
                         str(self.settings[server.id]["PAYDAY_CREDITS"])))
+            else:
+                dtime = self.display_time(seconds)
+                await self.bot.say(
+                    "{} Too soon. For your next payday you have to"
+                    " wait {}.".format(author.mention, dtime))
         else:
             await self.bot.say("{} You need an account to receive credits."
                                " Type `{}bank register` to open one.".format(
@@ -486,11 +641,9 @@ class Economy:
         server = ctx.message.server
         if top < 1:
             top = 10
-        bank_sorted = sorted(self.bank.get_server_accounts(server),
-                             key=lambda x: x.balance, reverse=True)
-        if len(bank_sorted) < top:
-            top = len(bank_sorted)
-        topten = bank_sorted[:top]
+        topten = self.bank.get_top_accounts(server, top)
+        if len(topten) < top:
+            top = len(topten)
         highscore = ""
         place = 1
         for acc in topten:
@@ -504,41 +657,29 @@ class Economy:
         else:
             await self.bot.say("There are no accounts in the bank.")
 
-    #@leaderboard.command(name="global")
-    #async def _global_leaderboard(self, top: int=10):
-        #"""Prints out the global leaderboard
-
-        #Defaults to top 10"""
-        #if top < 1:
-            #top = 10
-        #bank_sorted = sorted(self.bank.get_all_accounts(),
-                             #key=lambda x: x.balance, reverse=True)
-        #unique_accounts = []
-        #for acc in bank_sorted:
-            #if not self.already_in_list(unique_accounts, acc):
-                #unique_accounts.append(acc)
-        #if len(unique_accounts) < top:
-            #top = len(unique_accounts)
-        #topten = unique_accounts[:top]
-        #highscore = ""
-        #place = 1
-        #for acc in topten:
-            #highscore += str(place).ljust(len(str(top)) + 1)
-            #highscore += ("{} |{}| ".format(acc.name, acc.server.name)
-                          #).ljust(23 - len(str(acc.balance)))
-            #highscore += str(acc.balance) + "\n"
-            #place += 1
-        #if highscore != "":
-            #for page in pagify(highscore, shorten_by=12):
-                #await self.bot.say(box(page, lang="py"))
-        #else:
-            #await self.bot.say("There are no accounts in the bank.")
-
-    #def already_in_list(self, accounts, user):
-        #for acc in accounts:
-            #if user.id == acc.id:
-                #return True
-        #return False
+    @leaderboard.command(name="global")
+    async def _global_leaderboard(self, top: int=10):
+        """Prints out the global leaderboard
+
+        Defaults to top 10"""
+        if top < 1:
+            top = 10
+        mode = self.bank.get_meta("global_leaderboard", "sum")
+        topten = self.bank.get_global_top(top, mode)
+        if len(topten) < top:
+            top = len(topten)
+        highscore = ""
+        place = 1
+        for user_id, name, credits in topten:
+            highscore += str(place).ljust(len(str(top)) + 1)
+            highscore += (name + " ").ljust(23 - len(str(credits)))
+            highscore += str(credits) + "\n"
+            place += 1
+        if highscore != "":
+            for page in pagify(highscore, shorten_by=12):
+                await self.bot.say(box(page, lang="py"))
+        else:
+            await self.bot.say("There are no accounts in the bank.")
 
     @commands.command()
     async def payouts(self):
@@ -553,16 +694,14 @@ class Economy:
         settings = self.settings[server.id]
         valid_bid = settings["SLOT_MIN"] <= bid and bid <= settings["SLOT_MAX"]
         slot_time = settings["SLOT_TIME"]
-        last_slot = self.slot_register.get(author.id)
-        now = datetime.utcnow()
         try:
-            if last_slot:
-                if (now - last_slot).seconds < slot_time:
-                    raise OnCooldown()
+            if cooldown_remaining(self.bot, "economy.slot", author.id):
+                raise OnCooldown()
             if not valid_bid:
                 raise InvalidBid()
             if not self.bank.can_spend(author, bid):
                 raise InsufficientBalance
+            start_cooldown(self.bot, "economy.slot", author.id, slot_time)
             await self.slot_machine(author, bid)
         except NoAccount:
             await self.bot.say("{} You need an account to use the slot "
@@ -582,7 +721,6 @@ class Economy:
     async def slot_machine(self, author, bid):
         default_reel = deque(SMReel)
         reels = []
-        self.slot_register[author.id] = datetime.utcnow()
         for i in range(3):
             default_reel.rotate(random.randint(-999, 999)) # weeeeee
             new_reel = deque(default_reel, maxlen=3) # we need only 3 symbols
@@ -696,6 +834,21 @@ class Economy:
                            "".format(credits))
         dataIO.save_json(self.file_path, self.settings)
 
+    @economyset.command(name="globalmode")
+    @checks.is_owner()
+    async def _globalmode(self, mode: str):
+        """How the global leaderboard ranks users across servers
+
+        sum - all of their balances added up
+        max - their richest account"""
+        mode = mode.lower()
+        if mode not in GLOBAL_MODES:
+            await self.bot.say("Mode must be sum or max.")
+            return
+        self.bank.set_meta("global_leaderboard", mode)
+        await self.bot.say("The global leaderboard now ranks by the {} of "
+                           "each user's balances.".format(mode))
+
     # What would I ever do without stackoverflow?
     def display_time(self, seconds, granularity=2):
         intervals = (  # Source: http://stackoverflow.com/a/24542445
@@ -731,11 +884,6 @@ def check_files():
         print("Creating default economy's settings.json...")
         dataIO.save_json(f, {})
 
-    f = "data/economy/bank.json"
-    if not dataIO.is_valid_json(f):
-        print("Creating empty bank.json...")
-        dataIO.save_json(f, {})
-
 
 def setup(bot):
     global logger
@@ -1,4 +1,5 @@
 from .utils.dataIO import fileIO
+from .jsonstore import load_json, save_json
 from .utils import checks
 from __main__ import send_cmd_help
 from __main__ import settings as bot_settings
@@ -40,10 +41,10 @@ class FourInARow:
 
     def __init__(self, bot):
         self.bot = bot
-        self.game = fileIO(GAMES, "load")
-        self.settings = fileIO(SETTINGS, "load")
-        self.players = fileIO(PLAYERS, "load")
-        self.stats = fileIO(STATS, "load")
+        self.game = load_json(self.bot, GAMES)
+        self.settings = load_json(self.bot, SETTINGS)
+        self.players = load_json(self.bot, PLAYERS)
+        self.stats = load_json(self.bot, STATS)
         self.BOARD_HEADER = self.settings["BOARD_HEADER"]
         self.ICONS = self.settings["ICONS"]
         self.TOKENS = self.settings["TOKENS"]
@@ -93,7 +94,7 @@ class FourInARow:
                                                                                         "lastActivity": now, 
                                                                                         "botDifficulty": self.settings["BOT_SETTINGS"]["DEFAULT_DIFFICULTY"], 
                                                                                         "winner": "unknown"}
-                fileIO(GAMES, "save", self.game)
+                save_json(self.bot, GAMES, self.game)
                 joinData = await self.join_game(ctx, user)# returns {"delMsg": bool, "showMsg": bool, "drawBoard": bool, "msg": str}
                 if joinData["delMsg"]:
                     await self.delete_message(ctx)
@@ -161,13 +162,13 @@ class FourInARow:
                     if differenceStarted >= gameExpires:
                         await self.stop_game(ctx)
                         self.stats["gamesTimedOut"] += 1
-                        fileIO(STATS, "save", self.stats)
+                        save_json(self.bot, STATS, self.stats)
                         await self.bot.say("{} ` Game stopped`".format(user.mention))
                         return
                     elif activePlayers <= 1: # If for any reason one player is left behind in an active game, allow a stop.
                         await self.stop_game(ctx)
                         self.stats["gamesStopped"] += 1
-                        fileIO(STATS, "save", self.stats)
+                        save_json(self.bot, STATS, self.stats)
                         await self.bot.say("{} ` Game stopped`".format(user.mention))
                         return
                     else:# Not expired yet so check unlock votes.
@@ -179,7 +180,7 @@ class FourInARow:
                             await self.draw_board(ctx, "\n` Votes to stop this game: {}/{}`".format(CH_VOTES_STP["votes"], minVotesToUnlock))
                             # Save vote.
                             self.game["CHANNELS"][ctx.message.channel.id]["VOTES_STP"] = CH_VOTES_STP
-                            fileIO(GAMES, "save", self.game)
+                            save_json(self.bot, GAMES, self.game)
                         # Game is locked for vote?
                         elif differenceLastActivity < gameVoteUnlocks:
                             timeLeft = gameVoteUnlocks-differenceLastActivity
@@ -197,7 +198,7 @@ class FourInARow:
                             await self.stop_game(ctx)
                             #await self.delete_message(ctx)
                             self.stats["gamesUnlocked"] += 1
-                            fileIO(STATS, "save", self.stats)
+                            save_json(self.bot, STATS, self.stats)
                             await self.bot.say("` Game stopped\nWell done {}, you ruined the game...`".format(user))
                 else: # user.id in CH_VOTES_STP["voteIds"]:
                     await self.bot.say( "{} ` You already voted.`".format(user.mention))         
@@ -251,8 +252,8 @@ class FourInARow:
                 self.stats["gamesRuined"] += 1
                 self.players["PLAYERS"][user.id]["STATS"]["wasted"] += 1
                 self.players["PLAYERS"][user.id]["STATS"]["points"] += self.settings["REWARDS"]["RUIENING"]
-                fileIO(PLAYERS, "save", self.players)
-                fileIO(STATS, "save", self.stats)
+                save_json(self.bot, PLAYERS, self.players)
+                save_json(self.bot, STATS, self.stats)
                 await self.stop_game(ctx)
         else:
             await self.bot.say("{} ` No game to leave from...`".format(user.mention))
@@ -434,7 +435,7 @@ class FourInARow:
                                         self.game["CHANNELS"][ctx.message.channel.id]["winner"] = user.id# Needed for update_score.
                                         await self.update_score(ctx)# Update score of all players.
                                         stopGame = True
-                                fileIO(GAMES, "save", self.game)
+                                save_json(self.bot, GAMES, self.game)
                             await self.delete_message(ctx)
                             await self.draw_board(ctx, comment)
                             # If game needs to be stopped by above conditions.
@@ -574,7 +575,7 @@ class FourInARow:
             self.settings["MAX_PLAYERS"] = maxp
             await self.bot.say("{} ` The maximum amount of players in game is now {}. `".format(user.mention, str(maxp)))
             logger.info("{}({}) has set MAX_PLAYERS = {}".format(user, user.id, str(maxp)))
-            fileIO(SETTINGS, "save", self.settings)
+            save_json(self.bot, SETTINGS, self.settings)
         else:
             await self.bot.say("{} ` Game is limited to 4 players max. `".format(user.mention))
 
@@ -589,7 +590,7 @@ class FourInARow:
         self.settings["EXPIRE_TIME"] = expireTime
         await self.bot.say("{} ` Game expires after {} seconds.`".format(user.mention, str(expireTime)))
         logger.info("{}({}) has set EXPIRE_TIME = {}".format(user, user.id, str(expireTime)))
-        fileIO(SETTINGS, "save", self.settings)
+        save_json(self.bot, SETTINGS, self.settings)
 
     @_4row.command(name="unlocktime", pass_context=True)
     @checks.admin_or_permissions(manage_server=True)
@@ -602,7 +603,7 @@ class FourInARow:
         self.settings["VOTE_UNLOCK_TIME"] = unlockTime
         await self.bot.say("{} ` Game voting unlocks at {} seconds.`".format(user.mention, str(unlockTime)))
         logger.info("{}({}) has set VOTE_UNLOCK_TIME = {}".format(user, user.id, str(unlockTime)))
-        fileIO(SETTINGS, "save", self.settings)
+        save_json(self.bot, SETTINGS, self.settings)
 
     @_4row.command(name="unlockvotes", pass_context=True)
     @checks.admin_or_permissions(manage_server=True)
@@ -613,7 +614,7 @@ class FourInARow:
         self.settings["MIN_VOTES_TO_UNLOCK"] = minVotes
         await self.bot.say("{} ` Game now stops after {} votes.`".format(user.mention, str(minVotes)))
         logger.info("{}({}) has set MIN_VOTES_TO_UNLOCK = {}".format(user, user.id, str(minVotes)))              
-        fileIO(SETTINGS, "save", self.settings)
+        save_json(self.bot, SETTINGS, self.settings)
 
     @_4row.command(name="togglebot", pass_context=True)
     @checks.admin_or_permissions(manage_server=True)
@@ -630,7 +631,7 @@ class FourInARow:
             await self.bot.say("`Work in progress. Be aware that enabling and using this may cause strange behaviour`")#deleteme
         await self.bot.say("{} ` The in-game bot is now: {}.`".format(user.mention, allowBot))
         logger.info("{}({}) has {} the in-game bot.".format(user, user.id, allowBot.upper()))
-        fileIO(SETTINGS, "save", self.settings)
+        save_json(self.bot, SETTINGS, self.settings)
 
     @_4row.command(name="toggleqmsg", pass_context=True)
     @checks.admin_or_permissions(manage_server=True)
@@ -646,7 +647,7 @@ class FourInARow:
             allowMsg = "Enabled"
         await self.bot.say("{} ` The in-game user comments are now: {}.`".format(user.mention, allowMsg))
         logger.info("{}({}) has {} the in-game user comments.".format(user, user.id, allowMsg.upper()))     
-        fileIO(SETTINGS, "save", self.settings)
+        save_json(self.bot, SETTINGS, self.settings)
 
     @_4row.command(name="botdifficulty", pass_context=True)
     @checks.admin_or_permissions(manage_server=True)
@@ -664,10 +665,10 @@ class FourInARow:
             self.settings["BOT_SETTINGS"]["DEFAULT_DIFFICULTY"] = difficultySet
             await self.bot.say("{} ` Game bot difficulty is now {}.`".format(user.mention, difficulty))
             logger.info("{}({}) has set DEFAULT_DIFFICULTY = {}".format(user, user.id, str(difficulty)))
-            fileIO(SETTINGS, "save", self.settings)
+            save_json(self.bot, SETTINGS, self.settings)
         else:
             await self.bot.say("{} ` Choose between EASY, NOVICE , HARD.`")
-        fileIO(SETTINGS, "save", self.settings)
+        save_json(self.bot, SETTINGS, self.settings)
 
     @_4row.command(name="backup", pass_context=True)
     @checks.admin_or_permissions(manage_server=True)
@@ -707,16 +708,16 @@ class FourInARow:
                 response = await self.bot.wait_for_message(author=ctx.message.author)
                 if response.content.lower().strip() == "yes":
                     logger.info("Restoring players.json ...")
-                    backup = fileIO(BACKUP, "load")
-                    fileIO(PLAYERS, "save", backup)
+                    self.players = fileIO(BACKUP, "load")
+                    save_json(self.bot, PLAYERS, self.players)
                     await self.bot.say("{} ` Backup restored.`".format(user.mention))
                     logger.info("{}({}) Has RESTORED the backup ({})".format(user, user.id, BACKUP))
                 else:
                     await self.bot.say("` Restore cancled.`")
             else:
                 logger.info("Restoring players.json ...")
-                backup = fileIO(BACKUP, "load")
-                fileIO(PLAYERS, "save", backup)
+                self.players = fileIO(BACKUP, "load")
+                save_json(self.bot, PLAYERS, self.players)
                 await self.bot.say("{} ` Backup restored.`".format(user.mention))
                 logger.info("{}({}) Has RESTORED the backup ({})".format(user, user.id, BACKUP))        
 
@@ -781,7 +782,7 @@ class FourInARow:
                                                             "playerName": user.name, 
                                                             "MSG": {"playerMsg": playerMsg, "victoryMsg": victoryMsg, "joiningMsg": joiningMsg}, 
                                                             "STATS": {"won": 0, "loss": 0, "draw": 0, "wasted": 0, "totalMoves": 0, "points" : 10,"averageTimeTurn": 0, "avarageTimeGame": 0}}
-        fileIO(PLAYERS, "save", self.players)
+        save_json(self.bot, PLAYERS, self.players)
         if user == ctx.message.server.me:
             logger.info("Four in a row bot account created by channel: {}".format(ctx.message.channel.id))
         else:
@@ -813,7 +814,7 @@ class FourInARow:
                         if user.id != ctx.message.server.me: # Escape bot.
                            self.players["PLAYERS"][user.id]["MSG"]["playerMsg"] = "nomsg"
                         self.game["CHANNELS"][ctx.message.channel.id]["PLAYERS"] = CH_PLAYERS
-                        fileIO(GAMES, "save", self.game)
+                        save_json(self.bot, GAMES, self.game)
                         # User is now a part of total players.
                         activePlayers += 1
                         self.game["CHANNELS"][ctx.message.channel.id]["activePlayers"] = activePlayers
@@ -836,8 +837,8 @@ class FourInARow:
                             self.game["CHANNELS"][ctx.message.channel.id]["board"] = self.empty_board(0)
                         await self.reset_voting(ctx)
                         # Save it all.
-                        fileIO(GAMES, "save", self.game)
-                        fileIO(PLAYERS, "save", self.players)
+                        save_json(self.bot, GAMES, self.game)
+                        save_json(self.bot, PLAYERS, self.players)
                         # Output msg.
                         if activePlayers <= 1:
                             msg = ("\n` I need at least one more player. \nType: '{}4row join' to join this game...`\n{}".format(self.PREFIXES[0], msg))
@@ -914,8 +915,8 @@ class FourInARow:
                             break
                     break        
                 break
-        fileIO(PLAYERS, "save", self.players)
-        fileIO(GAMES, "save", self.game)
+        save_json(self.bot, PLAYERS, self.players)
+        save_json(self.bot, GAMES, self.game)
         inGameIds = len(self.game["CHANNELS"][ctx.message.channel.id]["turnIds"])
         # Check amount of users in still in-game.
         stopGame = False
@@ -944,8 +945,8 @@ class FourInARow:
         self.game["CHANNELS"][ctx.message.channel.id]["inQue"] = 'no'
         await self.reset_voting(ctx)
         self.stats["gamesStarted"] += 1
-        fileIO(STATS, "save", self.stats)         
-        fileIO(GAMES, "save", self.game)
+        save_json(self.bot, STATS, self.stats)         
+        save_json(self.bot, GAMES, self.game)
 
     # Stop the game.
     async def stop_game(self, ctx):
@@ -961,13 +962,13 @@ class FourInARow:
         try:
             del self.game["CHANNELS"][ctx.message.channel.id]
             self.stats["gamesStopped"] += 1
-            fileIO(STATS, "save", self.stats)
+            save_json(self.bot, STATS, self.stats)
         except Exception as e:
             logger.info(e)
             logger.info("Error deleting {} from games. It seems that this game is already deleted elsewhere, check code and JSON)".format(ctx.message.channel.id))
             await self.dump_data()
-        fileIO(GAMES, "save", self.game)
-        fileIO(PLAYERS, "save", self.players)
+        save_json(self.bot, GAMES, self.game)
+        save_json(self.bot, PLAYERS, self.players)
 
     # Reset/update these after changes.
     async def reset_voting(self, ctx):
@@ -975,7 +976,7 @@ class FourInARow:
         self.game["CHANNELS"][ctx.message.channel.id]["lastActivity"] =  now 
         self.game["CHANNELS"][ctx.message.channel.id]["VOTES_STP"]["votes"] = 0
         self.game["CHANNELS"][ctx.message.channel.id]["VOTES_STP"]["voteIds"] = []
-        fileIO(GAMES, "save", self.game)
+        save_json(self.bot, GAMES, self.game)
 
     # Returns avaiable tokens in message format.
     async def msg_available_tokens(self):
@@ -1054,15 +1055,15 @@ class FourInARow:
                 msg = ("\n\n{}`Your preferred token is: {}` {}\n`Since you are in game, it wil be available next game`"
                             .format(user.mention, self.TOKENS[newToken][0], self.TOKENS[newToken][1]))
             # Save it all.
-            fileIO(PLAYERS, "save", self.players)
-            fileIO(GAMES, "save", self.game)
+            save_json(self.bot, PLAYERS, self.players)
+            save_json(self.bot, GAMES, self.game)
             return msg
         else: # Not in game.
             # Set preferred token in players.
             self.players["PLAYERS"][user.id]["tokenPreferred"] = newToken
             msg = ( "\n`Your preferred token is: {}\n ` {}"
                         .format(self.TOKENS[newToken][0], self.TOKENS[newToken][1]))
-            fileIO(PLAYERS, "save", self.players)
+            save_json(self.bot, PLAYERS, self.players)
             return msg
 
     # Check id is turn.
@@ -1113,7 +1114,7 @@ class FourInARow:
         now = round(time.time())
         turnTime = (now - CH_GAME["lastActivity"])/totalMoves
         self.players["PLAYERS"][user.id]["STATS"]["averageTimeTurn"] = turnTime
-        fileIO(PLAYERS, "save", self.players)
+        save_json(self.bot, PLAYERS, self.players)
         # Get position of user.
         userPos = -1
         if activePlayers >= 1:
@@ -1130,7 +1131,7 @@ class FourInARow:
         await self.reset_voting(ctx)
         # Save it.
         self.game["CHANNELS"][ctx.message.channel.id]["PLAYERS"] = CH_PLAYERS
-        fileIO(GAMES, "save", self.game)
+        save_json(self.bot, GAMES, self.game)
 
     # Returns an unused index of an araay.
     def get_unused(self, arrayAvailable, arrayUsed):
@@ -1164,7 +1165,7 @@ class FourInARow:
             self.game["CHANNELS"][ctx.message.channel.id]["turnIds"] = nextTurn
         # Save all
         self.game["CHANNELS"][ctx.message.channel.id]["PLAYERS"] = CH_PLAYERS
-        fileIO(GAMES, "save", self.game)        
+        save_json(self.bot, GAMES, self.game)        
 
     # Check if a certain token makes a winner.
     def is_winner(self, ctx, tile):
@@ -1261,7 +1262,7 @@ class FourInARow:
                 msg = self.get_queue_msg(stats)
                 self.players["PLAYERS"][userId]["MSG"]["joiningMsg"] = msg
                 continue
-        fileIO(PLAYERS, "save", self.players)
+        save_json(self.bot, PLAYERS, self.players)
         return
 
     # Get the queue message / Rank.
@@ -10,6 +10,8 @@ from operator import itemgetter
 import discord
 from discord.ext import commands
 from .utils.dataIO import dataIO
+from .jsonstore import load_json, save_json
+from .cooldowns import cooldown_remaining, start_cooldown, clear_cooldown
 from .utils import checks
 from __main__ import send_cmd_help
 
@@ -89,7 +91,7 @@ class Heist:
     def __init__(self, bot):
         self.bot = bot
         self.file_path = "data/JumperCogs/heist/heist.json"
-        self.system = dataIO.load_json(self.file_path)
+        self.system = load_json(self.bot, self.file_path)
         self.version = "2.0.8.1"
         self.cycle_task = bot.loop.create_task(self.vault_updater())
 
@@ -180,7 +182,7 @@ class Heist:
                 print("Author ID :{}\nUser ID :{}".format(author.id, user.id))
                 settings["Players"][user.id]["Status"] = "Free"
                 settings["Players"][user.id]["OOB"] = True
-                dataIO.save_json(self.file_path, self.system)
+                save_json(self.bot, self.file_path, self.system)
             elif response.content.title() == "No":
                 msg = "Cancelling transaction."
             else:
@@ -274,7 +276,7 @@ class Heist:
             bank_fmt = {"Crew": int(crew.content) + 1, "Vault": int(vault.content),
                         "Vault Max": int(vault_max.content), "Success": int(success.content)}
             settings["Banks"][name.content.title()] = bank_fmt
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             await self.bot.say(msg)
 
     @heist.command(name="remove", pass_context=True)
@@ -292,7 +294,7 @@ class Heist:
                 msg = "Cancelling removal. You took too long."
             elif response.content.title() == "Yes":
                 settings["Banks"].pop(bank.title())
-                dataIO.save_json(self.file_path, self.system)
+                save_json(self.bot, self.file_path, self.system)
                 msg = "{} was removed from the list of banks.".format(bank.title())
             else:
                 msg = "Cancelling bank removal."
@@ -340,12 +342,10 @@ class Heist:
         server = ctx.message.server
         settings = self.check_server_settings(server)
         self.account_check(settings, author)
-        player_time = settings["Players"][author.id]["Time Served"]
-        base_time = settings["Players"][author.id]["Sentence"]
         OOB = settings["Players"][author.id]["OOB"]
 
         if settings["Players"][author.id]["Status"] == "Apprehended" or OOB:
-            remaining = self.cooldown_calculator(settings, player_time, base_time)
+            remaining = self.cooldown_calculator("heist.jail", self.player_key(author))
             if remaining:
                 msg = ("You still have time on your sentence. You still need to wait:\n"
                        "```{}```".format(remaining))
@@ -357,7 +357,7 @@ class Heist:
                 settings["Players"][author.id]["Sentence"] = 0
                 settings["Players"][author.id]["Time Served"] = 0
                 settings["Players"][author.id]["Status"] = "Free"
-                dataIO.save_json(self.file_path, self.system)
+                save_json(self.bot, self.file_path, self.system)
         else:
             msg = "I can't remove you from jail if your not *in* jail."
         await self.bot.say(msg)
@@ -369,15 +369,13 @@ class Heist:
         server = ctx.message.server
         settings = self.check_server_settings(server)
         self.account_check(settings, author)
-        player_time = settings["Players"][author.id]["Death Timer"]
-        base_time = settings["Config"]["Death Timer"]
 
         if settings["Players"][author.id]["Status"] == "Dead":
-            remainder = self.cooldown_calculator(settings, player_time, base_time)
+            remainder = self.cooldown_calculator("heist.death", self.player_key(author))
             if not remainder:
                 settings["Players"][author.id]["Death Timer"] = 0
                 settings["Players"][author.id]["Status"] = "Free"
-                dataIO.save_json(self.file_path, self.system)
+                save_json(self.bot, self.file_path, self.system)
                 msg = "You have risen from the dead!"
             else:
                 msg = ("You can't revive yet. You still need to wait:\n"
@@ -396,14 +394,10 @@ class Heist:
         self.account_check(settings, author)
 
         status = settings["Players"][author.id]["Status"]
-        sentence = settings["Players"][author.id]["Sentence"]
-        time_served = settings["Players"][author.id]["Time Served"]
-        jail_fmt = self.cooldown_calculator(settings, time_served, sentence)
+        jail_fmt = self.cooldown_calculator("heist.jail", self.player_key(author))
         bail = settings["Players"][author.id]["Bail Cost"]
         jail_counter = settings["Players"][author.id]["Jail Counter"]
-        death_timer = settings["Players"][author.id]["Death Timer"]
-        base_death_timer = settings["Config"]["Death Timer"]
-        death_fmt = self.cooldown_calculator(settings, death_timer, base_death_timer)
+        death_fmt = self.cooldown_calculator("heist.death", self.player_key(author))
         spree = settings["Players"][author.id]["Spree"]
         probation = settings["Players"][author.id]["OOB"]
         total_deaths = settings["Players"][author.id]["Deaths"]
@@ -475,9 +469,9 @@ class Heist:
                 else:
                     msg = "No one made it out safe. The good guys win."
                 await self.bot.say(msg)
-                settings["Config"]["Alert"] = int(time.perf_counter())
+                start_cooldown(self.bot, "heist.alert", server.id, settings["Config"]["Police Alert"])
                 self.reset_heist(settings)
-                dataIO.save_json(self.file_path, self.system)
+                save_json(self.bot, self.file_path, self.system)
         else:
             self.subtract_costs(settings, author, cost)
             settings["Crew"][author.id] = {}
@@ -501,7 +495,7 @@ class Heist:
 
         if seconds > 0:
             settings["Config"]["Sentence Base"] = seconds
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             time_fmt = self.time_format(seconds)
             msg = "Setting base jail sentence to {}.".format(time_fmt)
         else:
@@ -517,7 +511,7 @@ class Heist:
 
         if cost >= 0:
             settings["Config"]["Heist Cost"] = cost
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             msg = "Setting heist cost to {}.".format(cost)
         else:
             msg = "Need a number higher than -1."
@@ -532,7 +526,7 @@ class Heist:
 
         if seconds > 0:
             settings["Config"]["Police Alert"] = seconds
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             time_fmt = self.time_format(seconds)
             msg = "Setting police alert to {}.".format(time_fmt)
         else:
@@ -548,7 +542,7 @@ class Heist:
 
         if cost >= 0:
             settings["Config"]["Bail Cost"] = cost
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             msg = "Setting base bail cost to {}.".format(cost)
         else:
             msg = "Need a number higher than -1."
@@ -563,7 +557,7 @@ class Heist:
 
         if seconds > 0:
             settings["Config"]["Death Timer"] = seconds
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             time_fmt = self.time_format(seconds)
             msg = "Setting death timer to {}.".format(time_fmt)
         else:
@@ -583,7 +577,7 @@ class Heist:
         else:
             settings["Config"]["Hardcore"] = True
             msg = "Hardcore mode now ON! **Warning** death will result in credit **and chip wipe**."
-        dataIO.save_json(self.file_path, self.system)
+        save_json(self.bot, self.file_path, self.system)
         await self.bot.say(msg)
 
     @setheist.command(name="wait", pass_context=True)
@@ -595,7 +589,7 @@ class Heist:
 
         if seconds > 0:
             settings["Config"]["Wait Time"] = seconds
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             time_fmt = self.time_format(seconds)
             msg = "Setting crew gather time to {}.".format(time_fmt)
         else:
@@ -624,15 +618,14 @@ class Heist:
                             self.system["Servers"][serverid]["Banks"][bank]["Vault"] = increment
                         else:
                             pass
-                dataIO.save_json(self.file_path, self.system)
+                save_json(self.bot, self.file_path, self.system)
                 await asyncio.sleep(120)  # task runs every 120 seconds
         except asyncio.CancelledError:
             pass
 
     def __unload(self):
         self.cycle_task.cancel()
-        self.shutdown_save()
-        dataIO.save_json(self.file_path, self.system)
+        save_json(self.bot, self.file_path, self.system)
 
     def calculate_credits(self, settings, players, target):
         names = [player.name for player in players]
@@ -665,7 +658,7 @@ class Heist:
                 settings["Crew"].pop(player.id)
                 bad_out.remove(bad_thing)
                 results.append(dropout_msg.format(player.name))
-        dataIO.save_json(self.file_path, self.system)
+        save_json(self.bot, self.file_path, self.system)
         return results
 
     def hardcore_handler(self, settings, user):
@@ -697,7 +690,8 @@ class Heist:
             settings["Players"][user.id]["Status"] = "Apprehended"
             settings["Players"][user.id]["Bail Cost"] = bail
             settings["Players"][user.id]["Sentence"] = sentence
-            settings["Players"][user.id]["Time Served"] = int(time.perf_counter())
+            settings["Players"][user.id]["Time Served"] = int(time.time())
+            start_cooldown(self.bot, "heist.jail", self.player_key(user), sentence)
             settings["Players"][user.id]["OOB"] = False
             settings["Players"][user.id]["Total Jail"] += 1
             settings["Players"][user.id]["Criminal Level"] += 1
@@ -719,7 +713,8 @@ class Heist:
         settings["Players"][user.id]["Status"] = "Dead"
         settings["Players"][user.id]["Deaths"] += 1
         settings["Players"][user.id]["Jail Counter"] = 0
-        settings["Players"][user.id]["Death Timer"] = int(time.perf_counter())
+        settings["Players"][user.id]["Death Timer"] = int(time.time())
+        start_cooldown(self.bot, "heist.death", self.player_key(user), settings["Config"]["Death Timer"])
         if settings["Config"]["Hardcore"]:
             self.hardcore_handler(settings, user)
 
@@ -732,13 +727,15 @@ class Heist:
         settings["Players"][user.id]["Sentence"] = 0
         settings["Players"][user.id]["Time Served"] = 0
         settings["Players"][user.id]["OOB"] = False
-        dataIO.save_json(self.file_path, self.system)
+        clear_cooldown(self.bot, "heist.jail", self.player_key(user))
+        clear_cooldown(self.bot, "heist.death", self.player_key(user))
+        save_json(self.bot, self.file_path, self.system)
 
     def reset_heist(self, settings):
         settings["Crew"] = {}
         settings["Config"]["Heist Planned"] = False
         settings["Config"]["Heist Start"] = False
-        dataIO.save_json(self.file_path, self.system)
+        save_json(self.bot, self.file_path, self.system)
 
     def award_credits(self, deposits):
         for player in deposits:
@@ -750,7 +747,7 @@ class Heist:
         bank.withdraw_credits(author, cost)
 
     def requirement_check(self, settings, prefix, author, cost):
-        (alert, remaining) = self.police_alert(settings)
+        (alert, remaining) = self.police_alert(author.server)
         if not list(settings["Banks"]):
             msg = ("Oh no! There are no banks! To start creating a bank, use "
                    "{}heist createbank.".format(prefix))
@@ -765,8 +762,7 @@ class Heist:
         elif settings["Players"][author.id]["Status"] == "Apprehended":
             bail = settings["Players"][author.id]["Bail Cost"]
             sentence_raw = settings["Players"][author.id]["Sentence"]
-            time_served = settings["Players"][author.id]["Time Served"]
-            remaining = self.cooldown_calculator(settings, sentence_raw, time_served)
+            remaining = self.cooldown_calculator("heist.jail", self.player_key(author))
             sentence = self.time_format(sentence_raw)
             if remaining:
                 msg = ("You are in jail. You are serving a sentence of {}.\nYou can wait out your "
@@ -777,9 +773,7 @@ class Heist:
                        "warden to sign your release by typing {}heist release .".format(prefix))
             return None, msg
         elif settings["Players"][author.id]["Status"] == "Dead":
-            death_time = settings["Players"][author.id]["Death Timer"]
-            base_timer = settings["Config"]["Death Timer"]
-            remaining = self.cooldown_calculator(settings, death_time, base_timer)
+            remaining = self.cooldown_calculator("heist.death", self.player_key(author))
             if remaining:
                 msg = ("You are dead. You can revive in:\n{}\nUse the command {}heist revive when "
                        "the timer has expired.".format(remaining, prefix))
@@ -799,45 +793,22 @@ class Heist:
         else:
             return "True", ""
 
-    def police_alert(self, settings):
-        police_time = settings["Config"]["Police Alert"]
-        alert_time = settings["Config"]["Alert Time"]
-        if settings["Config"]["Alert Time"] == 0:
-            return "True", None
-        elif abs(alert_time - int(time.perf_counter())) >= police_time:
-            settings["Config"]["Alert Time"] == 0
-            dataIO.save_json(self.file_path, self.system)
+    def police_alert(self, server):
+        remaining = cooldown_remaining(self.bot, "heist.alert", server.id)
+        if not remaining:
             return "True", None
         else:
-            s = abs(alert_time - int(time.perf_counter()))
-            seconds = abs(s - police_time)
-            amount = self.time_format(seconds)
+            amount = self.time_format(remaining)
             return None, amount
 
-    def shutdown_save(self):
-        for server in self.system["Servers"]:
-            death_time = self.system["Servers"][server]["Config"]["Death Timer"]
-            for player in self.system["Servers"][server]["Players"]:
-                player_death = self.system["Servers"][server]["Players"][player]["Death Timer"]
-                player_sentence = self.system["Servers"][server]["Players"][player]["Time Served"]
-                sentence = self.system["Servers"][server]["Players"][player]["Sentence"]
-
-                if player_death > 0:
-                    s = abs(player_death - int(time.perf_counter()))
-                    seconds = abs(s - death_time)
-                    self.system["Servers"][server]["Players"][player]["Death Timer"] = seconds
-
-                if player_sentence > 0:
-                    s = abs(player_sentence - int(time.perf_counter()))
-                    seconds = abs(s - sentence)
-                    self.system["Servers"][server]["Players"][player]["Time Served"] = seconds
-
-    def cooldown_calculator(self, settings, player_time, base_time):
-        if abs(player_time - int(time.perf_counter())) >= base_time:
+    def player_key(self, user):
+        return "{}:{}".format(user.server.id, user.id)
+
+    def cooldown_calculator(self, name, key):
+        seconds = cooldown_remaining(self.bot, name, key)
+        if not seconds:
             return None
         else:
-            s = abs(player_time - int(time.perf_counter()))
-            seconds = abs(s - base_time)
             time_remaining = self.time_format(seconds)
             return time_remaining
 
@@ -888,7 +859,7 @@ class Heist:
                         "Death Timer": 0, "OOB": False, "Bail Cost": 0, "Jail Counter": 0,
                         "Spree": 0, "Criminal Level": 0, "Total Jail": 0, "Deaths": 0}
             settings["Players"][author.id] = criminal
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
         else:
             pass
 
@@ -903,7 +874,7 @@ class Heist:
                        "Banks": {},
                        }
             self.system["Servers"][server.id] = default
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             print("Creating Heist settings for Server: {}".format(server.name))
             path = self.system["Servers"][server.id]
             return path
@@ -921,7 +892,7 @@ class Heist:
             action = None
         else:
             self.run_death(settings, user)
-            dataIO.save_json(self.file_path, self.system)
+            save_json(self.bot, self.file_path, self.system)
             msg = ("{} casted :skull: `death` :skull: on {} and sent them "
                    "to the graveyard.".format(author.name, user.name))
             action = "True"
@@ -933,7 +904,8 @@ class Heist:
         if settings["Players"][user.id]["Status"] == "Dead":
             settings["Players"][user.id]["Death Timer"] = 0
             settings["Players"][user.id]["Status"] = "Free"
-            dataIO.save_json(self.file_path, self.system)
+            clear_cooldown(self.bot, "heist.death", self.player_key(user))
+            save_json(self.bot, self.file_path, self.system)
             msg = ("{} casted :trident: `resurrection` :trident: on {} and returned them "
                    "to the living.".format(author.name, user.name))
             action = "True"
@@ -0,0 +1,237 @@
+from discord.ext import commands
+from cogs.utils import checks
+from collections import OrderedDict
+from io import BytesIO
+from urllib.parse import urlparse
+import asyncio
+import aiohttp
+import hashlib
+import json
+import time
+import os
+
+PATH = "data/httpclient/"
+CACHE_PATH = PATH + "cache/"
+
+# connections kept open overall and per host
+POOL_SIZE = 100
+HOST_LIMIT = 8
+# seconds for a whole request, including reading the body
+TIMEOUT = 30
+# bodies larger than this are refused, bytes
+MAX_SIZE = 10 * 1024 * 1024
+# responses with an ETag or Last-Modified are kept on disk for conditional gets, up to this many bytes
+CACHE_BYTES = 512 * 1024 * 1024
+CHUNK_SIZE = 64 * 1024
+
+
+class ResponseTooLarge(Exception):
+    pass
+
+
+class HTTPClient:
+    """One pooled HTTP session shared by every cog.
+
+    Other cogs get it with bot.get_cog('HTTPClient') and fall back to their own
+    requests when it isn't loaded."""
+
+    ResponseTooLarge = ResponseTooLarge
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.connector = aiohttp.TCPConnector(limit=POOL_SIZE, loop=bot.loop)
+        self.session = aiohttp.ClientSession(connector=self.connector, loop=bot.loop)
+        self.host_slots = {}
+        # key -> body size, oldest first, so the disk cache stays bounded across restarts
+        self.cached = OrderedDict()
+        self.cached_bytes = 0
+        entries = []
+        for name in os.listdir(CACHE_PATH):
+            if name.endswith(".json"):
+                key = name[:-5]
+                try:
+                    entries.append((os.path.getmtime(self._meta_path(key)), key, os.path.getsize(self._data_path(key))))
+                except OSError:
+                    pass
+        for mtime, key, size in sorted(entries):
+            self.cached[key] = size
+            self.cached_bytes += size
+        self.stats = {"requests": 0, "hits": 0, "misses": 0, "errors": 0, "too_large": 0, "bytes": 0, "latency": 0.0}
+        self.hosts = {}
+
+    def __unload(self):
+        self.session.close()
+
+    def _data_path(self, key):
+        return CACHE_PATH + key + ".bin"
+
+    def _meta_path(self, key):
+        return CACHE_PATH + key + ".json"
+
+    def _load_cached(self, key):
+        with open(self._meta_path(key)) as f:
+            meta = json.load(f)
+        with open(self._data_path(key), "rb") as f:
+            return meta, f.read()
+
+    def _save_cached(self, key, meta, data, evicted):
+        with open(self._data_path(key), "wb") as f:
+            f.write(data)
+        with open(self._meta_path(key), "w") as f:
+            json.dump(meta, f)
+        for old_key in evicted:
+            for path in (self._data_path(old_key), self._meta_path(old_key)):
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+
+    def _forget(self, key):
+        self.cached_bytes -= self.cached.pop(key, 0)
+
+    async def _store(self, key, meta, data):
+        self._forget(key)
+        self.cached[key] = len(data)
+        self.cached_bytes += len(data)
+        evicted = []
+        while self.cached_bytes > CACHE_BYTES and len(self.cached) > 1:
+            old_key = next(iter(self.cached))
+            self._forget(old_key)
+            evicted.append(old_key)
+        try:
+            await self.bot.loop.run_in_executor(None, self._save_cached, key, meta, data, evicted)
+        except OSError:
+            self._forget(key)
+
+    async def _read_body(self, r, max_size, probe):
+        length = r.headers.get("Content-Length")
+        if length and length.isdigit() and int(length) > max_size:
+            raise ResponseTooLarge(r.url)
+        body = bytearray()
+        while True:
+            chunk = await r.content.read(CHUNK_SIZE)
+            if not chunk:
+                break
+            body.extend(chunk)
+            if len(body) > max_size:
+                raise ResponseTooLarge(r.url)
+            if probe is not None:
+                probe.feed(chunk)
+        return bytes(body)
+
+    async def get(self, url, *, headers=None, cache=True, timeout=TIMEOUT, max_size=MAX_SIZE, probe=None):
+        """Returns the body of url as bytes. Raises on errors, bad statuses and oversized bodies.
+
+        probe.feed(chunk) is called as the body streams in, it can raise to stop the download."""
+        host = urlparse(url).netloc
+        if host not in self.host_slots:
+            self.host_slots[host] = asyncio.Semaphore(HOST_LIMIT)
+        key = hashlib.sha1(url.encode("utf-8")).hexdigest()
+        headers = dict(headers or {})
+        cached = None
+        if cache and key in self.cached:
+            try:
+                cached = await self.bot.loop.run_in_executor(None, self._load_cached, key)
+            except (OSError, ValueError):
+                self._forget(key)
+            else:
+                meta = cached[0]
+                if meta.get("etag"):
+                    headers["If-None-Match"] = meta["etag"]
+                if meta.get("last_modified"):
+                    headers["If-Modified-Since"] = meta["last_modified"]
+
+        self.stats["requests"] += 1
+        self.hosts[host] = self.hosts.get(host, 0) + 1
+        start = time.perf_counter()
+        try:
+            async with self.host_slots[host]:
+                with aiohttp.Timeout(timeout):
+                    async with self.session.get(url, headers=headers) as r:
+                        if r.status == 304 and cached is not None:
+                            if len(cached[1]) > max_size:
+                                raise ResponseTooLarge(url)
+                            self.stats["hits"] += 1
+                            self.cached.move_to_end(key)
+                            if probe is not None:
+                                probe.feed(cached[1])
+                            return cached[1]
+                        if r.status >= 400:
+                            raise aiohttp.HttpProcessingError(code=r.status, message=r.reason)
+                        data = await self._read_body(r, max_size, probe)
+                        etag = r.headers.get("ETag")
+                        last_modified = r.headers.get("Last-Modified")
+        except ResponseTooLarge:
+            self.stats["too_large"] += 1
+            raise
+        except:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["latency"] += time.perf_counter() - start
+
+        self.stats["misses"] += 1
+        self.stats["bytes"] += len(data)
+        if cache and (etag or last_modified):
+            await self._store(key, {"url": url, "etag": etag, "last_modified": last_modified}, data)
+        return data
+
+    async def bytes_download(self, url, **kwargs):
+        """Same contract as bot.bytes_download, a BytesIO or False."""
+        try:
+            return BytesIO(await self.get(url, **kwargs))
+        except Exception as e:
+            print(e)
+            return False
+
+    async def download(self, url, path, **kwargs):
+        """Same contract as bot.download, True once the file is written or False."""
+        try:
+            data = await self.get(url, **kwargs)
+            with open(path, "wb") as f:
+                f.write(data)
+            return True
+        except Exception as e:
+            print(e)
+            return False
+
+    async def get_text(self, url, cache=False, **kwargs):
+        data = await self.get(url, cache=cache, **kwargs)
+        return data.decode("utf-8", "replace")
+
+    async def get_json(self, url, cache=False, **kwargs):
+        return json.loads(await self.get_text(url, cache=cache, **kwargs))
+
+    @checks.is_owner()
+    @commands.command()
+    async def httpstats(self):
+        """Shows shared HTTP client and cache stats."""
+        stats = self.stats
+        requests = stats["requests"] or 1
+        msg = "```\n"
+        msg += "Requests:     {}\n".format(stats["requests"])
+        msg += "Cache hits:   {} ({:.1%})\n".format(stats["hits"], stats["hits"] / requests)
+        msg += "Cache misses: {}\n".format(stats["misses"])
+        msg += "Errors:       {}\n".format(stats["errors"])
+        msg += "Too large:    {}\n".format(stats["too_large"])
+        msg += "Downloaded:   {:.1f} MB\n".format(stats["bytes"] / 1024 / 1024)
+        msg += "Avg latency:  {:.0f} ms\n".format(stats["latency"] / requests * 1000)
+        msg += "Cached files: {} ({:.1f} MB)\n".format(len(self.cached), self.cached_bytes / 1024 / 1024)
+        top = sorted(self.hosts.items(), key=lambda h: h[1], reverse=True)[:5]
+        if top:
+            msg += "Top hosts:\n"
+            for host, count in top:
+                msg += "  {} - {}\n".format(host, count)
+        msg += "```"
+        await self.bot.say(msg)
+
+
+def check_folders():
+    if not os.path.exists(CACHE_PATH):
+        print("Creating %s folder..." % CACHE_PATH)
+        os.makedirs(CACHE_PATH)
+
+
+def setup(bot):
+    check_folders()
+    bot.add_cog(HTTPClient(bot))
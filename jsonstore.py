@@ -0,0 +1,155 @@
+from discord.ext import commands
+from cogs.utils import checks
+from cogs.utils.dataIO import dataIO
+import threading
+import asyncio
+import atexit
+import json
+import time
+import os
+
+# seconds a dirty file waits for more changes before it is written
+DEBOUNCE = 5
+
+
+class JSONStore:
+    """Coalesced, atomic JSON writes shared by every cog.
+
+    Cogs keep their state in memory and call save(path, data) after each change,
+    the file is written once per DEBOUNCE interval no matter how many saves came
+    in. Other cogs use the load_json/save_json functions below, which fall
+    back to dataIO when it isn't loaded."""
+
+    def __init__(self, bot):
+        self.bot = bot
+        # path -> the object to write, replaced by newer saves until it's flushed
+        self.pending = {}
+        # path -> the object the writer thread is busy with
+        self.writing = {}
+        self.lock = threading.Lock()
+        self.wake = asyncio.Event()
+        self.stats = {"saves": 0, "writes": 0, "bytes": 0, "errors": 0, "time": 0.0}
+        self.files = {}
+        # newest serialized version per path, an older write finishing late is dropped
+        self.version = 0
+        self.written = {}
+        self.writer = bot.loop.create_task(self.write_loop())
+        atexit.register(self.flush)
+
+    def __unload(self):
+        self.writer.cancel()
+        atexit.unregister(self.flush)
+        self.flush()
+
+    def save(self, path, data):
+        """Marks path dirty, data is serialized when the debounce interval ends,
+        so later changes to the same object are picked up too."""
+        self.stats["saves"] += 1
+        self.pending[path] = data
+        self.wake.set()
+
+    def load(self, path):
+        """Same as dataIO.load_json, but returns the unwritten data for a dirty path."""
+        if path in self.pending:
+            return self.pending[path]
+        return dataIO.load_json(path)
+
+    def _dump(self, data):
+        self.version += 1
+        return self.version, json.dumps(data, indent=4, sort_keys=True, separators=(',', ' : ')).encode("utf-8")
+
+    def _write(self, path, version, text):
+        tmp = "{}.{}.tmp".format(path, os.getpid())
+        start = time.perf_counter()
+        with self.lock:
+            if self.written.get(path, 0) > version:
+                return
+            self.written[path] = version
+            with open(tmp, "wb") as f:
+                f.write(text)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        self.stats["time"] += time.perf_counter() - start
+        self.stats["writes"] += 1
+        self.stats["bytes"] += len(text)
+        self.files[path] = self.files.get(path, 0) + 1
+
+    async def write_loop(self):
+        while True:
+            await self.wake.wait()
+            await asyncio.sleep(DEBOUNCE)
+            self.wake.clear()
+            # one at a time so a cancelled loop leaves the rest, and the one
+            # being written, for flush()
+            for path in list(self.pending):
+                data = self.writing[path] = self.pending.pop(path)
+                try:
+                    # serialized here on the loop, nothing can change data halfway through
+                    version, text = self._dump(data)
+                    await self.bot.loop.run_in_executor(None, self._write, path, version, text)
+                except OSError as e:
+                    print("JSONStore: couldn't write {}: {}".format(path, e))
+                    self.stats["errors"] += 1
+                    self.pending.setdefault(path, data)
+                    self.wake.set()
+                except Exception as e:
+                    # not serializable, retrying can't help until the cog saves again
+                    print("JSONStore: couldn't save {}: {}".format(path, e))
+                    self.stats["errors"] += 1
+                finally:
+                    self.writing.pop(path, None)
+
+    def flush(self):
+        """Writes everything that is still dirty, blocking."""
+        pending = dict(self.writing)
+        pending.update(self.pending)
+        self.pending = {}
+        for path, data in pending.items():
+            try:
+                self._write(path, *self._dump(data))
+            except Exception as e:
+                print("JSONStore: couldn't write {}: {}".format(path, e))
+                self.stats["errors"] += 1
+
+    @checks.is_owner()
+    @commands.command()
+    async def storestats(self):
+        """Shows how many saves were coalesced into writes."""
+        stats = self.stats
+        writes = stats["writes"] or 1
+        msg = "```\n"
+        msg += "Saves:        {}\n".format(stats["saves"])
+        msg += "Writes:       {} ({:.1f} saves each)\n".format(stats["writes"], stats["saves"] / writes)
+        msg += "Written:      {:.1f} MB\n".format(stats["bytes"] / 1024 / 1024)
+        msg += "Avg write:    {:.1f} ms\n".format(stats["time"] / writes * 1000)
+        msg += "Errors:       {}\n".format(stats["errors"])
+        msg += "Dirty files:  {}\n".format(len(self.pending))
+        top = sorted(self.files.items(), key=lambda f: f[1], reverse=True)[:5]
+        if top:
+            msg += "Most written:\n"
+            for path, count in top:
+                msg += "  {} - {}\n".format(path, count)
+        msg += "```"
+        await self.bot.say(msg)
+
+
+def load_json(bot, path):
+    """dataIO.load_json that sees saves the JSONStore cog hasn't written yet."""
+    store = bot.get_cog('JSONStore')
+    if store is not None:
+        return store.load(path)
+    return dataIO.load_json(path)
+
+
+def save_json(bot, path, data):
+    """Saves through the JSONStore cog, or right away with dataIO when it isn't loaded."""
+    store = bot.get_cog('JSONStore')
+    if store is not None:
+        store.save(path, data)
+    else:
+        dataIO.save_json(path, data)
+
+
+def setup(bot):
+    bot.add_cog(JSONStore(bot))
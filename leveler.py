@@ -8,7 +8,8 @@ import os, re, aiohttp
 from .utils.dataIO import fileIO
 from cogs.utils import checks
 try:
-    from pymongo import MongoClient
+    from pymongo import MongoClient, ASCENDING, DESCENDING, UpdateOne
+    from pymongo.errors import BulkWriteError
 except:
     raise RuntimeError("Can't load pymongo. Do 'pip3 install pymongo'.")
 try:
@@ -17,11 +18,19 @@ try:
     import scipy.cluster
 except:
     pass
+try:
+    import numpy as np
+except:
+    np = None
 try:
     from PIL import Image, ImageDraw, ImageFont, ImageColor, ImageOps
 except:
     raise RuntimeError("Can't load pillow. Do 'pip3 install pillow'.")
-import time
+import time, json, hashlib
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import partial
+from io import BytesIO
 
 # fonts
 font_file = 'data/leveler/fonts/font.ttf'
@@ -39,12 +48,195 @@ user_directory = "data/leveler/users"
 prefix = fileIO("data/red/settings.json", "load")['PREFIXES']
 default_avatar_url = "http://i.imgur.com/XPDO9VH.jpg"
 
+# decoded backgrounds/avatars kept in memory, entries expire after ttl seconds
+image_cache_size = 256
+image_cache_ttl = 3600
+
+# processes drawing profile/rank/levelup cards
+render_workers = 2
+
+# finished profile/rank pngs, keyed by a hash of everything drawn on them
+card_cache_size = 128
+card_disk_size = 2000
+card_directory = "data/leveler/cards"
+
+# userinfo fields that show up on a profile or rank card, besides the server's level and exp
+card_fields = ["title", "info", "rep", "total_exp", "profile_background", "rank_background",
+    "rep_color", "badge_col_color", "profile_info_color", "rank_info_color", "profile_exp_color", "rank_exp_color"]
+
+# max connections to mongodb, also the number of threads running queries
+db_pool_size = 10
+
+# buffered chat exp is written every interval (seconds) or once this many users are pending
+exp_flush_interval = 30
+exp_flush_size = 500
+
 try:
-    client = MongoClient()
+    client = MongoClient(maxPoolSize=db_pool_size)
     db = client['leveler']
 except:
     print("Can't load database. Follow instructions on Git/online to install MongoDB.")
 
+class AsyncDatabase:
+    """Runs blocking pymongo calls on a thread pool so they don't stall the event loop."""
+
+    def __init__(self, database, loop, max_workers=db_pool_size):
+        self.loop = loop
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.users = AsyncCollection(database.users, self)
+        self.badges = AsyncCollection(database.badges, self)
+        self.server_exp = AsyncCollection(database.server_exp, self)
+
+    def run(self, func, *args, **kwargs):
+        return self.loop.run_in_executor(self.executor, partial(func, *args, **kwargs))
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+
+class AsyncCollection:
+    """Awaitable versions of the pymongo collection methods leveler uses."""
+
+    def __init__(self, collection, database):
+        self.collection = collection
+        self.database = database
+
+    def find_one(self, *args, **kwargs):
+        return self.database.run(self.collection.find_one, *args, **kwargs)
+
+    # returns a list, the cursor is consumed in the worker thread
+    def find(self, *args, sort=None, **kwargs):
+        def _find():
+            cursor = self.collection.find(*args, **kwargs)
+            if sort:
+                cursor = cursor.sort(sort)
+            return list(cursor)
+        return self.database.run(_find)
+
+    # Collection.count is gone in pymongo 4
+    def count(self, *args, **kwargs):
+        return self.database.run(self.collection.count_documents, *args, **kwargs)
+
+    def insert_one(self, *args, **kwargs):
+        return self.database.run(self.collection.insert_one, *args, **kwargs)
+
+    def update_one(self, *args, **kwargs):
+        return self.database.run(self.collection.update_one, *args, **kwargs)
+
+    def bulk_write(self, *args, **kwargs):
+        return self.database.run(self.collection.bulk_write, *args, **kwargs)
+
+    def create_index(self, *args, **kwargs):
+        return self.database.run(self.collection.create_index, *args, **kwargs)
+
+class ImageCache:
+    """Bounded LRU of decoded images, keyed by (url, size)."""
+
+    def __init__(self, max_size=image_cache_size, ttl=image_cache_ttl):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.images = OrderedDict()
+
+    def get(self, key):
+        if key not in self.images:
+            return None
+        image, expires = self.images[key]
+        if expires < time.time():
+            del self.images[key]
+            return None
+        self.images.move_to_end(key)
+        return image
+
+    def set(self, key, image):
+        self.images[key] = (image, time.time() + self.ttl)
+        self.images.move_to_end(key)
+        while len(self.images) > self.max_size:
+            self.images.popitem(last=False)
+
+class CardCache:
+    """Rendered card pngs, kept in a bounded LRU in memory and a bounded directory on disk."""
+
+    def __init__(self, loop, max_size=card_cache_size, max_files=card_disk_size, directory=card_directory):
+        self.loop = loop
+        self.max_size = max_size
+        self.max_files = max_files
+        self.directory = directory
+        self.cards = OrderedDict()
+        # oldest first, so eviction survives restarts
+        self.files = OrderedDict()
+        if os.path.exists(directory):
+            names = [name for name in os.listdir(directory) if name.endswith(".png")]
+            names.sort(key=lambda name: os.path.getmtime(os.path.join(directory, name)))
+            for name in names:
+                self.files[name[:-4]] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _path(self, key):
+        return os.path.join(self.directory, "{}.png".format(key))
+
+    def _read(self, key):
+        with open(self._path(key), "rb") as f:
+            return f.read()
+
+    def _write(self, key, data, evicted):
+        with open(self._path(key), "wb") as f:
+            f.write(data)
+        for old_key in evicted:
+            try:
+                os.remove(self._path(old_key))
+            except OSError:
+                pass
+
+    def _remember(self, key, data):
+        self.cards[key] = data
+        self.cards.move_to_end(key)
+        while len(self.cards) > self.max_size:
+            self.cards.popitem(last=False)
+
+    async def get(self, key):
+        if key in self.cards:
+            self.cards.move_to_end(key)
+            self.hits += 1
+            return self.cards[key]
+        if key in self.files:
+            try:
+                data = await self.loop.run_in_executor(None, self._read, key)
+            except OSError:
+                del self.files[key]
+            else:
+                self.files.move_to_end(key)
+                self._remember(key, data)
+                self.hits += 1
+                return data
+        self.misses += 1
+        return None
+
+    async def set(self, key, data):
+        self._remember(key, data)
+        self.files[key] = None
+        self.files.move_to_end(key)
+        evicted = []
+        while len(self.files) > self.max_files:
+            evicted.append(self.files.popitem(last=False)[0])
+        try:
+            await self.loop.run_in_executor(None, self._write, key, data, evicted)
+        except OSError:
+            self.files.pop(key, None)
+
+# hashes the inputs of a card, any change to them gives a different key
+def card_key(kind, inputs):
+    data = json.dumps([kind, inputs], sort_keys=True, default=str)
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+# fonts are loaded once per (file, size)
+font_cache = {}
+
+def get_font(font_path, size):
+    key = (font_path, size)
+    if key not in font_cache:
+        font_cache[key] = ImageFont.truetype(font_path, size)
+    return font_cache[key]
+
 class Leveler:
     """A level up thing with image generation!"""
 
@@ -55,10 +247,22 @@ class Leveler:
         self.settings = fileIO("data/leveler/settings.json", "load")
         bot_settings = fileIO("data/red/settings.json", "load")
         self.owner = bot_settings["OWNER"]
+        self.db = AsyncDatabase(db, bot.loop)
+        self.image_cache = ImageCache()
+        self.badge_sprites = {} # (bg_img, border_color, badge_type) -> pre-rendered badge layers
+        self.card_cache = CardCache(bot.loop)
+        self.render_pool = ProcessPoolExecutor(max_workers=render_workers, initializer=warm_fonts)
+        self.render_slots = asyncio.Semaphore(render_workers)
+        self.render_queue = 0 # renders waiting or running
+        self.exp_cache = {} # (user id, server id) -> level and current exp
+        self.chat_blocks = {} # user id -> time of last exp gain
+        self.pending_exp = {} # (user id, server id) -> exp not yet written
+        self.flush_task = bot.loop.create_task(self.exp_flusher())
 
         dbs = client.database_names()
         if 'leveler' not in dbs:
             self.pop_database()
+        self.prepare_task = bot.loop.create_task(self._prepare_database())
 
     def pop_database(self):
         if os.path.exists("data/leveler/users"):
@@ -67,6 +271,67 @@ class Leveler:
                 userinfo['user_id'] = userid
                 db.users.insert_one(userinfo)
 
+    # runs once in the background, the backfill walks every user document
+    async def _prepare_database(self):
+        try:
+            await self.db.run(self._create_indexes)
+            if not self.settings.get("server_exp_migrated"):
+                await self.db.run(self._backfill_server_exp)
+                self.settings["server_exp_migrated"] = True
+                fileIO("data/leveler/settings.json", "save", self.settings)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print("Leveler: couldn't prepare the database, retrying on next load: {}".format(e))
+
+    # server_exp holds one document per (server, member), so a single compound
+    # index serves every server's leaderboard and rank counts
+    def _create_indexes(self):
+        db.users.create_index([("user_id", ASCENDING)])
+        db.users.create_index([("total_exp", DESCENDING), ("user_id", ASCENDING)])
+        db.server_exp.create_index([("server_id", ASCENDING), ("user_id", ASCENDING)], unique=True)
+        db.server_exp.create_index([("server_id", ASCENDING), ("total", DESCENDING), ("user_id", ASCENDING)])
+
+    # fills server_exp for members that earned exp before it existed, blocking
+    def _backfill_server_exp(self):
+        # per-server indexes from the old servers.<id>.total layout
+        for name in db.users.index_information():
+            if name.startswith("servers."):
+                db.users.drop_index(name)
+        batch = []
+        unset = []
+        for userinfo in db.users.find({}, {"user_id": 1, "servers": 1}):
+            stale = {}
+            for serverid, serverinfo in userinfo.get("servers", {}).items():
+                if "level" in serverinfo and "current_exp" in serverinfo:
+                    batch.append((userinfo["user_id"], serverid, serverinfo["level"], serverinfo["current_exp"]))
+                if "total" in serverinfo:
+                    stale["servers.{}.total".format(serverid)] = ""
+            if stale:
+                unset.append(UpdateOne({'_id':userinfo['_id']}, {'$unset':stale}))
+            if len(batch) >= 5000:
+                self._write_server_exp(batch)
+                batch = []
+            if len(unset) >= 5000:
+                db.users.bulk_write(unset, ordered=False)
+                unset = []
+        if batch:
+            self._write_server_exp(batch)
+        if unset:
+            db.users.bulk_write(unset, ordered=False)
+
+    def _write_server_exp(self, batch):
+        totals = self._server_totals([entry[2] for entry in batch], [entry[3] for entry in batch])
+        # chat exp written meanwhile is newer, only insert what's missing
+        requests = [UpdateOne({'server_id':serverid, 'user_id':userid}, {'$setOnInsert':{'total':total}}, upsert=True)
+            for (userid, serverid, level, current_exp), total in zip(batch, totals)]
+        try:
+            db.server_exp.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # duplicate key means a flush inserted the same member first
+            if any(error["code"] != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+
     @commands.cooldown(1, 10, commands.BucketType.user)
     @commands.command(name = "profile", pass_context=True, no_pm=True)
     async def profile(self,ctx, *, user : discord.Member=None):
@@ -79,7 +344,8 @@ class Leveler:
 
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        await self._flush_exp()
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         # check if disabled
         if server.id in self.settings["disabled_servers"]:
@@ -91,16 +357,12 @@ class Leveler:
             em = await self.profile_text(user, server, userinfo)
             await self.bot.send_message(channel, '', embed = em)
         else:
-            await self.draw_profile(user, server)
+            profile = await self.draw_profile(user, server)
             await self.bot.send_typing(channel)
-            await self.bot.send_file(channel, 'data/leveler/temp/{}_profile.png'.format(user.id), content='**User profile for {}**'.format(self._is_mention(user)))
-            db.users.update_one({'user_id':user.id}, {'$set':{
+            await self.bot.send_file(channel, profile, filename='profile.png', content='**User profile for {}**'.format(self._is_mention(user)))
+            await self.db.users.update_one({'user_id':user.id}, {'$set':{
                     "profile_block": curr_time,
                 }}, upsert = True)
-            try:
-                os.remove('data/leveler/temp/{}_profile.png'.format(user.id))
-            except:
-                pass
 
     async def profile_text(self, user, server, userinfo):
         def test_empty(text):
@@ -144,7 +406,8 @@ class Leveler:
 
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        await self._flush_exp()
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         # check if disabled
         if server.id in self.settings["disabled_servers"]:
@@ -156,16 +419,12 @@ class Leveler:
             em = await self.rank_text(user, server, userinfo)
             await self.bot.send_message(channel, '', embed = em)
         else:
-            await self.draw_rank(user, server)
+            rank = await self.draw_rank(user, server)
             await self.bot.send_typing(channel)
-            await self.bot.send_file(channel, 'data/leveler/temp/{}_rank.png'.format(user.id), content='**Ranking & Statistics for {}**'.format(self._is_mention(user)))
-            db.users.update_one({'user_id':user.id}, {'$set':{
+            await self.bot.send_file(channel, rank, filename='rank.png', content='**Ranking & Statistics for {}**'.format(self._is_mention(user)))
+            await self.db.users.update_one({'user_id':user.id}, {'$set':{
                     "rank_block".format(server.id): curr_time,
                 }}, upsert = True)
-            try:
-                os.remove('data/leveler/temp/{}_rank.png'.format(user.id))
-            except:
-                pass
 
     async def rank_text(self, user, server, userinfo):
         em = discord.Embed(description='', colour=user.colour)
@@ -177,6 +436,25 @@ class Leveler:
         em.set_thumbnail(url=user.avatar_url)
         return em
 
+    # walks the sorted collection a page at a time until 10 current members are found
+    async def _leaderboard(self, collection, query, sort_key, find_member, get_exp):
+        users = []
+        skip = 0
+        page_size = 50
+        while len(users) < 10:
+            page = await collection.find(query, {"user_id": 1, sort_key: 1},
+                sort=[(sort_key, DESCENDING), ("user_id", ASCENDING)], skip=skip, limit=page_size)
+            for userinfo in page:
+                member = find_member(userinfo["user_id"])
+                if member != None:
+                    users.append((member.name, get_exp(userinfo)))
+                if len(users) == 10:
+                    break
+            if len(page) < page_size:
+                break
+            skip += page_size
+        return users
+
     # should the user be mentioned based on settings?
     def _is_mention(self,user):
         if "mention" not in self.settings.keys() or self.settings["mention"]:
@@ -194,38 +472,16 @@ class Leveler:
             await self.bot.say("**Leveler commands for this server are disabled!**")
             return
 
-        users = []
+        await self._flush_exp()
         if global_rank == "global":
             msg = "**Global Leaderboard for {}**\n".format(self.bot.user.name)
-            # this is also terrible...
-            for userinfo in db.users.find({}):
-                try:
-                    userid = userinfo['user_id']
-                    for server in self.bot.servers:
-                        temp_user = find(lambda m: m.id == userid, server.members)
-                        if temp_user != None:
-                            break
-                    if temp_user != None:
-                        users.append((temp_user.name, userinfo["total_exp"]))
-                except:
-                    pass
-            sorted_list = sorted(users, key=operator.itemgetter(1), reverse=True)
+            users = await self._leaderboard(self.db.users, {}, "total_exp", self._find_member,
+                lambda userinfo: userinfo["total_exp"])
         else:
             msg = "**Leaderboard for {}**\n".format(server.name)
-            for userinfo in db.users.find({}):
-                try:
-                    userid = userinfo["user_id"]
-                    if "servers" in userinfo and server.id in userinfo["servers"]:
-                        temp_user = find(lambda m: m.id == userid, server.members)
-                        server_exp = 0
-                        for i in range(userinfo["servers"][server.id]["level"]):
-                            server_exp += self._required_exp(i)
-                        server_exp +=  userinfo["servers"][server.id]["current_exp"]
-                        if temp_user != None:
-                            users.append((temp_user.name, server_exp))
-                except:
-                    pass
-            sorted_list = sorted(users, key=operator.itemgetter(1), reverse=True)
+            users = await self._leaderboard(self.db.server_exp, {"server_id": server.id}, "total", server.get_member,
+                lambda entry: entry["total"])
+        sorted_list = users
 
         msg += "```ruby\n"
         rank = 1
@@ -246,7 +502,7 @@ class Leveler:
         # creates user if doesn't exist
         await self._create_user(org_user, server)
         await self._create_user(user, server)
-        org_userinfo = db.users.find_one({'user_id':org_user.id})
+        org_userinfo = await self.db.users.find_one({'user_id':org_user.id})
         curr_time = time.time()
 
         if server.id in self.settings["disabled_servers"]:
@@ -263,11 +519,11 @@ class Leveler:
 
         delta = float(curr_time) - float(org_userinfo["rep_block"])
         if delta >= 43200.0 and delta>0:
-            userinfo = db.users.find_one({'user_id':user.id})
-            db.users.update_one({'user_id':org_user.id}, {'$set':{
+            userinfo = await self.db.users.find_one({'user_id':user.id})
+            await self.db.users.update_one({'user_id':org_user.id}, {'$set':{
                     "rep_block": curr_time,
                 }})
-            db.users.update_one({'user_id':user.id}, {'$set':{
+            await self.db.users.update_one({'user_id':user.id}, {'$set':{
                     "rep":  userinfo["rep"] + 1,
                 }})
             await self.bot.say("**You have just given {} a reputation point!**".format(self._is_mention(user)))
@@ -285,7 +541,8 @@ class Leveler:
         if not user:
             user = ctx.message.author
         server = ctx.message.server
-        userinfo = db.users.find_one({'user_id':user.id})
+        await self._flush_exp()
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         server = ctx.message.server
 
@@ -300,11 +557,7 @@ class Leveler:
         msg += "Title: {}\n".format(userinfo["title"])
         msg += "Reps: {}\n".format(userinfo["rep"])
         msg += "Server Level: {}\n".format(userinfo["servers"][server.id]["level"])
-        total_server_exp = 0
-        for i in range(userinfo["servers"][server.id]["level"]):
-            total_server_exp += self._required_exp(i)
-        total_server_exp += userinfo["servers"][server.id]["current_exp"]
-        msg += "Server Exp: {}\n".format(total_server_exp)
+        msg += "Server Exp: {}\n".format(self._server_total(userinfo["servers"][server.id]))
         msg += "Total Exp: {}\n".format(userinfo["total_exp"])
         msg += "Info: {}\n".format(userinfo["info"])
         msg += "Profile background: {}\n".format(userinfo["profile_background"])
@@ -373,7 +626,7 @@ class Leveler:
         server = ctx.message.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         section = section.lower()
         default_info_color = (30, 30 ,30, 200)
@@ -446,21 +699,21 @@ class Leveler:
 
         if section == "all":
             if len(set_color) == 1:
-                db.users.update_one({'user_id':user.id}, {'$set':{
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{
                         "profile_exp_color": set_color[0],
                         "rep_color": set_color[0],
                         "badge_col_color": set_color[0],
                         "profile_info_color": set_color[0]
                     }})
             elif color == "default":
-                db.users.update_one({'user_id':user.id}, {'$set':{
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{
                         "profile_exp_color": default_exp,
                         "rep_color": default_rep,
                         "badge_col_color": default_badge,
                         "profile_info_color": default_info_color
                     }})
             elif color == "auto":
-                db.users.update_one({'user_id':user.id}, {'$set':{
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{
                         "profile_exp_color": set_color[0],
                         "rep_color": set_color[1],
                         "badge_col_color": set_color[2],
@@ -469,7 +722,7 @@ class Leveler:
             await self.bot.say("**Colors for profile set.**")
         else:
             print("update one")
-            db.users.update_one({'user_id':user.id}, {'$set':{
+            await self.db.users.update_one({'user_id':user.id}, {'$set':{
                     section_name: set_color[0]
                 }})
             await self.bot.say("**Color for profile {} set.**".format(section))
@@ -481,7 +734,7 @@ class Leveler:
         server = ctx.message.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         section = section.lower()
         default_info_color = (30, 30 ,30, 200)
@@ -539,23 +792,23 @@ class Leveler:
 
         if section == "all":
             if len(set_color) == 1:
-                db.users.update_one({'user_id':user.id}, {'$set':{
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{
                         "rank_exp_color": set_color[0],
                         "rank_info_color": set_color[0]
                     }})
             elif color == "default":
-                db.users.update_one({'user_id':user.id}, {'$set':{
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{
                         "rank_exp_color": default_exp,
                         "rank_info_color": default_info_color
                     }})
             elif color == "auto":
-                db.users.update_one({'user_id':user.id}, {'$set':{
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{
                         "rank_exp_color": set_color[0],
                         "rank_info_color": set_color[1]
                     }})
             await self.bot.say("**Colors for rank set.**")
         else:
-            db.users.update_one({'user_id':user.id}, {'$set':{
+            await self.db.users.update_one({'user_id':user.id}, {'$set':{
                     section_name: set_color[0]
                 }})
             await self.bot.say("**Color for rank {} set.**".format(section))
@@ -567,7 +820,7 @@ class Leveler:
         server = ctx.message.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         section = section.lower()
         default_info_color = (30, 30 ,30, 200)
@@ -609,7 +862,7 @@ class Leveler:
             await self.bot.say("**Not a valid color. (default, hex, white, auto)**")
             return
 
-        db.users.update_one({'user_id':user.id}, {'$set':{
+        await self.db.users.update_one({'user_id':user.id}, {'$set':{
                 section_name: set_color[0]
             }})
         await self.bot.say("**Color for level-up {} set.**".format(section))
@@ -621,8 +874,7 @@ class Leveler:
         await self.bot.say("**{}**".format(random.choice(phrases)))
         clusters = 10
 
-        async with aiohttp.get(url) as r:
-            image = await r.content.read()
+        image = await self._fetch(url)
         with open('data/leveler/temp_auto.png','wb') as f:
             f.write(image)
 
@@ -689,7 +941,7 @@ class Leveler:
         server = ctx.message.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
         max_char = 150
 
         if server.id in self.settings["disabled_servers"]:
@@ -697,7 +949,7 @@ class Leveler:
             return
 
         if len(info) < max_char:
-            db.users.update_one({'user_id':user.id}, {'$set':{"info": info}})
+            await self.db.users.update_one({'user_id':user.id}, {'$set':{"info": info}})
             await self.bot.say("**Your info section has been succesfully set!**")
         else:
             await self.bot.say("**Your description has too many characters! Must be <{}**".format(max_char))
@@ -709,7 +961,7 @@ class Leveler:
         server = ctx.message.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         if server.id in self.settings["disabled_servers"]:
             await self.bot.say("Leveler commands for this server are disabled.")
@@ -722,7 +974,7 @@ class Leveler:
 
         if image_name in self.backgrounds["levelup"].keys():
             if await self._process_purchase(ctx):
-                db.users.update_one({'user_id':user.id}, {'$set':{"levelup_background": self.backgrounds["levelup"][image_name]}})
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{"levelup_background": self.backgrounds["levelup"][image_name]}})
                 await self.bot.say("**Your new level-up background has been succesfully set!**")
         else:
             await self.bot.say("That is not a valid bg. See available bgs at `{}lvlbg list levelup`".format(prefix))
@@ -734,7 +986,7 @@ class Leveler:
         server = ctx.message.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         if server.id in self.settings["disabled_servers"]:
             await self.bot.say("Leveler commands for this server are disabled.")
@@ -747,7 +999,7 @@ class Leveler:
 
         if image_name in self.backgrounds["profile"].keys():
             if await self._process_purchase(ctx):
-                db.users.update_one({'user_id':user.id}, {'$set':{"profile_background": self.backgrounds["profile"][image_name]}})
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{"profile_background": self.backgrounds["profile"][image_name]}})
                 await self.bot.say("**Your new profile background has been succesfully set!**")
         else:
             await self.bot.say("That is not a valid bg. See available bgs at `{}lvlbg list profile`".format(prefix))
@@ -759,7 +1011,7 @@ class Leveler:
         server = ctx.message.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         if server.id in self.settings["disabled_servers"]:
             await self.bot.say("Leveler commands for this server are disabled.")
@@ -772,7 +1024,7 @@ class Leveler:
 
         if image_name in self.backgrounds["rank"].keys():
             if await self._process_purchase(ctx):
-                db.users.update_one({'user_id':user.id}, {'$set':{"rank_background": self.backgrounds["rank"][image_name]}})
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{"rank_background": self.backgrounds["rank"][image_name]}})
                 await self.bot.say("**Your new rank background has been succesfully set!**")
         else:
             await self.bot.say("That is not a valid bg. See available bgs at `{}lvlbg list rank`".format(prefix))
@@ -784,7 +1036,7 @@ class Leveler:
         server = ctx.message.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
         max_char = 20
 
         if server.id in self.settings["disabled_servers"]:
@@ -793,7 +1045,7 @@ class Leveler:
 
         if len(title) < max_char:
             userinfo["title"] = title
-            db.users.update_one({'user_id':user.id}, {'$set':{"title": title}})
+            await self.db.users.update_one({'user_id':user.id}, {'$set':{"title": title}})
             await self.bot.say("**Your title has been succesfully set!**")
         else:
             await self.bot.say("**Your title has too many characters! Must be <{}**".format(max_char))
@@ -829,13 +1081,13 @@ class Leveler:
             if "private_lvl_msg" in self.settings.keys() and server.id in self.settings["private_lvl_msg"]:
                 private_levels.append(server.name)
 
-        num_users = 0
-        for i in db.users.find({}):
-            num_users += 1
+        num_users = await self.db.users.count({})
 
         msg = ""
         msg += "**Servers:** {}\n".format(len(self.bot.servers))
         msg += "**Unique Users:** {}\n".format(num_users)
+        msg += "**Render Queue:** {}\n".format(self.render_queue)
+        msg += "**Card Cache:** {} hits, {} misses\n".format(self.card_cache.hits, self.card_cache.misses)
         if "mention" in self.settings.keys():
             msg += "**Mentions:** {}\n".format(str(self.settings["mention"]))
         msg += "**Background Price:** {}\n".format(self.settings["bg_price"])
@@ -951,9 +1203,13 @@ class Leveler:
         org_user = ctx.message.author
         server = user.server
         channel = ctx.message.channel
+        # the new level replaces any buffered exp, drop it before anything can flush it
+        self.exp_cache.pop((user.id, server.id), None)
+        self.pending_exp.pop((user.id, server.id), None)
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
+        await self._flush_exp()
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         if server.id in self.settings["disabled_servers"]:
             await self.bot.say("Leveler commands for this server are disabled.")
@@ -964,11 +1220,7 @@ class Leveler:
             return
 
         # get rid of old level exp
-        old_server_exp = 0
-        for i in range(userinfo["servers"][server.id]["level"]):
-            old_server_exp += self._required_exp(i)
-        userinfo["total_exp"] -= old_server_exp
-        userinfo["total_exp"] -= userinfo["servers"][server.id]["current_exp"]
+        userinfo["total_exp"] -= self._server_total(userinfo["servers"][server.id])
 
         # add in new exp
         total_exp = self._level_exp(level)
@@ -976,11 +1228,16 @@ class Leveler:
         userinfo["servers"][server.id]["level"] = level
         userinfo["total_exp"] += total_exp
 
-        db.users.update_one({'user_id':user.id}, {'$set':{
+        await self.db.users.update_one({'user_id':user.id}, {'$set':{
             "servers.{}.level".format(server.id): level,
             "servers.{}.current_exp".format(server.id): 0,
             "total_exp": userinfo["total_exp"]
             }})
+        await self.db.server_exp.update_one({'server_id':server.id, 'user_id':user.id},
+            {'$set':{'total':total_exp}}, upsert = True)
+        # messages handled while we waited reloaded the old level
+        self.exp_cache.pop((user.id, server.id), None)
+        self.pending_exp.pop((user.id, server.id), None)
         await self.bot.say("**{}'s Level has been set to `{}`.**".format(self._is_mention(user), level))
         await self._handle_levelup(user, userinfo, server, channel)
 
@@ -1000,12 +1257,9 @@ class Leveler:
         max_byte = 1000
 
         try:
-            async with aiohttp.get(url) as r:
-                image = await r.content.read()
-            with open('data/leveler/test.png','wb') as f:
-                f.write(image)
-            image = Image.open('data/leveler/test.png').convert('RGBA')
-            os.remove('data/leveler/test.png')
+            image = await self._fetch(url)
+            # decoded from memory, so concurrent checks don't share a temp file
+            Image.open(BytesIO(image)).convert('RGBA')
             return True
         except:
             return False
@@ -1141,7 +1395,7 @@ class Leveler:
             em = discord.Embed(description='', colour=user.colour)
             em.set_author(name="{}".format(servername), icon_url = icon_url)
             msg = ""
-            server_badge_info = db.badges.find_one({'server_id':serverid})
+            server_badge_info = await self.db.badges.find_one({'server_id':serverid})
             if server_badge_info:
                 server_badges = server_badge_info['badges']
                 for badgename in server_badges:
@@ -1182,8 +1436,8 @@ class Leveler:
             user = ctx.message.author
         server = ctx.message.server
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
-        userinfo = self._badge_convert_dict(userinfo)
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        userinfo = await self._badge_convert_dict(userinfo)
 
         # sort
         priority_badges = []
@@ -1226,9 +1480,9 @@ class Leveler:
         else:
             serverid = server.id
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
-        userinfo = self._badge_convert_dict(userinfo)
-        server_badge_info = db.badges.find_one({'server_id':serverid})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        userinfo = await self._badge_convert_dict(userinfo)
+        server_badge_info = await self.db.badges.find_one({'server_id':serverid})
 
         if server_badge_info:
             server_badges = server_badge_info['badges']
@@ -1240,7 +1494,7 @@ class Leveler:
                         await self.bot.say('**That badge is not purchasable.**'.format(name))
                     elif badge_info['price'] == 0:
                         userinfo['badges']["{}_{}".format(name,str(serverid))] = server_badges[name]
-                        db.users.update_one({'user_id':userinfo['user_id']}, {'$set':{
+                        await self.db.users.update_one({'user_id':userinfo['user_id']}, {'$set':{
                             "badges":userinfo['badges'],
                             }})
                         await self.bot.say('**`{}` has been obtained.**'.format(name))
@@ -1259,7 +1513,7 @@ class Leveler:
                             if bank.account_exists(user) and badge_info['price'] <= bank.get_balance(user):
                                 bank.withdraw_credits(user, badge_info['price'])
                                 userinfo['badges']["{}_{}".format(name,str(serverid))] = server_badges[name]
-                                db.users.update_one({'user_id':userinfo['user_id']}, {'$set':{
+                                await self.db.users.update_one({'user_id':userinfo['user_id']}, {'$set':{
                                     "badges":userinfo['badges'],
                                     }})
                                 await self.bot.say('**You have bought the `{}` badge for `{}`.**'.format(name, badge_info['price']))
@@ -1281,8 +1535,8 @@ class Leveler:
         server = ctx.message.author
         await self._create_user(user, server)
 
-        userinfo = db.users.find_one({'user_id':user.id})
-        userinfo = self._badge_convert_dict(userinfo)
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        userinfo = await self._badge_convert_dict(userinfo)
 
         if priority_num < -1 or priority_num > 5000:
             await self.bot.say("**Invalid priority number! -1-5000**")
@@ -1291,7 +1545,7 @@ class Leveler:
         for badge in userinfo['badges']:
             if userinfo['badges'][badge]['badge_name'] == name:
                 userinfo['badges'][badge]['priority_num'] = priority_num
-                db.users.update_one({'user_id':userinfo['user_id']}, {'$set':{
+                await self.db.users.update_one({'user_id':userinfo['user_id']}, {'$set':{
                     "badges":userinfo['badges'],
                     }})
                 await self.bot.say("**The `{}` badge priority has been set to `{}`!**".format(userinfo['badges'][badge]['badge_name'], priority_num))
@@ -1299,12 +1553,12 @@ class Leveler:
         else:
             await self.bot.say("**You don't have that badge!**")
 
-    def _badge_convert_dict(self, userinfo):
+    async def _badge_convert_dict(self, userinfo):
         if 'badges' not in userinfo or not isinstance(userinfo['badges'], dict):
-            db.users.update_one({'user_id':userinfo['user_id']}, {'$set':{
+            await self.db.users.update_one({'user_id':userinfo['user_id']}, {'$set':{
                 "badges":{},
                 }})
-        return db.users.find_one({'user_id':userinfo['user_id']})
+        return await self.db.users.find_one({'user_id':userinfo['user_id']})
 
     @checks.admin_or_permissions(manage_server=True)
     @lvlbadge.command(name="add", pass_context = True, no_pm=True)
@@ -1355,11 +1609,11 @@ class Leveler:
             await self.bot.say("**Description is too long! <=40**")
             return
 
-        badges = db.badges.find_one({'server_id':serverid})
+        badges = await self.db.badges.find_one({'server_id':serverid})
         if not badges:
-            db.badges.insert_one({'server_id':serverid,
+            await self.db.badges.insert_one({'server_id':serverid,
                 'badges': {}})
-            badges = db.badges.find_one({'server_id':serverid})
+            badges = await self.db.badges.find_one({'server_id':serverid})
 
         new_badge = {
                 "badge_name": name,
@@ -1375,32 +1629,34 @@ class Leveler:
         if name not in badges['badges'].keys():
             # create the badge regardless
             badges['badges'][name] = new_badge
-            db.badges.update_one({'server_id':serverid}, {'$set': {
+            await self.db.badges.update_one({'server_id':serverid}, {'$set': {
                 'badges': badges['badges']
                 }})
+            self.badge_sprites.clear()
             await self.bot.say("**`{}` Badge added in `{}` server.**".format(name, servername))
         else:
             # update badge in the server
             badges['badges'][name] = new_badge
-            db.badges.update_one({'server_id':serverid}, {'$set': {
+            await self.db.badges.update_one({'server_id':serverid}, {'$set': {
                 'badges': badges['badges']
                 }})
 
             # go though all users and update the badge. Doing it this way because dynamic does more accesses when doing profile
-            for user in db.users.find({}):
+            badge_name = "{}_{}".format(name, serverid)
+            for user in await self.db.users.find({"badges.{}".format(badge_name): {"$exists": True}}):
                 try:
-                    user = self._badge_convert_dict(user)
+                    user = await self._badge_convert_dict(user)
                     userbadges = user['badges']
-                    badge_name = "{}_{}".format(name, serverid)
                     if badge_name in userbadges.keys():
                         user_priority_num = userbadges[badge_name]['priority_num']
                         new_badge['priority_num'] = user_priority_num # maintain old priority number set by user
                         userbadges[badge_name] = new_badge
-                        db.users.update_one({'user_id':user['user_id']}, {'$set': {
+                        await self.db.users.update_one({'user_id':user['user_id']}, {'$set': {
                             'badges': userbadges
                             }})
                 except:
                     pass
+            self.badge_sprites.clear()
             await self.bot.say("**The `{}` badge has been updated**".format(name))
 
     @checks.is_owner()
@@ -1439,28 +1695,29 @@ class Leveler:
 
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
-        userinfo = self._badge_convert_dict(userinfo)
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        userinfo = await self._badge_convert_dict(userinfo)
 
         if server.id in self.settings["disabled_servers"]:
             await self.bot.say("Leveler commands for this server are disabled.")
             return
 
-        serverbadges = db.badges.find_one({'server_id':serverid})
+        serverbadges = await self.db.badges.find_one({'server_id':serverid})
         if name in serverbadges['badges'].keys():
             del serverbadges['badges'][name]
-            db.badges.update_one({'server_id':serverbadges['server_id']}, {'$set':{
+            await self.db.badges.update_one({'server_id':serverbadges['server_id']}, {'$set':{
                 "badges":serverbadges["badges"],
                 }})
+            self.badge_sprites.clear()
             # remove the badge if there
-            for user_info_temp in db.users.find({}):
+            badge_name = "{}_{}".format(name, serverid)
+            for user_info_temp in await self.db.users.find({"badges.{}".format(badge_name): {"$exists": True}}):
                 try:
-                    user_info_temp = self._badge_convert_dict(user_info_temp)
+                    user_info_temp = await self._badge_convert_dict(user_info_temp)
 
-                    badge_name = "{}_{}".format(name, serverid)
                     if badge_name in user_info_temp["badges"].keys():
                         del user_info_temp["badges"][badge_name]
-                        db.users.update_one({'user_id':user_info_temp['user_id']}, {'$set':{
+                        await self.db.users.update_one({'user_id':user_info_temp['user_id']}, {'$set':{
                             "badges":user_info_temp["badges"],
                             }})
                 except:
@@ -1478,14 +1735,14 @@ class Leveler:
         server = org_user.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
-        userinfo = self._badge_convert_dict(userinfo)
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        userinfo = await self._badge_convert_dict(userinfo)
 
         if server.id in self.settings["disabled_servers"]:
             await self.bot.say("Leveler commands for this server are disabled.")
             return
 
-        serverbadges = db.badges.find_one({'server_id':server.id})
+        serverbadges = await self.db.badges.find_one({'server_id':server.id})
         badges = serverbadges['badges']
         badge_name = "{}_{}".format(name, server.id)
 
@@ -1497,7 +1754,7 @@ class Leveler:
             return
         else:
             userinfo["badges"][badge_name] = badges[name]
-            db.users.update_one({'user_id':user.id}, {'$set':{"badges": userinfo["badges"]}})
+            await self.db.users.update_one({'user_id':user.id}, {'$set':{"badges": userinfo["badges"]}})
             await self.bot.say("**{} has just given `{}` the `{}` badge!**".format(self._is_mention(org_user), self._is_mention(user), name))
 
     @checks.admin_or_permissions(manage_server=True)
@@ -1508,14 +1765,14 @@ class Leveler:
         server = org_user.server
         # creates user if doesn't exist
         await self._create_user(user, server)
-        userinfo = db.users.find_one({'user_id':user.id})
-        userinfo = self._badge_convert_dict(userinfo)
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        userinfo = await self._badge_convert_dict(userinfo)
 
         if server.id in self.settings["disabled_servers"]:
             await self.bot.say("Leveler commands for this server are disabled.")
             return
 
-        serverbadges = db.badges.find_one({'server_id':server.id})
+        serverbadges = await self.db.badges.find_one({'server_id':server.id})
         badges = serverbadges['badges']
         badge_name = "{}_{}".format(name, server.id)
 
@@ -1526,7 +1783,7 @@ class Leveler:
         else:
             if userinfo['badges'][badge_name]['price'] == -1:
                 del userinfo["badges"][badge_name]
-                db.users.update_one({'user_id':user.id}, {'$set':{"badges": userinfo["badges"]}})
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{"badges": userinfo["badges"]}})
                 await self.bot.say("**{} has taken the `{}` badge from {}! :upside_down:**".format(self._is_mention(org_user), name, self._is_mention(user)))
             else:
                 await self.bot.say("**You can't take away purchasable badges!**")
@@ -1669,240 +1926,13 @@ class Leveler:
                 await self.bot.say("**Invalid Background Type. (profile, rank, levelup)**")
 
     async def draw_profile(self, user, server):
-        name_fnt = ImageFont.truetype(font_bold_file, 22)
-        header_u_fnt = ImageFont.truetype(font_unicode_file, 18)
-        title_fnt = ImageFont.truetype(font_file, 18)
-        sub_header_fnt = ImageFont.truetype(font_bold_file, 14)
-        badge_fnt = ImageFont.truetype(font_bold_file, 10)
-        exp_fnt = ImageFont.truetype(font_bold_file, 13)
-        large_fnt = ImageFont.truetype(font_bold_file, 33)
-        level_label_fnt = ImageFont.truetype(font_bold_file, 22)
-        general_info_fnt = ImageFont.truetype(font_bold_file, 15)
-        general_info_u_fnt = ImageFont.truetype(font_unicode_file, 12)
-        rep_fnt = ImageFont.truetype(font_bold_file, 26)
-        text_fnt = ImageFont.truetype(font_bold_file, 12)
-        text_u_fnt = ImageFont.truetype(font_unicode_file, 8)
-        credit_fnt = ImageFont.truetype(font_bold_file, 10)
-
-        def _write_unicode(text, init_x, y, font, unicode_font, fill):
-            write_pos = init_x
-
-            for char in text:
-                if char.isalnum() or char in string.punctuation or char in string.whitespace:
-                    draw.text((write_pos, y), char, font=font, fill=fill)
-                    write_pos += font.getsize(char)[0]
-                else:
-                    draw.text((write_pos, y), u"{}".format(char), font=unicode_font, fill=fill)
-                    write_pos += unicode_font.getsize(char)[0]
-
-        # get urls
-        userinfo = db.users.find_one({'user_id':user.id})
-        self._badge_convert_dict(userinfo)
-        userinfo = db.users.find_one({'user_id':user.id}) ##############################################
-        bg_url = userinfo["profile_background"]
-        profile_url = user.avatar_url
-
-        # create image objects
-        bg_image = Image
-        profile_image = Image
-
-        async with aiohttp.get(bg_url) as r:
-            image = await r.content.read()
-        with open('data/leveler/temp/{}_temp_profile_bg.png'.format(user.id),'wb') as f:
-            f.write(image)
-        try:
-            async with aiohttp.get(profile_url) as r:
-                image = await r.content.read()
-        except:
-            async with aiohttp.get(default_avatar_url) as r:
-                image = await r.content.read()
-        with open('data/leveler/temp/{}_temp_profile_profile.png'.format(user.id),'wb') as f:
-            f.write(image)
-
-        bg_image = Image.open('data/leveler/temp/{}_temp_profile_bg.png'.format(user.id)).convert('RGBA')
-        profile_image = Image.open('data/leveler/temp/{}_temp_profile_profile.png'.format(user.id)).convert('RGBA')
-
-        # set canvas
-        bg_color = (255,255,255,0)
-        result = Image.new('RGBA', (290, 290), bg_color)
-        process = Image.new('RGBA', (290, 290), bg_color)
-
-        # draw
-        draw = ImageDraw.Draw(process)
-
-        # puts in background
-        bg_image = bg_image.resize((290, 290), Image.ANTIALIAS)
-        bg_image = bg_image.crop((0,0, 290, 290))
-        result.paste(bg_image, (0,0))
-
-        # draw filter
-        draw.rectangle([(0,0),(290, 290)], fill=(0,0,0,10))
-
-        # draw transparent overlay
-        vert_pos = 110
-        left_pos = 70
-        right_pos = 285
-        title_height = 22
-        gap = 3
-
-        # determines rep section color
-        if "rep_color" not in userinfo.keys() or not userinfo["rep_color"]:
-            rep_fill = (92,130,203,230)
-        else:
-            rep_fill = tuple(userinfo["rep_color"])
-        # determines badge section color, should be behind the titlebar
-        if "badge_col_color" not in userinfo.keys() or not userinfo["badge_col_color"]:
-            badge_fill = (128,151,165,230)
-        else:
-            badge_fill = tuple(userinfo["badge_col_color"])
-
-        if "profile_info_color" in userinfo.keys():
-            info_color = tuple(userinfo["profile_info_color"])
-        else:
-            info_color = (30, 30 ,30, 220)
-
-        draw.rectangle([(left_pos - 20, vert_pos + title_height), (right_pos, 156)], fill=info_color) # title box
-        draw.rectangle([(100,159), (285, 212)], fill=info_color) # general content
-        draw.rectangle([(100,215), (285, 285)], fill=info_color) # info content
-
-        # stick in credits if needed
-        if bg_url in bg_credits.keys():
-            credit_text = "  ".join("Background by {}".format(bg_credits[bg_url]))
-            credit_init = 290 - credit_fnt.getsize(credit_text)[0]
-            draw.text((credit_init, 0), credit_text,  font=credit_fnt, fill=(0,0,0,100))
-        draw.rectangle([(5, vert_pos), (right_pos, vert_pos + title_height)], fill=(230,230,230,230)) # name box in front
-
-        # draw level circle
-        multiplier = 8
-        lvl_circle_dia = 104
-        circle_left = 1
-        circle_top = 42
-        raw_length = lvl_circle_dia * multiplier
-
-        # create mask
-        mask = Image.new('L', (raw_length, raw_length), 0)
-        draw_thumb = ImageDraw.Draw(mask)
-        draw_thumb.ellipse((0, 0) + (raw_length, raw_length), fill = 255, outline = 0)
-
-        # drawing level bar calculate angle
-        start_angle = -90 # from top instead of 3oclock
-        angle = int(360 * (userinfo["servers"][server.id]["current_exp"]/self._required_exp(userinfo["servers"][server.id]["level"]))) + start_angle
-
-        # level outline
-        lvl_circle = Image.new("RGBA", (raw_length, raw_length))
-        draw_lvl_circle = ImageDraw.Draw(lvl_circle)
-        draw_lvl_circle.ellipse([0, 0, raw_length, raw_length], fill=(badge_fill[0], badge_fill[1], badge_fill[2], 180), outline = (255, 255, 255, 250))
-        # determines exp bar color
-        if "profile_exp_color" not in userinfo.keys() or not userinfo["profile_exp_color"]:
-            exp_fill = (255, 255, 255, 230)
-        else:
-            exp_fill = tuple(userinfo["profile_exp_color"])
-        draw_lvl_circle.pieslice([0, 0, raw_length, raw_length], start_angle, angle, fill=exp_fill, outline = (255, 255, 255, 255))
-        # put on level bar circle
-        lvl_circle = lvl_circle.resize((lvl_circle_dia, lvl_circle_dia), Image.ANTIALIAS)
-        lvl_bar_mask = mask.resize((lvl_circle_dia, lvl_circle_dia), Image.ANTIALIAS)
-        process.paste(lvl_circle, (circle_left, circle_top), lvl_bar_mask)
-
-        # draws boxes
-        draw.rectangle([(5,133), (100, 285)], fill= badge_fill) # badges
-        draw.rectangle([(10,138), (95, 168)], fill = rep_fill) # reps
-
-        total_gap = 10
-        border = int(total_gap/2)
-        profile_size = lvl_circle_dia - total_gap
-        raw_length = profile_size * multiplier
-        # put in profile picture
-        output = ImageOps.fit(profile_image, (raw_length, raw_length), centering=(0.5, 0.5))
-        output = output.resize((profile_size, profile_size), Image.ANTIALIAS)
-        mask = mask.resize((profile_size, profile_size), Image.ANTIALIAS)
-        profile_image = profile_image.resize((profile_size, profile_size), Image.ANTIALIAS)
-        process.paste(profile_image, (circle_left + border, circle_top + border), mask)
-
-        # write label text
-        white_color = (240,240,240,255)
-        light_color = (160,160,160,255)
-
-        head_align = 105
-        _write_unicode(self._truncate_text(self._name(user, 22), 22), head_align, vert_pos + 3, level_label_fnt, header_u_fnt, (110,110,110,255)) # NAME
-        _write_unicode(userinfo["title"], head_align, 136, level_label_fnt, header_u_fnt, white_color)
-
-        # draw level box
-        level_right = 290
-        level_left = level_right - 78
-        draw.rectangle([(level_left, 0), (level_right, 21)], fill=(badge_fill[0],badge_fill[1],badge_fill[2],160)) # box
-        lvl_text = "LEVEL {}".format(userinfo["servers"][server.id]["level"])
-        if badge_fill == (128,151,165,230):
-            lvl_color = white_color
-        else:
-            lvl_color = self._contrast(badge_fill, rep_fill, exp_fill)
-        draw.text((self._center(level_left+2, level_right, lvl_text, level_label_fnt), 2), lvl_text,  font=level_label_fnt, fill=(lvl_color[0],lvl_color[1],lvl_color[2],255)) # Level #
-
-        rep_text = "{} REP".format(userinfo["rep"])
-        draw.text((self._center(7, 100, rep_text, rep_fnt), 144), rep_text, font=rep_fnt, fill=white_color)
-
-        exp_text = "{}/{}".format(userinfo["servers"][server.id]["current_exp"],self._required_exp(userinfo["servers"][server.id]["level"])) # Exp
-        exp_color = exp_fill
-        draw.text((105, 99), exp_text,  font=exp_fnt, fill=(exp_color[0], exp_color[1], exp_color[2], 255)) # Exp Text
-
-        # determine info text color
-        dark_text = (35, 35, 35, 230)
-        info_text_color = self._contrast(info_color, light_color, dark_text)
-
-        lvl_left = 100
-        label_align = 105
-        _write_unicode(u"Rank:", label_align, 165, general_info_fnt, general_info_u_fnt, info_text_color)
-        draw.text((label_align, 180), "Exp:",  font=general_info_fnt, fill=info_text_color) # Exp
-        draw.text((label_align, 195), "Credits:",  font=general_info_fnt, fill=info_text_color) # Credits
-
-        # local stats
-        num_local_align = 172
-        local_symbol = u"\U0001F3E0 "
-        if "linux" in platform.system().lower():
-            local_symbol = u"\U0001F3E0 "
-        else:
-            local_symbol = "S "
-
-        s_rank_txt = local_symbol + self._truncate_text("#{}".format(await self._find_server_rank(user, server)), 8)
-        _write_unicode(s_rank_txt, num_local_align - general_info_u_fnt.getsize(local_symbol)[0], 165, general_info_fnt, general_info_u_fnt, info_text_color) # Rank
-
-        s_exp_txt = self._truncate_text("{}".format(await self._find_server_exp(user, server)), 8)
-        _write_unicode(s_exp_txt, num_local_align, 180, general_info_fnt, general_info_u_fnt, info_text_color)  # Exp
-        try:
-            bank = self.bot.get_cog('Economy').bank
-            if bank.account_exists(user):
-                credits = bank.get_balance(user)
-            else:
-                credits = 0
-        except:
-            credits = 0
-        credit_txt = "${}".format(credits)
-        draw.text((num_local_align, 195), self._truncate_text(credit_txt, 18),  font=general_info_fnt, fill=info_text_color) # Credits
-
-        # global stats
-        num_align = 230
-        if "linux" in platform.system().lower():
-            global_symbol = u"\U0001F30E "
-            fine_adjust = 1
-        else:
-            global_symbol = "G "
-            fine_adjust = 0
-
-        rank_txt = global_symbol + self._truncate_text("#{}".format(await self._find_global_rank(user, server)), 8)
-        exp_txt = self._truncate_text("{}".format(userinfo["total_exp"]), 8)
-        _write_unicode(rank_txt, num_align - general_info_u_fnt.getsize(global_symbol)[0] + fine_adjust, 165, general_info_fnt, general_info_u_fnt, info_text_color) # Rank
-        _write_unicode(exp_txt, num_align, 180, general_info_fnt, general_info_u_fnt, info_text_color)  # Exp
-
-        draw.text((105, 220), "Info Box",  font=sub_header_fnt, fill=white_color) # Info Box
-        margin = 105
-        offset = 238
-        for line in textwrap.wrap(userinfo["info"], width=42):
-            # draw.text((margin, offset), line, font=text_fnt, fill=(70,70,70,255))
-            _write_unicode(line, margin, offset, text_fnt, text_u_fnt, info_text_color)
-            offset += text_fnt.getsize(line)[1] + 2
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        await self._badge_convert_dict(userinfo)
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        badge_type = self.settings.get("badge_type", "circles")
 
         # sort badges
         priority_badges = []
-
         for badgename in userinfo['badges'].keys():
             badge = userinfo['badges'][badgename]
             priority_num = badge["priority_num"]
@@ -1910,494 +1940,300 @@ class Leveler:
                 priority_badges.append((badge, priority_num))
         sorted_badges = sorted(priority_badges, key=operator.itemgetter(1), reverse=True)
 
-        # TODO: simplify this. it shouldn't be this complicated... sacrifices conciseness for customizability
-        if "badge_type" not in self.settings.keys() or self.settings["badge_type"] == "circles":
-            # circles require antialiasing
-            vert_pos = 171
-            right_shift = 0
-            left = 9 + right_shift
-            right = 52 + right_shift
-            size = 27
-            total_gap = 4 # /2
-            hor_gap = 3
-            vert_gap = 2
-            border_width = int(total_gap/2)
-            mult = [
-                (0,0), (1,0), (2,0),
-                (0,1), (1,1), (2,1),
-                (0,2), (1,2), (2,2),
-                (0,3), (1,3), (2,3),
-                ]
-            i = 0
-            for pair in sorted_badges[:12]:
-                try:
-                    coord = (left + int(mult[i][0])*int(hor_gap+size), vert_pos + int(mult[i][1])*int(vert_gap + size))
-                    badge = pair[0]
-                    bg_color = badge["bg_img"]
-                    border_color = badge["border_color"]
-                    multiplier = 6 # for antialiasing
-                    raw_length = size * multiplier
-
-                    # draw mask circle
-                    mask = Image.new('L', (raw_length, raw_length), 0)
-                    draw_thumb = ImageDraw.Draw(mask)
-                    draw_thumb.ellipse((0, 0) + (raw_length, raw_length), fill = 255, outline = 0)
-
-                    # determine image or color for badge bg
-                    if await self._valid_image_url(bg_color):
-                        # get image
-                        async with aiohttp.get(bg_color) as r:
-                            image = await r.content.read()
-                        with open('data/leveler/temp/{}_temp_badge.png'.format(user.id),'wb') as f:
-                            f.write(image)
-                        badge_image = Image.open('data/leveler/temp/{}_temp_badge.png'.format(user.id)).convert('RGBA')
-                        badge_image = badge_image.resize((raw_length, raw_length), Image.ANTIALIAS)
-
-                        # structured like this because if border = 0, still leaves outline.
-                        if border_color:
-                            square = Image.new('RGBA', (raw_length, raw_length), border_color)
-                            # put border on ellipse/circle
-                            output = ImageOps.fit(square, (raw_length, raw_length), centering=(0.5, 0.5))
-                            output = output.resize((size, size), Image.ANTIALIAS)
-                            outer_mask = mask.resize((size, size), Image.ANTIALIAS)
-                            process.paste(output, coord, outer_mask)
-
-                            # put on ellipse/circle
-                            output = ImageOps.fit(badge_image, (raw_length, raw_length), centering=(0.5, 0.5))
-                            output = output.resize((size - total_gap, size - total_gap), Image.ANTIALIAS)
-                            inner_mask = mask.resize((size - total_gap, size - total_gap), Image.ANTIALIAS)
-                            process.paste(output, (coord[0] + border_width, coord[1] + border_width), inner_mask)
-                        else:
-                            # put on ellipse/circle
-                            output = ImageOps.fit(badge_image, (raw_length, raw_length), centering=(0.5, 0.5))
-                            output = output.resize((size, size), Image.ANTIALIAS)
-                            outer_mask = mask.resize((size, size), Image.ANTIALIAS)
-                            process.paste(output, coord, outer_mask)
-                except:
-                    pass
-                # attempt to remove badge image
-                try:
-                    os.remove('data/leveler/temp/{}_temp_badge.png'.format(user.id))
-                except:
-                    pass
-                i += 1
-        elif self.settings["badge_type"] == "tags" or self.settings["badge_type"] == "bars":
-            vert_pos = 187
-            i = 0
-            for pair in sorted_badges[:5]:
-                badge = pair[0]
-                print(badge)
-                bg_color = badge["bg_img"]
-                border_color = badge["border_color"]
-                left_pos = 10
-                right_pos = 95
-                total_gap = 4
-                border_width = int(total_gap/2)
-                bar_size = (85, 15)
-
-                # determine image or color for badge bg
-                if await self._valid_image_url(bg_color):
-                    async with aiohttp.get(bg_color) as r:
-                        image = await r.content.read()
-                    with open('data/leveler/temp/{}_temp_badge.png'.format(user.id),'wb') as f:
-                        f.write(image)
-                    badge_image = Image.open('data/leveler/temp/{}_temp_badge.png'.format(user.id)).convert('RGBA')
-
-                    if border_color != None:
-                        draw.rectangle([(left_pos, vert_pos + i*17), (right_pos, vert_pos + 15 + i*17)], fill = border_color, outline = border_color) # border
-                        badge_image = badge_image.resize((bar_size[0] - total_gap + 1, bar_size[1] - total_gap + 1), Image.ANTIALIAS)
-                        process.paste(badge_image, (left_pos + border_width, vert_pos + border_width + i*17))
-                    else:
-                        badge_image = badge_image.resize(bar_size, Image.ANTIALIAS)
-                        process.paste(badge_image, (left_pos,vert_pos + i*17))
-                    try:
-                        os.remove('data/leveler/temp/{}_temp_badge.png'.format(user.id))
-                    except:
-                        pass
-
-                vert_pos += 3 # spacing
-                i += 1
-
-        result = Image.alpha_composite(result, process)
-        result.save('data/leveler/temp/{}_profile.png'.format(user.id),'PNG', quality=100)
-
-        # remove images
-        try:
-            os.remove('data/leveler/temp/{}_temp_profile_bg.png'.format(user.id))
-        except:
-            pass
-        try:
-            os.remove('data/leveler/temp/{}_temp_profile_profile.png'.format(user.id))
-        except:
-            pass
-
-    # returns color that contrasts better in background
-    def _contrast(self, bg_color, color1, color2):
-        color1_ratio = self._contrast_ratio(bg_color, color1)
-        color2_ratio = self._contrast_ratio(bg_color, color2)
-        if color1_ratio >= color2_ratio:
-            return color1
+        # circles are drawn 6x size for antialiasing, bars are resized when the sprite is made
+        if badge_type == "circles":
+            sorted_badges = sorted_badges[:12]
+            badge_size = (27*6, 27*6)
         else:
-            return color2
-
-    def _luminance(self, color):
-        # convert to greyscale
-        luminance = float((0.2126*color[0]) + (0.7152*color[1]) + (0.0722*color[2]))
-        return luminance
+            sorted_badges = sorted_badges[:5]
+            badge_size = None
+
+        spec = {
+            "userinfo": userinfo,
+            "server_id": server.id,
+            "name": self._name(user, 22),
+            "required_exp": self._required_exp(userinfo["servers"][server.id]["level"]),
+            "server_rank": await self._find_server_rank(user, server),
+            "server_exp": await self._find_server_exp(user, server),
+            "global_rank": await self._find_global_rank(user, server),
+            "credits": self._get_credits(user),
+            "badge_type": badge_type
+            }
+        key = self._card_key("profile", spec, user, [(badge["bg_img"], badge["border_color"]) for badge, priority_num in sorted_badges])
+        card = await self.card_cache.get(key)
+        if card is None:
+            spec["bg_image"] = await self._get_image(userinfo["profile_background"], (290, 290))
+            spec["profile_image"] = await self._get_image(user.avatar_url, (94, 94), default_avatar_url)
+            spec["badges"] = []
+            for badge, priority_num in sorted_badges:
+                spec["badges"].append(await self._get_badge_sprite(badge, badge_type, badge_size))
+            card = await self._run_render(render_profile, spec)
+            await self.card_cache.set(key, card)
+        return BytesIO(card)
 
-    def _contrast_ratio(self, bgcolor, foreground):
-        f_lum = float(self._luminance(foreground)+0.05)
-        bg_lum = float(self._luminance(bgcolor)+0.05)
+    async def draw_rank(self, user, server):
+        userinfo = await self.db.users.find_one({'user_id':user.id})
+        server_size = 55*6 # drawn 6x size for antialiasing
+
+        spec = {
+            "userinfo": userinfo,
+            "server_id": server.id,
+            "name": self._name(user, 20),
+            "required_exp": self._required_exp(userinfo["servers"][server.id]["level"]),
+            "server_rank": await self._find_server_rank(user, server),
+            "server_exp": await self._find_server_exp(user, server),
+            "credits": self._get_credits(user)
+            }
+        key = self._card_key("rank", spec, user, server.icon_url)
+        card = await self.card_cache.get(key)
+        if card is None:
+            spec["bg_image"] = await self._get_image(userinfo["rank_background"], (360, 100))
+            spec["profile_image"] = await self._get_image(user.avatar_url, (84, 84), default_avatar_url)
+            spec["server_image"] = await self._get_image(server.icon_url, (server_size, server_size), default_avatar_url)
+            card = await self._run_render(render_rank, spec)
+            await self.card_cache.set(key, card)
+        return BytesIO(card)
+
+    # the spec without images, reduced to what is drawn, plus the urls of the images
+    def _card_key(self, kind, spec, user, extra):
+        userinfo = spec["userinfo"]
+        serverinfo = userinfo["servers"][spec["server_id"]]
+        inputs = {field: userinfo.get(field) for field in card_fields}
+        inputs["level"] = serverinfo["level"]
+        inputs["current_exp"] = serverinfo["current_exp"]
+        for name, value in spec.items():
+            if name != "userinfo":
+                inputs[name] = value
+        inputs["avatar_url"] = user.avatar_url
+        inputs["extra"] = extra
+        return card_key(kind, inputs)
 
-        if bg_lum > f_lum:
-            return bg_lum/f_lum
-        else:
-            return f_lum/bg_lum
+    async def draw_levelup(self, user, server):
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
-    # returns a string with possibly a nickname
-    def _name(self, user, max_length):
-        if user.name == user.display_name:
-            return user.name
-        else:
-            return "{} ({})".format(user.name, self._truncate_text(user.display_name, max_length - len(user.name) - 3), max_length)
+        spec = {
+            "userinfo": userinfo,
+            "server_id": server.id,
+            "bg_image": await self._get_image(userinfo["levelup_background"], (85, 105)),
+            "profile_image": await self._get_image(user.avatar_url, (50, 50), default_avatar_url)
+            }
+        return await self._render(render_levelup, spec)
 
-    async def draw_rank(self, user, server):
+    # runs a render function in the worker pool, at most render_workers at a time
+    async def _render(self, render, spec):
+        return BytesIO(await self._run_render(render, spec))
 
-        # fonts
-        name_fnt = ImageFont.truetype(font_bold_file, 22)
-        header_u_fnt = ImageFont.truetype(font_unicode_file, 18)
-        sub_header_fnt = ImageFont.truetype(font_bold_file, 14)
-        badge_fnt = ImageFont.truetype(font_bold_file, 12)
-        large_fnt = ImageFont.truetype(font_bold_file, 33)
-        level_label_fnt = ImageFont.truetype(font_bold_file, 22)
-        general_info_fnt = ImageFont.truetype(font_bold_file, 15)
-        general_info_u_fnt = ImageFont.truetype(font_unicode_file, 11)
-        credit_fnt = ImageFont.truetype(font_bold_file, 10)
-
-        def _write_unicode(text, init_x, y, font, unicode_font, fill):
-            write_pos = init_x
-
-            for char in text:
-                if char.isalnum() or char in string.punctuation or char in string.whitespace:
-                    draw.text((write_pos, y), char, font=font, fill=fill)
-                    write_pos += font.getsize(char)[0]
-                else:
-                    draw.text((write_pos, y), u"{}".format(char), font=unicode_font, fill=fill)
-                    write_pos += unicode_font.getsize(char)[0]
-
-        userinfo = db.users.find_one({'user_id':user.id})
-        # get urls
-        bg_url = userinfo["rank_background"]
-        profile_url = user.avatar_url
-        server_icon_url = server.icon_url
-
-        # create image objects
-        bg_image = Image
-        profile_image = Image
-
-        async with aiohttp.get(bg_url) as r:
-            image = await r.content.read()
-        with open('data/leveler/temp/{}_temp_rank_bg.png'.format(user.id),'wb') as f:
-            f.write(image)
+    async def _run_render(self, func, *args):
+        self.render_queue += 1
         try:
-            async with aiohttp.get(profile_url) as r:
-                image = await r.content.read()
-        except:
-            async with aiohttp.get(default_avatar_url) as r:
-                image = await r.content.read()
-        with open('data/leveler/temp/{}_temp_rank_profile.png'.format(user.id),'wb') as f:
-            f.write(image)
+            async with self.render_slots:
+                return await self.bot.loop.run_in_executor(self.render_pool, partial(func, *args))
+        finally:
+            self.render_queue -= 1
+
+    # badge layers are rendered once per badge and reused by every profile
+    async def _get_badge_sprite(self, badge, badge_type, badge_size):
+        key = (badge["bg_img"], badge["border_color"], badge_type)
+        if key in self.badge_sprites:
+            return self.badge_sprites[key]
         try:
-            async with aiohttp.get(server_icon_url) as r:
-                image = await r.content.read()
+            badge_image = await self._get_image(badge["bg_img"], badge_size)
         except:
-            async with aiohttp.get(default_avatar_url) as r:
-                image = await r.content.read()
-        with open('data/leveler/temp/{}_temp_server_icon.png'.format(user.id),'wb') as f:
-            f.write(image)
+            # invalid urls and colors are retried, they might be fixed later
+            return None
+        sprite = await self._run_render(render_badge_sprite, badge_image, badge["border_color"], badge_type)
+        self.badge_sprites[key] = sprite
+        return sprite
 
-        bg_image = Image.open('data/leveler/temp/{}_temp_rank_bg.png'.format(user.id)).convert('RGBA')
-        profile_image = Image.open('data/leveler/temp/{}_temp_rank_profile.png'.format(user.id)).convert('RGBA')
-        server_image = Image.open('data/leveler/temp/{}_temp_server_icon.png'.format(user.id)).convert('RGBA')
-
-        # set canvas
-        width = 360
-        height = 100
-        bg_color = (255,255,255, 0)
-        result = Image.new('RGBA', (width, height), bg_color)
-        process = Image.new('RGBA', (width, height), bg_color)
-
-        # puts in background
-        bg_image = bg_image.resize((width, height), Image.ANTIALIAS)
-        bg_image = bg_image.crop((0,0, width, height))
-        result.paste(bg_image, (0,0))
-
-        # draw
-        draw = ImageDraw.Draw(process)
-
-        # draw transparent overlay
-        vert_pos = 5
-        left_pos = 70
-        right_pos = width - vert_pos
-        title_height = 22
-        gap = 3
-
-        draw.rectangle([(left_pos - 20,vert_pos), (right_pos, vert_pos + title_height)], fill=(230,230,230,230)) # title box
-        content_top = vert_pos + title_height + gap
-        content_bottom = 100 - vert_pos
-
-        if "rank_info_color" in userinfo.keys():
-            info_color = tuple(userinfo["rank_info_color"])
-            info_color = (info_color[0], info_color[1], info_color[2], 160) # increase transparency
-        else:
-            info_color = (30, 30 ,30, 160)
-        draw.rectangle([(left_pos - 20, content_top), (right_pos, content_bottom)], fill=info_color, outline=(180, 180, 180, 180)) # content box
-
-        # stick in credits if needed
-        if bg_url in bg_credits.keys():
-            credit_text = " ".join("{}".format(bg_credits[bg_url]))
-            draw.text((2, 92), credit_text,  font=credit_fnt, fill=(0,0,0,190))
-
-        # draw level circle
-        multiplier = 6
-        lvl_circle_dia = 94
-        circle_left = 15
-        circle_top = int((height- lvl_circle_dia)/2)
-        raw_length = lvl_circle_dia * multiplier
-
-        # create mask
-        mask = Image.new('L', (raw_length, raw_length), 0)
-        draw_thumb = ImageDraw.Draw(mask)
-        draw_thumb.ellipse((0, 0) + (raw_length, raw_length), fill = 255, outline = 0)
-
-        # drawing level bar calculate angle
-        start_angle = -90 # from top instead of 3oclock
-        angle = int(360 * (userinfo["servers"][server.id]["current_exp"]/self._required_exp(userinfo["servers"][server.id]["level"]))) + start_angle
-
-        lvl_circle = Image.new("RGBA", (raw_length, raw_length))
-        draw_lvl_circle = ImageDraw.Draw(lvl_circle)
-        draw_lvl_circle.ellipse([0, 0, raw_length, raw_length], fill=(180, 180, 180, 180), outline = (255, 255, 255, 220))
-        # determines exp bar color
-        if "rank_exp_color" not in userinfo.keys() or not userinfo["rank_exp_color"]:
-            exp_fill = (255, 255, 255, 230)
-        else:
-            exp_fill = tuple(userinfo["rank_exp_color"])
-        draw_lvl_circle.pieslice([0, 0, raw_length, raw_length], start_angle, angle, fill=exp_fill, outline = (255, 255, 255, 230))
-        # put on level bar circle
-        lvl_circle = lvl_circle.resize((lvl_circle_dia, lvl_circle_dia), Image.ANTIALIAS)
-        lvl_bar_mask = mask.resize((lvl_circle_dia, lvl_circle_dia), Image.ANTIALIAS)
-        process.paste(lvl_circle, (circle_left, circle_top), lvl_bar_mask)
-
-        # draws mask
-        total_gap = 10
-        border = int(total_gap/2)
-        profile_size = lvl_circle_dia - total_gap
-        raw_length = profile_size * multiplier
-        # put in profile picture
-        output = ImageOps.fit(profile_image, (raw_length, raw_length), centering=(0.5, 0.5))
-        output = output.resize((profile_size, profile_size), Image.ANTIALIAS)
-        mask = mask.resize((profile_size, profile_size), Image.ANTIALIAS)
-        profile_image = profile_image.resize((profile_size, profile_size), Image.ANTIALIAS)
-        process.paste(profile_image, (circle_left + border, circle_top + border), mask)
-
-        # draw level box
-        level_left = 274
-        level_right = right_pos
-        draw.rectangle([(level_left, vert_pos), (level_right, vert_pos + title_height)], fill="#AAA") # box
-        lvl_text = "LEVEL {}".format(userinfo["servers"][server.id]["level"])
-        draw.text((self._center(level_left, level_right, lvl_text, level_label_fnt), vert_pos + 3), lvl_text,  font=level_label_fnt, fill=(110,110,110,255)) # Level #
-
-        # labels text colors
-        white_text = (240,240,240,255)
-        dark_text = (35, 35, 35, 230)
-        label_text_color = self._contrast(info_color, white_text, dark_text)
-
-        # draw text
-        grey_color = (110,110,110,255)
-        white_color = (230,230,230,255)
-
-        # put in server picture
-        server_size = content_bottom - content_top - 10
-        server_border_size = server_size + 4
-        radius = 20
-        light_border = (150,150,150,180)
-        dark_border = (90,90,90,180)
-        border_color = self._contrast(info_color, light_border, dark_border)
-
-        draw_server_border = Image.new('RGBA', (server_border_size*multiplier, server_border_size*multiplier),border_color)
-        draw_server_border = self._add_corners(draw_server_border, int(radius*multiplier/2))
-        draw_server_border = draw_server_border.resize((server_border_size, server_border_size), Image.ANTIALIAS)
-        server_image = server_image.resize((server_size*multiplier, server_size*multiplier), Image.ANTIALIAS)
-        server_image = self._add_corners(server_image, int(radius*multiplier/2)-10)
-        server_image = server_image.resize((server_size, server_size), Image.ANTIALIAS)
-        process.paste(draw_server_border, (circle_left + profile_size + 2*border + 8, content_top + 3), draw_server_border)
-        process.paste(server_image, (circle_left + profile_size + 2*border + 10, content_top + 5), server_image)
-
-        # name
-        left_text_align = 130
-        _write_unicode(self._truncate_text(self._name(user, 20), 20), left_text_align - 12, vert_pos + 3, name_fnt, header_u_fnt, grey_color) # Name
-
-        # divider bar
-        draw.rectangle([(187, 45), (188, 85)], fill=(160,160,160,220))
-
-        # labels
-        label_align = 200
-        draw.text((label_align, 38), "Server Rank:", font=general_info_fnt, fill=label_text_color) # Server Rank
-        draw.text((label_align, 58), "Server Exp:", font=general_info_fnt, fill=label_text_color) # Server Exp
-        draw.text((label_align, 78), "Credits:", font=general_info_fnt, fill=label_text_color) # Credit
-        # info
-        right_text_align = 290
-        rank_txt = "#{}".format(await self._find_server_rank(user, server))
-        draw.text((right_text_align, 38), self._truncate_text(rank_txt, 12) , font=general_info_fnt, fill=label_text_color) # Rank
-        exp_txt = "{}".format(await self._find_server_exp(user, server))
-        draw.text((right_text_align, 58), self._truncate_text(exp_txt, 12), font=general_info_fnt, fill=label_text_color) # Exp
+    def _get_credits(self, user):
         try:
             bank = self.bot.get_cog('Economy').bank
             if bank.account_exists(user):
-                credits = bank.get_balance(user)
+                return bank.get_balance(user)
             else:
-                credits = 0
-        except:
-            credits = 0
-        credit_txt = "${}".format(credits)
-        draw.text((right_text_align, 78), self._truncate_text(credit_txt, 12),  font=general_info_fnt, fill=label_text_color) # Credits
-
-        result = Image.alpha_composite(result, process)
-        result.save('data/leveler/temp/{}_rank.png'.format(user.id),'PNG', quality=100)
-
-    def _add_corners(self, im, rad):
-        circle = Image.new('L', (rad * 2, rad * 2), 0)
-        draw = ImageDraw.Draw(circle)
-        draw.ellipse((0, 0, rad * 2, rad * 2), fill=255)
-        alpha = Image.new('L', im.size, 255)
-        w, h = im.size
-        alpha.paste(circle.crop((0, 0, rad, rad)), (0, 0))
-        alpha.paste(circle.crop((0, rad, rad, rad * 2)), (0, h - rad))
-        alpha.paste(circle.crop((rad, 0, rad * 2, rad)), (w - rad, 0))
-        alpha.paste(circle.crop((rad, rad, rad * 2, rad * 2)), (w - rad, h - rad))
-        im.putalpha(alpha)
-        return im
-
-    async def draw_levelup(self, user, server):
-        userinfo = db.users.find_one({'user_id':user.id})
-        # get urls
-        bg_url = userinfo["levelup_background"]
-        profile_url = user.avatar_url
-
-        # create image objects
-        bg_image = Image
-        profile_image = Image
-
-        async with aiohttp.get(bg_url) as r:
-            image = await r.content.read()
-        with open('data/leveler/temp/{}_temp_level_bg.png'.format(user.id),'wb') as f:
-            f.write(image)
-        try:
-            async with aiohttp.get(profile_url) as r:
-                image = await r.content.read()
+                return 0
         except:
-            async with aiohttp.get(default_avatar_url) as r:
-                image = await r.content.read()
-        with open('data/leveler/temp/{}_temp_level_profile.png'.format(user.id),'wb') as f:
-            f.write(image)
-
-        bg_image = Image.open('data/leveler/temp/{}_temp_level_bg.png'.format(user.id)).convert('RGBA')
-        profile_image = Image.open('data/leveler/temp/{}_temp_level_profile.png'.format(user.id)).convert('RGBA')
-
-        # set canvas
-        bg_color = (255,255,255, 0)
-        result = Image.new('RGBA', (85, 105), bg_color)
-        process = Image.new('RGBA', (85, 105), bg_color)
+            return 0
 
-        # draw
-        draw = ImageDraw.Draw(process)
+    # downloads through the shared HTTPClient cog when it is loaded
+    async def _fetch(self, url):
+        http = self.bot.get_cog('HTTPClient')
+        if http is not None:
+            return await http.get(url)
+        async with aiohttp.get(url) as r:
+            return await r.content.read()
 
-        # puts in background
-        bg_image = bg_image.resize((85, 105), Image.ANTIALIAS)
-        bg_image = bg_image.crop((0,0, 85, 105))
-        result.paste(bg_image, (0,0))
+    # fetches and decodes an image, resized to size, through the image cache
+    async def _get_image(self, url, size=None, fallback_url=None):
+        key = (url, size)
+        image = self.image_cache.get(key)
+        if image is None:
+            try:
+                data = await self._fetch(url)
+                image = Image.open(BytesIO(data)).convert('RGBA')
+            except:
+                if fallback_url is None:
+                    raise
+                return await self._get_image(fallback_url, size)
+            if size:
+                image = image.resize(size, Image.ANTIALIAS)
+            self.image_cache.set(key, image)
+        # callers may draw on it
+        return image.copy()
 
-        # draw transparent overlay
-        if "levelup_info_color" in userinfo.keys():
-            info_color = tuple(userinfo["levelup_info_color"])
-            info_color = (info_color[0], info_color[1], info_color[2], 160) # increase transparency
+    # returns a string with possibly a nickname
+    def _name(self, user, max_length):
+        if user.name == user.display_name:
+            return user.name
         else:
-            info_color = (30, 30 ,30, 160)
-        draw.rectangle([(0, 40), (85, 105)], fill=info_color) # info portion
-        draw.rectangle([(15, 11), (68, 64)], fill=(255,255,255,160), outline=(100, 100, 100, 100)) # profile rectangle
-
-        # put in profile picture
-        profile_size = (50, 50)
-        profile_image = profile_image.resize(profile_size, Image.ANTIALIAS)
-        process.paste(profile_image, (17, 13))
-
-        # fonts
-        level_fnt2 = ImageFont.truetype('data/leveler/fonts/font_bold.ttf', 19)
-        level_fnt = ImageFont.truetype('data/leveler/fonts/font_bold.ttf', 26)
-
-        # write label text
-        white_text = (240,240,240,255)
-        dark_text = (35, 35, 35, 230)
-        level_up_text = self._contrast(info_color, white_text, dark_text)
-        draw.text((self._center(0, 85, "LEVEL UP!", level_fnt2), 67), "LEVEL UP!", font=level_fnt2, fill=level_up_text) # Level
-        lvl_text = "LVL {}".format(userinfo["servers"][server.id]["level"])
-        draw.text((self._center(2, 85, lvl_text, level_fnt), 83), lvl_text, font=level_fnt, fill=level_up_text) # Level Number
-
-        result = Image.alpha_composite(result, process)
-        result.save('data/leveler/temp/{}_level.png'.format(user.id),'PNG', quality=100)
+            return "{} ({})".format(user.name, truncate_text(user.display_name, max_length - len(user.name) - 3), max_length)
 
     async def _handle_on_message(self, message):
-        #try:
         text = message.content
         channel = message.channel
         server = message.server
         user = message.author
-        # creates user if doesn't exist, bots are not logged.
-        await self._create_user(user, server)
-        curr_time = time.time()
-        userinfo = db.users.find_one({'user_id':user.id})
 
+        # bots are not logged.
         if not server or server.id in self.settings["disabled_servers"]:
             return
         if user.bot:
             return
+        if any(text.startswith(x) for x in prefix):
+            return
 
-        # check if chat_block exists
-        if "chat_block" not in userinfo:
-            userinfo["chat_block"] = 0
+        # creates user if doesn't exist, then keeps the exp state in memory
+        if (user.id, server.id) not in self.exp_cache:
+            await self._load_exp_state(user, server)
 
-        if float(curr_time) - float(userinfo["chat_block"]) >= 120 and not any(text.startswith(x) for x in prefix):
-            await self._process_exp(message, userinfo, random.randint(15, 20))
+        curr_time = time.time()
+        cooldown = self.settings.get("chat_cooldown", 120)
+        if float(curr_time) - self.chat_blocks.get(user.id, 0) >= cooldown:
+            await self._process_exp(message, random.randint(15, 20))
             await self._give_chat_credit(user, server)
-        #except AttributeError as e:
-            #pass
 
-    async def _process_exp(self, message, userinfo, exp:int):
+    async def _load_exp_state(self, user, server):
+        await self._create_user(user, server)
+        userinfo = await self.db.users.find_one({'user_id':user.id}, {"servers.{}".format(server.id): 1, "chat_block": 1})
+        serverinfo = userinfo["servers"][server.id]
+
+        # another message may have loaded it while we waited
+        self.chat_blocks.setdefault(user.id, float(userinfo.get("chat_block", 0)))
+        self.exp_cache.setdefault((user.id, server.id), {
+            "level": serverinfo["level"],
+            "current_exp": serverinfo["current_exp"]
+            })
+
+    async def _process_exp(self, message, exp:int):
         server = message.author.server
         channel = message.channel
         user = message.author
-
-        # add to total exp
+        key = (user.id, server.id)
+        serverinfo = self.exp_cache[key]
+
+        self.chat_blocks[user.id] = time.time()
+        self.pending_exp[key] = self.pending_exp.get(key, 0) + exp
+
+        required = self._required_exp(serverinfo["level"])
+        if serverinfo["current_exp"] + exp >= required:
+            serverinfo["level"] += 1
+            serverinfo["current_exp"] += exp - required
+            # levelup image is drawn from the database, so write now
+            await self._flush_exp()
+            await self._handle_levelup(user, {"servers": {server.id: dict(serverinfo)}}, server, channel)
+        else:
+            serverinfo["current_exp"] += exp
+            if len(self.pending_exp) >= exp_flush_size:
+                await self._flush_exp()
+
+    # writes all buffered exp with a single bulk_write
+    async def _flush_exp(self):
+        pending, requests, totals = self._take_pending_exp()
+        if not requests:
+            return
         try:
-            required = self._required_exp(userinfo["servers"][server.id]["level"])
-            db.users.update_one({'user_id':user.id}, {'$set':{
-                "total_exp": userinfo["total_exp"] + exp,
-                }})
+            # totals are absolute, so writing them first is safe to repeat on retry
+            await self.db.server_exp.bulk_write(totals, ordered=False)
+        except:
+            # nothing was added to total_exp yet, the whole batch is retried
+            self._restore_pending_exp(pending)
+            raise
+        try:
+            await self.db.users.bulk_write(requests, ordered=False)
+        except BulkWriteError as e:
+            # the rest of the batch went through, only retry what failed
+            failed = {error["index"] for error in e.details.get("writeErrors", [])}
+            self._restore_pending_exp([pending[i] for i in sorted(failed)])
+            raise
         except:
+            self._restore_pending_exp(pending)
+            raise
+        self._prune_exp_cache()
+
+    # returns the (key, exp) pairs taken, their user updates in the same order
+    # and the matching server_exp upserts
+    def _take_pending_exp(self):
+        pending, self.pending_exp = self.pending_exp, {}
+
+        taken = []
+        requests = []
+        totals = []
+        for (userid, serverid), exp in pending.items():
+            serverinfo = self.exp_cache.get((userid, serverid))
+            if serverinfo is None:
+                continue # dropped by setlevel, its exp was overwritten
+            taken.append(((userid, serverid), exp))
+            requests.append(UpdateOne({'user_id':userid}, {
+                '$set':{
+                    "servers.{}.level".format(serverid): serverinfo["level"],
+                    "servers.{}.current_exp".format(serverid): serverinfo["current_exp"],
+                    "chat_block": self.chat_blocks[userid]
+                    },
+                '$inc':{"total_exp": exp}
+                }))
+            totals.append(UpdateOne({'server_id':serverid, 'user_id':userid},
+                {'$set':{'total':self._server_total(serverinfo)}}, upsert=True))
+        return taken, requests, totals
+
+    # puts a batch that failed to write back, the next flush retries it
+    def _restore_pending_exp(self, taken):
+        for key, exp in taken:
+            self.pending_exp[key] = self.pending_exp.get(key, 0) + exp
+
+    # forget users whose cooldown ran out, they are reloaded on their next message
+    def _prune_exp_cache(self):
+        cutoff = time.time() - self.settings.get("chat_cooldown", 120)
+        for key in list(self.exp_cache):
+            if key not in self.pending_exp and self.chat_blocks.get(key[0], 0) < cutoff:
+                del self.exp_cache[key]
+        for userid in list(self.chat_blocks):
+            if self.chat_blocks[userid] < cutoff:
+                del self.chat_blocks[userid]
+
+    async def exp_flusher(self):
+        try:
+            while True:
+                await asyncio.sleep(exp_flush_interval)
+                try:
+                    await self._flush_exp()
+                except Exception as e:
+                    print("Leveler: couldn't write chat exp, retrying next flush: {}".format(e))
+        except asyncio.CancelledError:
             pass
-        if userinfo["servers"][server.id]["current_exp"] + exp >= required:
-            userinfo["servers"][server.id]["level"] += 1
-            db.users.update_one({'user_id':user.id}, {'$set':{
-                "servers.{}.level".format(server.id): userinfo["servers"][server.id]["level"],
-                "servers.{}.current_exp".format(server.id): userinfo["servers"][server.id]["current_exp"] + exp - required,
-                "chat_block": time.time()
-                }})
-            await self._handle_levelup(user, userinfo, server, channel)
-        else:
-            db.users.update_one({'user_id':user.id}, {'$set':{
-                "servers.{}.current_exp".format(server.id): userinfo["servers"][server.id]["current_exp"] + exp,
-                "chat_block": time.time()
-                }})
+
+    def __unload(self):
+        self.flush_task.cancel()
+        self.prepare_task.cancel()
+        try:
+            pending, requests, totals = self._take_pending_exp()
+            if requests:
+                db.server_exp.bulk_write(totals, ordered=False)
+                db.users.bulk_write(requests, ordered=False)
+        except Exception as e:
+            print("Leveler: couldn't write chat exp on unload: {}".format(e))
+        finally:
+            self.db.close()
+            self.render_pool.shutdown(wait=False)
 
     async def _handle_levelup(self, user, userinfo, server, channel):
         if not isinstance(self.settings["lvl_msg"], list):
@@ -2423,67 +2259,47 @@ class Leveler:
                 em = discord.Embed(description='**{} just gained a level{}! (LEVEL {})**'.format(name, server_identifier, userinfo["servers"][server.id]["level"]), colour=user.colour)
                 await self.bot.send_message(channel, '', embed = em)
             else:
-                await self.draw_levelup(user, server)
+                levelup = await self.draw_levelup(user, server)
                 await self.bot.send_typing(channel)
-                await self.bot.send_file(channel, 'data/leveler/temp/{}_level.png'.format(user.id), content='**{} just gained a level{}!**'.format(name, server_identifier))
+                await self.bot.send_file(channel, levelup, filename='level.png', content='**{} just gained a level{}!**'.format(name, server_identifier))
 
 
     async def _find_server_rank(self, user, server):
-        targetid = user.id
-        users = []
+        entry = await self.db.server_exp.find_one({'server_id':server.id, 'user_id':user.id}, {"total": 1})
+        if entry is None:
+            return None
 
-        for userinfo in db.users.find({}):
-            try:
-                server_exp = 0
-                userid = userinfo["user_id"]
-                for i in range(userinfo["servers"][server.id]["level"]):
-                    server_exp += self._required_exp(i)
-                server_exp += userinfo["servers"][server.id]["current_exp"]
-                users.append((userid, server_exp))
-            except:
-                pass
-
-        sorted_list = sorted(users, key=operator.itemgetter(1), reverse=True)
-
-        rank = 1
-        for a_user in sorted_list:
-            if a_user[0] == targetid:
-                return rank
-            rank+=1
+        return await self.db.server_exp.count({'server_id':server.id, 'total': {"$gt": entry["total"]}}) + 1
 
     async def _find_server_exp(self, user, server):
-        server_exp = 0
-        userinfo = db.users.find_one({'user_id':user.id})
+        userinfo = await self.db.users.find_one({'user_id':user.id})
 
         try:
-            for i in range(userinfo["servers"][server.id]["level"]):
-                server_exp += self._required_exp(i)
-            server_exp +=  userinfo["servers"][server.id]["current_exp"]
-            return server_exp
+            return self._server_total(userinfo["servers"][server.id])
         except:
-            return server_exp
+            return 0
 
     async def _find_global_rank(self, user, server):
-        users = []
+        userinfo = await self.db.users.find_one({'user_id':user.id}, {"total_exp": 1})
+        try:
+            total_exp = userinfo["total_exp"]
+        except (KeyError, TypeError):
+            return None
 
-        for userinfo in db.users.find({}):
-            try:
-                userid = userinfo["user_id"]
-                users.append((userid, userinfo["total_exp"]))
-            except KeyError:
-                pass
-        sorted_list = sorted(users, key=operator.itemgetter(1), reverse=True)
+        return await self.db.users.count({"total_exp": {"$gt": total_exp}}) + 1
 
-        rank = 1
-        for stats in sorted_list:
-            if stats[0] == user.id:
-                return rank
-            rank+=1
+    # first member object for a user id across the bot's servers
+    def _find_member(self, userid):
+        for server in self.bot.servers:
+            member = server.get_member(userid)
+            if member != None:
+                return member
+        return None
 
     # handles user creation, adding new server, blocking
     async def _create_user(self, user, server):
         try:
-            userinfo = db.users.find_one({'user_id':user.id})
+            userinfo = await self.db.users.find_one({'user_id':user.id})
             if not userinfo:
                 new_account = {
                     "user_id" : user.id,
@@ -2504,32 +2320,19 @@ class Leveler:
                     "profile_block": 0,
                     "rank_block": 0
                 }
-                db.users.insert_one(new_account)
+                await self.db.users.insert_one(new_account)
 
-            userinfo = db.users.find_one({'user_id':user.id})
+            userinfo = await self.db.users.find_one({'user_id':user.id})
             if "servers" not in userinfo or server.id not in userinfo["servers"]:
-                db.users.update_one({'user_id':user.id}, {'$set':{
+                await self.db.users.update_one({'user_id':user.id}, {'$set':{
                         "servers.{}.level".format(server.id): 0,
                         "servers.{}.current_exp".format(server.id): 0,
                     }}, upsert = True)
+                await self.db.server_exp.update_one({'server_id':server.id, 'user_id':user.id},
+                    {'$setOnInsert':{'total':0}}, upsert = True)
         except AttributeError as e:
             pass
 
-    def _truncate_text(self, text, max_length):
-        if len(text) > max_length:
-            if text.strip('$').isdigit():
-                text = int(text.strip('$'))
-                return "${:.2E}".format(text)
-            return text[:max_length-3] + "..."
-        return text
-
-    # finds the the pixel to center the text
-    def _center(self, start, end, text, font):
-        dist = end - start
-        width = font.getsize(text)[0]
-        start_pos = start + ((dist-width)/2)
-        return int(start_pos)
-
     # calculates required exp for next level
     def _required_exp(self, level:int):
         if level < 0:
@@ -2538,6 +2341,564 @@ class Leveler:
 
     def _level_exp(self, level: int):
         return level*65 + 139*level*(level-1)//2
+
+    # total exp earned on a server, stored in server_exp for leaderboards
+    def _server_total(self, serverinfo):
+        return self._level_exp(serverinfo["level"]) + serverinfo["current_exp"]
+
+    # same as _server_total for many (level, current_exp) pairs at once
+    def _server_totals(self, levels, current_exps):
+        if np is None:
+            return [self._level_exp(level) + exp for level, exp in zip(levels, current_exps)]
+        levels = np.asarray(levels, dtype=np.int64)
+        totals = levels*65 + 139*levels*(levels-1)//2 + np.asarray(current_exps, dtype=np.int64)
+        return totals.tolist()
+
+# ------------------------------ rendering ------------------------------------
+# Cards are drawn in render worker processes, so everything here works on a
+# plain-data render spec built by the cog and returns PNG bytes.
+
+# loads the fonts once in each worker
+def warm_fonts():
+    for font_path, sizes in [(font_file, [18]),
+            (font_bold_file, [10, 12, 13, 14, 15, 19, 22, 26, 33]),
+            (font_unicode_file, [8, 11, 12, 18])]:
+        for size in sizes:
+            get_font(font_path, size)
+
+def render_profile(spec):
+    name_fnt = get_font(font_bold_file, 22)
+    header_u_fnt = get_font(font_unicode_file, 18)
+    title_fnt = get_font(font_file, 18)
+    sub_header_fnt = get_font(font_bold_file, 14)
+    badge_fnt = get_font(font_bold_file, 10)
+    exp_fnt = get_font(font_bold_file, 13)
+    large_fnt = get_font(font_bold_file, 33)
+    level_label_fnt = get_font(font_bold_file, 22)
+    general_info_fnt = get_font(font_bold_file, 15)
+    general_info_u_fnt = get_font(font_unicode_file, 12)
+    rep_fnt = get_font(font_bold_file, 26)
+    text_fnt = get_font(font_bold_file, 12)
+    text_u_fnt = get_font(font_unicode_file, 8)
+    credit_fnt = get_font(font_bold_file, 10)
+
+    def _write_unicode(text, init_x, y, font, unicode_font, fill):
+        write_pos = init_x
+
+        for char in text:
+            if char.isalnum() or char in string.punctuation or char in string.whitespace:
+                draw.text((write_pos, y), char, font=font, fill=fill)
+                write_pos += font.getsize(char)[0]
+            else:
+                draw.text((write_pos, y), u"{}".format(char), font=unicode_font, fill=fill)
+                write_pos += unicode_font.getsize(char)[0]
+
+    userinfo = spec["userinfo"]
+    server_id = spec["server_id"]
+    bg_url = userinfo["profile_background"]
+    bg_image = spec["bg_image"]
+    profile_image = spec["profile_image"]
+
+    # set canvas
+    bg_color = (255,255,255,0)
+    result = Image.new('RGBA', (290, 290), bg_color)
+    process = Image.new('RGBA', (290, 290), bg_color)
+
+    # draw
+    draw = ImageDraw.Draw(process)
+
+    # puts in background
+    result.paste(bg_image, (0,0))
+
+    # draw filter
+    draw.rectangle([(0,0),(290, 290)], fill=(0,0,0,10))
+
+    # draw transparent overlay
+    vert_pos = 110
+    left_pos = 70
+    right_pos = 285
+    title_height = 22
+    gap = 3
+
+    # determines rep section color
+    if "rep_color" not in userinfo.keys() or not userinfo["rep_color"]:
+        rep_fill = (92,130,203,230)
+    else:
+        rep_fill = tuple(userinfo["rep_color"])
+    # determines badge section color, should be behind the titlebar
+    if "badge_col_color" not in userinfo.keys() or not userinfo["badge_col_color"]:
+        badge_fill = (128,151,165,230)
+    else:
+        badge_fill = tuple(userinfo["badge_col_color"])
+
+    if "profile_info_color" in userinfo.keys():
+        info_color = tuple(userinfo["profile_info_color"])
+    else:
+        info_color = (30, 30 ,30, 220)
+
+    draw.rectangle([(left_pos - 20, vert_pos + title_height), (right_pos, 156)], fill=info_color) # title box
+    draw.rectangle([(100,159), (285, 212)], fill=info_color) # general content
+    draw.rectangle([(100,215), (285, 285)], fill=info_color) # info content
+
+    # stick in credits if needed
+    if bg_url in bg_credits.keys():
+        credit_text = "  ".join("Background by {}".format(bg_credits[bg_url]))
+        credit_init = 290 - credit_fnt.getsize(credit_text)[0]
+        draw.text((credit_init, 0), credit_text,  font=credit_fnt, fill=(0,0,0,100))
+    draw.rectangle([(5, vert_pos), (right_pos, vert_pos + title_height)], fill=(230,230,230,230)) # name box in front
+
+    # draw level circle
+    multiplier = 8
+    lvl_circle_dia = 104
+    circle_left = 1
+    circle_top = 42
+    raw_length = lvl_circle_dia * multiplier
+    mask_length = raw_length
+
+    # drawing level bar calculate angle
+    start_angle = -90 # from top instead of 3oclock
+    angle = int(360 * (userinfo["servers"][server_id]["current_exp"]/spec["required_exp"])) + start_angle
+
+    # level outline
+    lvl_circle = Image.new("RGBA", (raw_length, raw_length))
+    draw_lvl_circle = ImageDraw.Draw(lvl_circle)
+    draw_lvl_circle.ellipse([0, 0, raw_length, raw_length], fill=(badge_fill[0], badge_fill[1], badge_fill[2], 180), outline = (255, 255, 255, 250))
+    # determines exp bar color
+    if "profile_exp_color" not in userinfo.keys() or not userinfo["profile_exp_color"]:
+        exp_fill = (255, 255, 255, 230)
+    else:
+        exp_fill = tuple(userinfo["profile_exp_color"])
+    draw_lvl_circle.pieslice([0, 0, raw_length, raw_length], start_angle, angle, fill=exp_fill, outline = (255, 255, 255, 255))
+    # put on level bar circle
+    lvl_circle = lvl_circle.resize((lvl_circle_dia, lvl_circle_dia), Image.ANTIALIAS)
+    lvl_bar_mask = circle_mask(mask_length, lvl_circle_dia)
+    process.paste(lvl_circle, (circle_left, circle_top), lvl_bar_mask)
+
+    # draws boxes
+    draw.rectangle([(5,133), (100, 285)], fill= badge_fill) # badges
+    draw.rectangle([(10,138), (95, 168)], fill = rep_fill) # reps
+
+    total_gap = 10
+    border = int(total_gap/2)
+    profile_size = lvl_circle_dia - total_gap
+    raw_length = profile_size * multiplier
+    # put in profile picture, already resized to profile_size
+    process.paste(profile_image, (circle_left + border, circle_top + border), circle_mask(mask_length, profile_size))
+
+    # write label text
+    white_color = (240,240,240,255)
+    light_color = (160,160,160,255)
+
+    head_align = 105
+    _write_unicode(truncate_text(spec["name"], 22), head_align, vert_pos + 3, level_label_fnt, header_u_fnt, (110,110,110,255)) # NAME
+    _write_unicode(userinfo["title"], head_align, 136, level_label_fnt, header_u_fnt, white_color)
+
+    # draw level box
+    level_right = 290
+    level_left = level_right - 78
+    draw.rectangle([(level_left, 0), (level_right, 21)], fill=(badge_fill[0],badge_fill[1],badge_fill[2],160)) # box
+    lvl_text = "LEVEL {}".format(userinfo["servers"][server_id]["level"])
+    if badge_fill == (128,151,165,230):
+        lvl_color = white_color
+    else:
+        lvl_color = contrast(badge_fill, rep_fill, exp_fill)
+    draw.text((text_center(level_left+2, level_right, lvl_text, level_label_fnt), 2), lvl_text,  font=level_label_fnt, fill=(lvl_color[0],lvl_color[1],lvl_color[2],255)) # Level #
+
+    rep_text = "{} REP".format(userinfo["rep"])
+    draw.text((text_center(7, 100, rep_text, rep_fnt), 144), rep_text, font=rep_fnt, fill=white_color)
+
+    exp_text = "{}/{}".format(userinfo["servers"][server_id]["current_exp"],spec["required_exp"]) # Exp
+    exp_color = exp_fill
+    draw.text((105, 99), exp_text,  font=exp_fnt, fill=(exp_color[0], exp_color[1], exp_color[2], 255)) # Exp Text
+
+    # determine info text color
+    dark_text = (35, 35, 35, 230)
+    info_text_color = contrast(info_color, light_color, dark_text)
+
+    lvl_left = 100
+    label_align = 105
+    _write_unicode(u"Rank:", label_align, 165, general_info_fnt, general_info_u_fnt, info_text_color)
+    draw.text((label_align, 180), "Exp:",  font=general_info_fnt, fill=info_text_color) # Exp
+    draw.text((label_align, 195), "Credits:",  font=general_info_fnt, fill=info_text_color) # Credits
+
+    # local stats
+    num_local_align = 172
+    local_symbol = u"\U0001F3E0 "
+    if "linux" in platform.system().lower():
+        local_symbol = u"\U0001F3E0 "
+    else:
+        local_symbol = "S "
+
+    s_rank_txt = local_symbol + truncate_text("#{}".format(spec["server_rank"]), 8)
+    _write_unicode(s_rank_txt, num_local_align - general_info_u_fnt.getsize(local_symbol)[0], 165, general_info_fnt, general_info_u_fnt, info_text_color) # Rank
+
+    s_exp_txt = truncate_text("{}".format(spec["server_exp"]), 8)
+    _write_unicode(s_exp_txt, num_local_align, 180, general_info_fnt, general_info_u_fnt, info_text_color)  # Exp
+    credits = spec["credits"]
+    credit_txt = "${}".format(credits)
+    draw.text((num_local_align, 195), truncate_text(credit_txt, 18),  font=general_info_fnt, fill=info_text_color) # Credits
+
+    # global stats
+    num_align = 230
+    if "linux" in platform.system().lower():
+        global_symbol = u"\U0001F30E "
+        fine_adjust = 1
+    else:
+        global_symbol = "G "
+        fine_adjust = 0
+
+    rank_txt = global_symbol + truncate_text("#{}".format(spec["global_rank"]), 8)
+    exp_txt = truncate_text("{}".format(userinfo["total_exp"]), 8)
+    _write_unicode(rank_txt, num_align - general_info_u_fnt.getsize(global_symbol)[0] + fine_adjust, 165, general_info_fnt, general_info_u_fnt, info_text_color) # Rank
+    _write_unicode(exp_txt, num_align, 180, general_info_fnt, general_info_u_fnt, info_text_color)  # Exp
+
+    draw.text((105, 220), "Info Box",  font=sub_header_fnt, fill=white_color) # Info Box
+    margin = 105
+    offset = 238
+    for line in textwrap.wrap(userinfo["info"], width=42):
+        # draw.text((margin, offset), line, font=text_fnt, fill=(70,70,70,255))
+        _write_unicode(line, margin, offset, text_fnt, text_u_fnt, info_text_color)
+        offset += text_fnt.getsize(line)[1] + 2
+
+    # badges arrive as sprites from render_badge_sprite, None if the badge has no valid image
+    if spec["badge_type"] == "circles":
+        vert_pos = 171
+        left = 9
+        size = 27
+        hor_gap = 3
+        vert_gap = 2
+        for i, sprite in enumerate(spec["badges"]):
+            coord = (left + (i % 3)*(hor_gap + size), vert_pos + (i // 3)*(vert_gap + size))
+            paste_sprite(process, sprite, coord)
+    elif spec["badge_type"] == "tags" or spec["badge_type"] == "bars":
+        vert_pos = 187
+        for i, sprite in enumerate(spec["badges"]):
+            paste_sprite(process, sprite, (10, vert_pos + i*17))
+            vert_pos += 3 # spacing
+
+    result = Image.alpha_composite(result, process)
+    return png_bytes(result)
+
+def render_rank(spec):
+
+    # fonts
+    name_fnt = get_font(font_bold_file, 22)
+    header_u_fnt = get_font(font_unicode_file, 18)
+    sub_header_fnt = get_font(font_bold_file, 14)
+    badge_fnt = get_font(font_bold_file, 12)
+    large_fnt = get_font(font_bold_file, 33)
+    level_label_fnt = get_font(font_bold_file, 22)
+    general_info_fnt = get_font(font_bold_file, 15)
+    general_info_u_fnt = get_font(font_unicode_file, 11)
+    credit_fnt = get_font(font_bold_file, 10)
+
+    def _write_unicode(text, init_x, y, font, unicode_font, fill):
+        write_pos = init_x
+
+        for char in text:
+            if char.isalnum() or char in string.punctuation or char in string.whitespace:
+                draw.text((write_pos, y), char, font=font, fill=fill)
+                write_pos += font.getsize(char)[0]
+            else:
+                draw.text((write_pos, y), u"{}".format(char), font=unicode_font, fill=fill)
+                write_pos += unicode_font.getsize(char)[0]
+
+    userinfo = spec["userinfo"]
+    server_id = spec["server_id"]
+    bg_url = userinfo["rank_background"]
+
+    # set canvas
+    width = 360
+    height = 100
+    multiplier = 6
+    server_size = 55 # content box height - 10
+    bg_image = spec["bg_image"]
+    profile_image = spec["profile_image"]
+    server_image = spec["server_image"]
+
+    bg_color = (255,255,255, 0)
+    result = Image.new('RGBA', (width, height), bg_color)
+    process = Image.new('RGBA', (width, height), bg_color)
+
+    # puts in background
+    result.paste(bg_image, (0,0))
+
+    # draw
+    draw = ImageDraw.Draw(process)
+
+    # draw transparent overlay
+    vert_pos = 5
+    left_pos = 70
+    right_pos = width - vert_pos
+    title_height = 22
+    gap = 3
+
+    draw.rectangle([(left_pos - 20,vert_pos), (right_pos, vert_pos + title_height)], fill=(230,230,230,230)) # title box
+    content_top = vert_pos + title_height + gap
+    content_bottom = 100 - vert_pos
+
+    if "rank_info_color" in userinfo.keys():
+        info_color = tuple(userinfo["rank_info_color"])
+        info_color = (info_color[0], info_color[1], info_color[2], 160) # increase transparency
+    else:
+        info_color = (30, 30 ,30, 160)
+    draw.rectangle([(left_pos - 20, content_top), (right_pos, content_bottom)], fill=info_color, outline=(180, 180, 180, 180)) # content box
+
+    # stick in credits if needed
+    if bg_url in bg_credits.keys():
+        credit_text = " ".join("{}".format(bg_credits[bg_url]))
+        draw.text((2, 92), credit_text,  font=credit_fnt, fill=(0,0,0,190))
+
+    # draw level circle
+    lvl_circle_dia = 94
+    circle_left = 15
+    circle_top = int((height- lvl_circle_dia)/2)
+    raw_length = lvl_circle_dia * multiplier
+    mask_length = raw_length
+
+    # drawing level bar calculate angle
+    start_angle = -90 # from top instead of 3oclock
+    angle = int(360 * (userinfo["servers"][server_id]["current_exp"]/spec["required_exp"])) + start_angle
+
+    lvl_circle = Image.new("RGBA", (raw_length, raw_length))
+    draw_lvl_circle = ImageDraw.Draw(lvl_circle)
+    draw_lvl_circle.ellipse([0, 0, raw_length, raw_length], fill=(180, 180, 180, 180), outline = (255, 255, 255, 220))
+    # determines exp bar color
+    if "rank_exp_color" not in userinfo.keys() or not userinfo["rank_exp_color"]:
+        exp_fill = (255, 255, 255, 230)
+    else:
+        exp_fill = tuple(userinfo["rank_exp_color"])
+    draw_lvl_circle.pieslice([0, 0, raw_length, raw_length], start_angle, angle, fill=exp_fill, outline = (255, 255, 255, 230))
+    # put on level bar circle
+    lvl_circle = lvl_circle.resize((lvl_circle_dia, lvl_circle_dia), Image.ANTIALIAS)
+    lvl_bar_mask = circle_mask(mask_length, lvl_circle_dia)
+    process.paste(lvl_circle, (circle_left, circle_top), lvl_bar_mask)
+
+    # draws mask
+    total_gap = 10
+    border = int(total_gap/2)
+    profile_size = lvl_circle_dia - total_gap
+    raw_length = profile_size * multiplier
+    # put in profile picture, already resized to profile_size
+    process.paste(profile_image, (circle_left + border, circle_top + border), circle_mask(mask_length, profile_size))
+
+    # draw level box
+    level_left = 274
+    level_right = right_pos
+    draw.rectangle([(level_left, vert_pos), (level_right, vert_pos + title_height)], fill="#AAA") # box
+    lvl_text = "LEVEL {}".format(userinfo["servers"][server_id]["level"])
+    draw.text((text_center(level_left, level_right, lvl_text, level_label_fnt), vert_pos + 3), lvl_text,  font=level_label_fnt, fill=(110,110,110,255)) # Level #
+
+    # labels text colors
+    white_text = (240,240,240,255)
+    dark_text = (35, 35, 35, 230)
+    label_text_color = contrast(info_color, white_text, dark_text)
+
+    # draw text
+    grey_color = (110,110,110,255)
+    white_color = (230,230,230,255)
+
+    # put in server picture
+    server_border_size = server_size + 4
+    radius = 20
+    light_border = (150,150,150,180)
+    dark_border = (90,90,90,180)
+    border_color = contrast(info_color, light_border, dark_border)
+
+    draw_server_border = Image.new('RGBA', (server_border_size*multiplier, server_border_size*multiplier),border_color)
+    draw_server_border = add_corners(draw_server_border, int(radius*multiplier/2))
+    draw_server_border = draw_server_border.resize((server_border_size, server_border_size), Image.ANTIALIAS)
+    server_image = add_corners(server_image, int(radius*multiplier/2)-10)
+    server_image = server_image.resize((server_size, server_size), Image.ANTIALIAS)
+    process.paste(draw_server_border, (circle_left + profile_size + 2*border + 8, content_top + 3), draw_server_border)
+    process.paste(server_image, (circle_left + profile_size + 2*border + 10, content_top + 5), server_image)
+
+    # name
+    left_text_align = 130
+    _write_unicode(truncate_text(spec["name"], 20), left_text_align - 12, vert_pos + 3, name_fnt, header_u_fnt, grey_color) # Name
+
+    # divider bar
+    draw.rectangle([(187, 45), (188, 85)], fill=(160,160,160,220))
+
+    # labels
+    label_align = 200
+    draw.text((label_align, 38), "Server Rank:", font=general_info_fnt, fill=label_text_color) # Server Rank
+    draw.text((label_align, 58), "Server Exp:", font=general_info_fnt, fill=label_text_color) # Server Exp
+    draw.text((label_align, 78), "Credits:", font=general_info_fnt, fill=label_text_color) # Credit
+    # info
+    right_text_align = 290
+    rank_txt = "#{}".format(spec["server_rank"])
+    draw.text((right_text_align, 38), truncate_text(rank_txt, 12) , font=general_info_fnt, fill=label_text_color) # Rank
+    exp_txt = "{}".format(spec["server_exp"])
+    draw.text((right_text_align, 58), truncate_text(exp_txt, 12), font=general_info_fnt, fill=label_text_color) # Exp
+    credits = spec["credits"]
+    credit_txt = "${}".format(credits)
+    draw.text((right_text_align, 78), truncate_text(credit_txt, 12),  font=general_info_fnt, fill=label_text_color) # Credits
+
+    result = Image.alpha_composite(result, process)
+    return png_bytes(result)
+
+def render_levelup(spec):
+    userinfo = spec["userinfo"]
+    server_id = spec["server_id"]
+    bg_image = spec["bg_image"]
+    profile_image = spec["profile_image"]
+
+    # set canvas
+    bg_color = (255,255,255, 0)
+    result = Image.new('RGBA', (85, 105), bg_color)
+    process = Image.new('RGBA', (85, 105), bg_color)
+
+    # draw
+    draw = ImageDraw.Draw(process)
+
+    # puts in background
+    result.paste(bg_image, (0,0))
+
+    # draw transparent overlay
+    if "levelup_info_color" in userinfo.keys():
+        info_color = tuple(userinfo["levelup_info_color"])
+        info_color = (info_color[0], info_color[1], info_color[2], 160) # increase transparency
+    else:
+        info_color = (30, 30 ,30, 160)
+    draw.rectangle([(0, 40), (85, 105)], fill=info_color) # info portion
+    draw.rectangle([(15, 11), (68, 64)], fill=(255,255,255,160), outline=(100, 100, 100, 100)) # profile rectangle
+
+    # put in profile picture
+    process.paste(profile_image, (17, 13))
+
+    # fonts
+    level_fnt2 = get_font(font_bold_file, 19)
+    level_fnt = get_font(font_bold_file, 26)
+
+    # write label text
+    white_text = (240,240,240,255)
+    dark_text = (35, 35, 35, 230)
+    level_up_text = contrast(info_color, white_text, dark_text)
+    draw.text((text_center(0, 85, "LEVEL UP!", level_fnt2), 67), "LEVEL UP!", font=level_fnt2, fill=level_up_text) # Level
+    lvl_text = "LVL {}".format(userinfo["servers"][server_id]["level"])
+    draw.text((text_center(2, 85, lvl_text, level_fnt), 83), lvl_text, font=level_fnt, fill=level_up_text) # Level Number
+
+    result = Image.alpha_composite(result, process)
+    return png_bytes(result)
+
+def png_bytes(image):
+    image_object = BytesIO()
+    image.save(image_object, 'PNG', quality=100)
+    return image_object.getvalue()
+
+# returns color that contrasts better in background
+def contrast(bg_color, color1, color2):
+    color1_ratio = contrast_ratio(bg_color, color1)
+    color2_ratio = contrast_ratio(bg_color, color2)
+    if color1_ratio >= color2_ratio:
+        return color1
+    else:
+        return color2
+
+def luminance(color):
+    # convert to greyscale
+    luminance = float((0.2126*color[0]) + (0.7152*color[1]) + (0.0722*color[2]))
+    return luminance
+
+def contrast_ratio(bgcolor, foreground):
+    f_lum = float(luminance(foreground)+0.05)
+    bg_lum = float(luminance(bgcolor)+0.05)
+
+    if bg_lum > f_lum:
+        return bg_lum/f_lum
+    else:
+        return f_lum/bg_lum
+
+# antialiased circle masks, drawn at raw_length and shrunk to size. cached per worker
+mask_cache = {}
+
+def circle_mask(raw_length, size):
+    key = ("circle", raw_length, size)
+    if key not in mask_cache:
+        mask = Image.new('L', (raw_length, raw_length), 0)
+        draw_thumb = ImageDraw.Draw(mask)
+        draw_thumb.ellipse((0, 0) + (raw_length, raw_length), fill = 255, outline = 0)
+        mask_cache[key] = mask.resize((size, size), Image.ANTIALIAS)
+    return mask_cache[key]
+
+def corner_mask(size, rad):
+    key = ("corners", size, rad)
+    if key not in mask_cache:
+        circle = Image.new('L', (rad * 2, rad * 2), 0)
+        draw = ImageDraw.Draw(circle)
+        draw.ellipse((0, 0, rad * 2, rad * 2), fill=255)
+        alpha = Image.new('L', size, 255)
+        w, h = size
+        alpha.paste(circle.crop((0, 0, rad, rad)), (0, 0))
+        alpha.paste(circle.crop((0, rad, rad, rad * 2)), (0, h - rad))
+        alpha.paste(circle.crop((rad, 0, rad * 2, rad)), (w - rad, 0))
+        alpha.paste(circle.crop((rad, rad, rad * 2, rad * 2)), (w - rad, h - rad))
+        mask_cache[key] = alpha
+    return mask_cache[key]
+
+# pre-renders a badge as a list of (image, offset, mask) layers to paste at the badge position
+def render_badge_sprite(badge_image, border_color, badge_type):
+    total_gap = 4
+    border_width = int(total_gap/2)
+    layers = []
+    if badge_type == "circles":
+        size = 27
+        raw_length = size * 6
+        # structured like this because if border = 0, still leaves outline.
+        if border_color:
+            square = Image.new('RGBA', (raw_length, raw_length), border_color)
+            # put border on ellipse/circle
+            output = ImageOps.fit(square, (raw_length, raw_length), centering=(0.5, 0.5))
+            output = output.resize((size, size), Image.ANTIALIAS)
+            layers.append((output, (0, 0), circle_mask(raw_length, size)))
+
+            # put on ellipse/circle
+            output = ImageOps.fit(badge_image, (raw_length, raw_length), centering=(0.5, 0.5))
+            output = output.resize((size - total_gap, size - total_gap), Image.ANTIALIAS)
+            layers.append((output, (border_width, border_width), circle_mask(raw_length, size - total_gap)))
+        else:
+            output = ImageOps.fit(badge_image, (raw_length, raw_length), centering=(0.5, 0.5))
+            output = output.resize((size, size), Image.ANTIALIAS)
+            layers.append((output, (0, 0), circle_mask(raw_length, size)))
+    else:
+        bar_size = (85, 15)
+        if border_color != None:
+            # border rectangle is inclusive of both edges
+            border = Image.new('RGBA', (bar_size[0] + 1, bar_size[1] + 1), border_color)
+            layers.append((border, (0, 0), None))
+            output = badge_image.resize((bar_size[0] - total_gap + 1, bar_size[1] - total_gap + 1), Image.ANTIALIAS)
+            layers.append((output, (border_width, border_width), None))
+        else:
+            output = badge_image.resize(bar_size, Image.ANTIALIAS)
+            layers.append((output, (0, 0), None))
+    return layers
+
+def paste_sprite(image, sprite, coord):
+    if sprite is None:
+        return
+    for layer, offset, mask in sprite:
+        image.paste(layer, (coord[0] + offset[0], coord[1] + offset[1]), mask)
+
+def add_corners(im, rad):
+    im.putalpha(corner_mask(im.size, rad))
+    return im
+
+def truncate_text(text, max_length):
+    if len(text) > max_length:
+        if text.strip('$').isdigit():
+            text = int(text.strip('$'))
+            return "${:.2E}".format(text)
+        return text[:max_length-3] + "..."
+    return text
+
+# finds the the pixel to center the text
+def text_center(start, end, text, font):
+    dist = end - start
+    width = font.getsize(text)[0]
+    start_pos = start + ((dist-width)/2)
+    return int(start_pos)
+
 # ------------------------------ setup ----------------------------------------
 def check_folders():
     if not os.path.exists("data/leveler"):
@@ -2548,6 +2909,10 @@ def check_folders():
         print("Creating data/leveler/temp folder...")
         os.makedirs("data/leveler/temp")
 
+    if not os.path.exists(card_directory):
+        print("Creating {} folder...".format(card_directory))
+        os.makedirs(card_directory)
+
 def transfer_info():
     try:
         users = fileIO("data/leveler/users.json", "load")
@@ -1,28 +1,58 @@
 import asyncio, aiohttp, discord
 import aalib
-import os, sys, linecache, traceback, glob
+import os, sys, linecache, traceback, time
 import re, json, random, math, html
 import wand, wand.color, wand.drawing
-import PIL, PIL.Image, PIL.ImageFont, PIL.ImageOps, PIL.ImageDraw
+import PIL, PIL.Image, PIL.ImageFont, PIL.ImageOps, PIL.ImageDraw, PIL.ImageFilter
 import numpy as np
 import cairosvg, jpglitch, urbandict
-import pixelsort.sorter, pixelsort.sorting, pixelsort.util, pixelsort.interval
-import hashlib, base64
+import hashlib, base64, threading, mmap
 from vw import macintoshplus
 from urllib.parse import parse_qs
 from lxml import etree
 from imgurpython import ImgurClient
 from io import BytesIO, StringIO
+from collections import OrderedDict, deque
 from discord.ext import commands
 from utils import checks
 from pyfiglet import figlet_format
 from string import ascii_lowercase as alphabet
 from urllib.parse import quote
 from mods.cog import Cog
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 from concurrent.futures._base import CancelledError
+try:
+	import cv2
+	cv2Available = True
+except ImportError:
+	cv2Available = False
 
 code = "```py\n{0}\n```"
 
+#processes for per-frame gif work, also how many image jobs run at once
+image_workers = os.cpu_count() or 2
+
+#search caches, (max entries, seconds before a result is refetched)
+search_cache_limits = {'image': (500, 21600), 'search': (500, 21600), 'youtube': (500, 43200), 'landmarks': (2000, 2592000)}
+search_cache_save_interval = 600
+
+#bytes kept by the result cache of deterministic commands
+result_cache_bytes = 512*1024*1024
+
+#emoji sizes kept in the emoji atlas once rendered, and the most it may grow to in bytes
+emoji_atlas_sizes = (64, 128, 256, 512, 1024, 2048)
+emoji_atlas_bytes = 1024*1024*1024
+
+#pixel sort intervals and keys, with the lightness thresholds and interval length pixelsort defaults to
+sort_intervals = ('random', 'threshold', 'edges', 'waves', 'none')
+sort_keys = ('lightness', 'intensity', 'maximum', 'minimum')
+sort_lower_threshold = 0.25
+sort_upper_threshold = 0.8
+sort_char_length = 50
+
+#face landmark backends for eyes, tried in order, local needs opencv
+landmark_backends = ('local', 'oxford')
+
 #http://stackoverflow.com/a/34084933
 #for google_scrap
 def get_deep_text(element):
@@ -51,13 +81,880 @@ def find_coeffs(pa, pb):
 	res = np.dot(np.linalg.inv(A.T*A)*A.T, B)
 	return np.array(res).reshape(8)
 
+#runs in the image pool, has to be module level to be picklable
+def gmagik_frame(frame):
+	try:
+		i = wand.image.Image(blob=frame)
+	except:
+		return frame
+	i.transform(resize='800x800>')
+	i.liquid_rescale(width=int(i.width*0.5), height=int(i.height*0.5), delta_x=1, rigidity=0)
+	i.liquid_rescale(width=int(i.width*1.5), height=int(i.height*1.5), delta_x=2, rigidity=0)
+	i.resize(i.width, i.height)
+	i.format = 'png'
+	return i.make_blob()
+
+#numpy effects, each takes an RGBA array and returns an array (png) or a list of (array, duration) frames (gif)
+def effect_flip(a):
+	return a[::-1]
+
+def effect_flop(a):
+	return a[:, ::-1]
+
+def effect_invert(a):
+	a = a.copy()
+	a[..., :3] = 255 - a[..., :3]
+	return a
+
+#average each pixels x pixels block, then draw the black grid between blocks
+def effect_pixelate(a, pixels):
+	h, w = a.shape[0]//pixels, a.shape[1]//pixels
+	if h == 0 or w == 0:
+		raise ValueError('too many pixels')
+	blocks = a[:h*pixels, :w*pixels].reshape(h, pixels, w, pixels, 4).mean(axis=(1, 3)).astype(np.uint8)
+	a = blocks.repeat(pixels, axis=0).repeat(pixels, axis=1)
+	a[::pixels, :, :3] = 0
+	a[:, ::pixels, :3] = 0
+	a[::pixels, :, 3] = 255
+	a[:, ::pixels, 3] = 255
+	return a
+
+#waaw/haah mirror one half sideways, woow/hooh one half vertically
+def effect_mirror(a, kind):
+	h, w = a.shape[:2]
+	if kind == 'waaw':
+		half = a[:, w-max(w//2, 1):]
+		return np.hstack((half[:, ::-1], half))
+	elif kind == 'haah':
+		half = a[:, :max(w//2, 1)]
+		return np.hstack((half, half[:, ::-1]))
+	elif kind == 'woow':
+		half = a[:max(h//2, 1)]
+		return np.vstack((half, half[::-1]))
+	elif kind == 'hooh':
+		half = a[h-max(h//2, 1):, ::-1]
+		return np.vstack((half[::-1], half))
+
+#cuts the image into ~10% squares, optionally shuffles them and turns them by multiples of 90
+def effect_tiles(a, shuffle=False, rotate=False):
+	h, w = a.shape[:2]
+	size = min(math.ceil(w * .1), math.ceil(h * .1))
+	fragmentsW = math.ceil(w / size)
+	fragmentsH = math.ceil(h / size)
+	canvas = np.zeros((fragmentsH*size, fragmentsW*size, 4), dtype=np.uint8)
+	canvas[:h, :w] = a
+	tiles = canvas.reshape(fragmentsH, size, fragmentsW, size, 4).swapaxes(1, 2).reshape(-1, size, size, 4)
+	#fresh state per call, forked pool workers would otherwise share one sequence
+	rand = np.random.RandomState()
+	if shuffle:
+		tiles = tiles[rand.permutation(len(tiles))]
+	if rotate:
+		#same odds as randint(-2, 2)*90 degrees clockwise
+		turns = rand.randint(-2, 3, len(tiles)) % 4
+		tiles = tiles.copy()
+		for k in (1, 2, 3):
+			idx = np.flatnonzero(turns == k)
+			tiles[idx] = np.rot90(tiles[idx], -k, axes=(1, 2))
+	return tiles.reshape(fragmentsH, fragmentsW, size, size, 4).swapaxes(1, 2).reshape(fragmentsH*size, fragmentsW*size, 4)
+
+#one frame per color combination, channels blended towards black by the given percents like -colorize
+def effect_rainbow(a, combinations):
+	img = PIL.Image.fromarray(a)
+	img.thumbnail((256, 256), PIL.Image.LANCZOS)
+	a = np.asarray(img, dtype=np.float32)
+	frames = []
+	for c in combinations:
+		frame = a.copy()
+		frame[..., :3] *= 1 - np.array(c, dtype=np.float32)/100
+		frames.append((np.clip(frame, 0, 255).astype(np.uint8), 20))
+	return frames
+
+#decoded overlays, fonts and sampling maps, kept per pool worker, least recently used dropped first
+effect_assets = OrderedDict()
+effect_asset_limit = 64
+
+def effect_asset(key, make):
+	if key in effect_assets:
+		effect_assets.move_to_end(key)
+	else:
+		effect_assets[key] = make()
+		while len(effect_assets) > effect_asset_limit:
+			effect_assets.popitem(last=False)
+	return effect_assets[key]
+
+def effect_image(path):
+	return effect_asset(('image', path), lambda: PIL.Image.open(path).convert('RGBA'))
+
+def fit_array(a, size, grow=False):
+	img = PIL.Image.fromarray(a)
+	w, h = img.size
+	scale = min(size[0]/w, size[1]/h)
+	if scale < 1 or grow:
+		img = img.resize((max(int(w*scale), 1), max(int(h*scale), 1)), PIL.Image.LANCZOS)
+	return img
+
+#the image stretched to 640x640 and jittered around a 512 canvas, with an optional banner under it
+def effect_shake(a, banner=None):
+	img = PIL.Image.fromarray(a).resize((640, 640), PIL.Image.LANCZOS)
+	height = 512
+	if banner:
+		banner = effect_image(banner)
+		height += banner.size[1]
+	frames = []
+	for offset in ((-60, -60), (-45, -50), (-50, -45), (-45, -65)):
+		frame = PIL.Image.new('RGBA', (512, height))
+		frame.paste(img, offset, img)
+		if banner:
+			frame.paste(banner, (0, 512), banner)
+		frames.append((np.asarray(frame), 20))
+	return frames
+
+#image scaled to 256 wide with a banner under it
+def effect_append(a, banner):
+	img = PIL.Image.fromarray(a)
+	img = img.resize((256, max(int(img.size[1]*256/img.size[0]), 1)), PIL.Image.LANCZOS)
+	banner = effect_image(banner)
+	final = PIL.Image.new('RGBA', (max(256, banner.size[0]), img.size[1]+banner.size[1]), (255, 255, 255, 255))
+	final.paste(img, (0, 0), img)
+	final.paste(banner, (0, img.size[1]), banner)
+	return np.asarray(final)
+
+def effect_layer(a):
+	return np.vstack((np.hstack((a, a[:, ::-1])), np.hstack((a[::-1], a[::-1, ::-1]))))
+
+def effect_rotate(a, degrees):
+	return np.asarray(PIL.Image.fromarray(a).rotate(degrees))
+
+#per column row shift of a -wave amplitude, broadcast against the output rows
+def wave_shift(w, amp, wavelength):
+	return np.rint(amp*np.sin(2*np.pi*np.arange(w)/wavelength)).astype(np.int64)
+
+def effect_wave(a, wavelength=15):
+	img = fit_array(a, (256, 256))
+	a = np.asarray(img)
+	h, w = a.shape[:2]
+	amps = [5, 10, 15, 20, 15, 10, 5]
+	max_amp = max(amps)
+	padded = np.zeros((h + 1, w, 4), dtype=np.uint8)
+	padded[:h] = a
+	first = np.zeros((h + 2*max_amp, w, 4), dtype=np.uint8)
+	first[max_amp:max_amp+h] = a
+	frames = [(first, 40)]
+	for amp in amps:
+		shift = effect_asset(('wave', w, amp, wavelength), lambda: wave_shift(w, -amp, wavelength))
+		#the output is 2*max_amp taller, out of range rows read the transparent row at h
+		rows = np.arange(h + 2*max_amp)[:, None] - max_amp + shift
+		rows = np.where((rows >= 0) & (rows < h), rows, h)
+		frames.append((padded[rows, np.arange(w)], 40))
+	return frames
+
+#source pixel for every pixel of a 512x512 output under the wall perspective, wrapping like -virtual-pixel tile
+def wall_map(size=512):
+	src = [(0, 0), (0, 128), (128, 0), (128, 128)]
+	dst = [(57, 42), (63, 130), (140, 60), (140, 140)]
+	matrix = []
+	for (x, y), (u, v) in zip(dst, src):
+		matrix.append([x, y, 1, 0, 0, 0, -u*x, -u*y])
+		matrix.append([0, 0, 0, x, y, 1, -v*x, -v*y])
+	ca, cb, cc, cd, ce, cf, cg, ch = np.linalg.solve(np.array(matrix, dtype=np.float64), np.array(src, dtype=np.float64).reshape(8))
+	y, x = np.mgrid[0:size, 0:size]
+	d = cg*x + ch*y + 1
+	sx = np.floor((ca*x + cb*y + cc)/d).astype(np.int64) % size
+	sy = np.floor((cd*x + ce*y + cf)/d).astype(np.int64) % size
+	return sy, sx
+
+def effect_wall(a):
+	a = np.asarray(PIL.Image.fromarray(a).resize((512, 512), PIL.Image.LANCZOS))
+	sy, sx = effect_asset('wall', wall_map)
+	return a[sy, sx]
+
+#18 frames of the image cut into a circle, turning 20 degrees clockwise each
+def effect_spin(a):
+	img = fit_array(a, (256, 256), grow=True)
+	canvas = PIL.Image.new('RGBA', (256, 256))
+	canvas.paste(img, ((256-img.size[0])//2, (256-img.size[1])//2))
+	def circle():
+		mask = PIL.Image.new('L', (256, 256), 0)
+		PIL.ImageDraw.Draw(mask).ellipse((0, 0, 256, 256), fill=255)
+		return np.asarray(mask)
+	mask = effect_asset('spin', circle)
+	frames = []
+	for degrees in range(0, 360, 20):
+		frame = np.array(canvas.rotate(-degrees))
+		frame[..., 3] = np.minimum(frame[..., 3], mask)
+		frames.append((frame, 50))
+	return frames
+
+#gta wasted sign, sizes follow the old -resize chain
+def effect_wasted(a, font_path):
+	img = PIL.Image.fromarray(a)
+	width, height = img.size
+	aspectRatio = height / width
+	aspectRatio2 = width / height
+	if width < 512:
+		width, height = 512, math.floor(aspectRatio * 512)
+	if height < 512:
+		width, height = math.floor(aspectRatio2 * 512), 512
+	if width > 1500:
+		width, height = 1500, math.floor(aspectRatio * 1500)
+	if height > 1500:
+		width, height = math.floor(aspectRatio2 * 1500), 1500
+	a = np.asarray(img.resize((max(width, 1), max(height, 1)), PIL.Image.LANCZOS), dtype=np.float32)
+	#-recolor '.3 .1 .3' for every channel
+	gray = a[..., :3] @ np.array([.3, .1, .3], dtype=np.float32)
+	a = a.copy()
+	a[..., :3] = np.clip(gray, 0, 255)[..., None]
+	signHeight = height * 0.2
+	top, bottom = int(height / 2 - signHeight / 2), int(height / 2 + signHeight / 2)
+	a[top:bottom+1, :, :3] *= 0.5
+	img = PIL.Image.fromarray(a.astype(np.uint8))
+	font = effect_asset(('font', font_path, math.floor(signHeight * 0.8)), lambda: PIL.ImageFont.truetype(font_path, max(math.floor(signHeight * 0.8), 1)))
+	draw = PIL.ImageDraw.Draw(img)
+	text_width, text_height = draw.textsize('wasted', font=font)
+	text_bottom = height - math.floor(height / 2 - signHeight * 0.45)
+	x, y = (width - text_width) / 2, text_bottom - text_height
+	#3px black stroke
+	for dx in range(-3, 4):
+		for dy in range(-3, 4):
+			if dx*dx + dy*dy <= 9:
+				draw.text((x+dx, y+dy), 'wasted', font=font, fill=(0, 0, 0, 255))
+	draw.text((x, y), 'wasted', font=font, fill=(200, 30, 30, 255))
+	return np.asarray(img)
+
+#coverage bitmap of every printable ascii glyph, one monospace cell each
+def ascii_atlas(font_path):
+	font = PIL.ImageFont.truetype(font_path, 15, encoding="unic")
+	width = font.getsize('M')[0]
+	height = sum(font.getmetrics())
+	atlas = np.zeros((128, height, width), dtype=np.uint8)
+	for c in range(32, 127):
+		glyph = PIL.Image.new('L', (width, height), 0)
+		PIL.ImageDraw.Draw(glyph).text((0, 0), chr(c), 255, font=font)
+		atlas[c] = np.asarray(glyph)
+	return atlas
+
+#aalib render of the image, glyphs blitted from the atlas on 15px lines, fit back to the input size
+def effect_ascii(a, font_path):
+	image = PIL.Image.fromarray(a)
+	image_width, image_height = image.size
+	screen = aalib.AsciiScreen(width=int(image_width/24.9)*10, height=int(image_height/41.39)*10)
+	screen.put_image((0, 0), image.convert('L').resize(screen.virtual_size))
+	lines = screen.render().splitlines()
+	atlas = effect_asset(('ascii', font_path), lambda: ascii_atlas(font_path))
+	glyph_height, glyph_width = atlas.shape[1:]
+	codes = np.full((len(lines), max(len(line) for line in lines)), 32, dtype=np.uint8)
+	for row, line in enumerate(lines):
+		codes[row, :len(line)] = np.frombuffer(line.encode('ascii', 'replace'), dtype=np.uint8)
+	#lines are 15px apart, taller glyphs overlap the next line like draw.text did
+	ink = np.zeros((len(lines)*15 + glyph_height, codes.shape[1]*glyph_width), dtype=np.uint8)
+	for row, line_codes in enumerate(codes):
+		strip = atlas[line_codes].transpose(1, 0, 2).reshape(glyph_height, -1)
+		band = ink[row*15:row*15+glyph_height]
+		np.maximum(band, strip, out=band)
+	img = PIL.Image.fromarray(255 - ink[:len(lines)*15])
+	return np.asarray(PIL.ImageOps.fit(img, (image_width, image_height), PIL.Image.ANTIALIAS))
+
+def encode_array(result):
+	final = BytesIO()
+	if isinstance(result, list):
+		imgs = [PIL.Image.fromarray(frame) for frame, duration in result]
+		imgs[0].save(final, 'GIF', save_all=True, append_images=imgs[1:], duration=[duration for frame, duration in result], loop=0, disposal=2)
+	else:
+		PIL.Image.fromarray(np.ascontiguousarray(result)).save(final, 'png')
+	return final.getvalue()
+
+#faces for eyes in one format whatever the backend: pupils in image pixels, face height and head pose in degrees
+def face_points(left, right, height, yaw=0, pitch=0, roll=0):
+	return {'pupilLeft': left, 'pupilRight': right, 'height': height, 'headPose': {'yaw': yaw, 'pitch': pitch, 'roll': roll}}
+
+#haar cascades that ship with opencv, detection runs on at most 800px and is scaled back
+def local_landmarks(data):
+	face_cascade, eye_cascade = effect_asset('cascades', lambda: (cv2.CascadeClassifier(cv2.data.haarcascades+'haarcascade_frontalface_default.xml'), cv2.CascadeClassifier(cv2.data.haarcascades+'haarcascade_eye.xml')))
+	gray = np.asarray(PIL.Image.open(BytesIO(data)).convert('L'))
+	scale = min(1, 800/max(gray.shape))
+	if scale < 1:
+		gray = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+	gray = cv2.equalizeHist(gray)
+	faces = []
+	smallest = max(24, min(gray.shape)//20)
+	for x, y, w, h in face_cascade.detectMultiScale(gray, scaleFactor=1.15, minNeighbors=5, minSize=(smallest, smallest)):
+		#eyes are looked for in the top half of the face, the two biggest hits win
+		eyes = eye_cascade.detectMultiScale(gray[y:y+h//2, x:x+w], scaleFactor=1.1, minNeighbors=3, minSize=(w//8, w//8))
+		eyes = sorted(eyes, key=lambda e: e[2]*e[3], reverse=True)[:2]
+		if len(eyes) == 2:
+			(lx, ly), (rx, ry) = sorted((x+ex+ew/2, y+ey+eh/2) for ex, ey, ew, eh in eyes)
+		else:
+			(lx, ly), (rx, ry) = (x+w*0.3, y+h*0.38), (x+w*0.7, y+h*0.38)
+		roll = math.degrees(math.atan2(ry-ly, rx-lx))
+		faces.append(face_points((float(lx/scale), float(ly/scale)), (float(rx/scale), float(ry/scale)), float(h/scale), roll=roll))
+	return faces
+
+#numpy pixel sorting with the pixelsort package's interval modes and sort keys
+#interval starts are found for the whole image, rows are then sorted in strips across the image pool
+def sort_key(a, s_func):
+	rgb = a[..., :3].astype(np.int32)
+	if s_func == 'intensity':
+		return rgb.sum(axis=2)
+	elif s_func == 'maximum':
+		return rgb.max(axis=2)
+	elif s_func == 'minimum':
+		return rgb.min(axis=2)
+	#lightness is (max+min)/2, kept doubled so it stays an integer
+	return rgb.max(axis=2) + rgb.min(axis=2)
+
+#running positions per row from random steps, widened until every row is past the right edge
+def step_starts(h, w, step):
+	positions = np.cumsum(step((h, w//sort_char_length+2)), axis=1)
+	while positions[:, -1].min() < w:
+		positions = np.hstack((positions, positions[:, -1:] + np.cumsum(step((h, positions.shape[1])), axis=1)))
+	starts = np.zeros((h, w), dtype=bool)
+	rows, cols = np.nonzero(positions < w)
+	starts[rows, positions[rows, cols]] = True
+	return starts
+
+#True where a new interval starts
+def interval_starts(a, interval):
+	h, w = a.shape[:2]
+	rand = np.random.RandomState()
+	if interval == 'threshold':
+		light = sort_key(a, 'lightness')
+		return (light < sort_lower_threshold*510) | (light > sort_upper_threshold*510)
+	elif interval == 'edges':
+		edges = np.asarray(PIL.Image.fromarray(np.ascontiguousarray(a[..., :3])).filter(PIL.ImageFilter.FIND_EDGES))
+		edge = sort_key(edges, 'lightness') >= sort_lower_threshold*510
+		starts = edge.copy()
+		starts[:, 1:] &= ~edge[:, :-1]
+		return starts
+	elif interval == 'random':
+		return step_starts(h, w, lambda shape: (sort_char_length*rand.random_sample(shape)).astype(int))
+	elif interval == 'waves':
+		return step_starts(h, w, lambda shape: sort_char_length+rand.randint(0, 11, shape))
+	return np.zeros((h, w), dtype=bool)
+
+def sort_prepare(data, interval, angle):
+	img = PIL.Image.open(BytesIO(data)).convert('RGBA')
+	if angle:
+		img = img.rotate(angle, expand=True)
+	a = np.asarray(img)
+	return a, interval_starts(a, interval)
+
+#sorting each row by (interval, key) with a stable sort keeps pixels inside their interval
+def sort_rows(a, starts, s_func, randomness):
+	h, w = starts.shape
+	interval = np.cumsum(starts, axis=1)
+	key = sort_key(a, s_func)
+	if randomness:
+		#randomness is the percent chance an interval is left as it is
+		skip = np.random.RandomState().random_sample((h, w+1))*100 < randomness
+		key = np.where(np.take_along_axis(skip, interval, axis=1), 0, key)
+	order = np.argsort(interval*1024 + key, axis=1, kind='stable')
+	return np.take_along_axis(a, order[..., None], axis=1)
+
+def sort_finish(a, angle, size):
+	img = PIL.Image.fromarray(a)
+	if angle:
+		img = img.rotate(-angle, expand=True)
+		left, upper = (img.size[0]-size[0])//2, (img.size[1]-size[1])//2
+		img = img.crop((left, upper, left+size[0], upper+size[1]))
+	b = BytesIO()
+	img.save(b, 'png')
+	return b.getvalue()
+
+#effects with random output, every other effect is served from the result cache on repeats
+random_effects = (effect_tiles,)
+
+#runs in the image pool: decode once, apply, encode
+def run_effect(effect, data, *args):
+	a = np.asarray(PIL.Image.open(BytesIO(data)).convert('RGBA'))
+	return encode_array(effect(a, *args))
+
+#lru of api results keyed by search and google safety level, entries expire after ttl
+class SearchCache():
+	def __init__(self, max_size, ttl, path=None):
+		self.max_size = max_size
+		self.ttl = ttl
+		self.path = path
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		if path and os.path.isfile(path):
+			try:
+				with open(path) as f:
+					entries = json.load(f)
+				now = time.time()
+				for key, value in entries:
+					if value[1] > now:
+						self.entries[key] = value
+			except Exception as e:
+				print(e)
+
+	def key(self, search, level):
+		return '{0}:{1}'.format(level, search)
+
+	def get(self, search, level):
+		key = self.key(search, level)
+		if key in self.entries:
+			result, expires = self.entries[key]
+			if expires > time.time():
+				self.entries.move_to_end(key)
+				self.hits += 1
+				return result
+			del self.entries[key]
+		self.misses += 1
+		return None
+
+	def set(self, search, level, result):
+		key = self.key(search, level)
+		self.entries[key] = [result, time.time()+self.ttl]
+		self.entries.move_to_end(key)
+		while len(self.entries) > self.max_size:
+			self.entries.popitem(last=False)
+
+	#the entries are copied on the loop, written in a thread
+	def snapshot(self):
+		return list(self.entries.items())
+
+	def save(self, entries):
+		if not self.path:
+			return
+		tmp = self.path+'.tmp'
+		with open(tmp, 'w') as f:
+			json.dump(entries, f)
+		os.replace(tmp, self.path)
+
+#outputs of deterministic commands on disk, keyed by the sha256 of the input images plus the command and its arguments
+class ResultCache():
+	def __init__(self, path, max_bytes):
+		self.path = path
+		self.max_bytes = max_bytes
+		self.lock = threading.Lock()
+		self.hits = 0
+		self.misses = 0
+		#oldest first so eviction survives restarts
+		self.files = OrderedDict()
+		self.size = 0
+		names = [name for name in os.listdir(path) if name.endswith('.bin')]
+		names.sort(key=lambda name: os.path.getmtime(path+name))
+		for name in names:
+			self.files[name[:-4]] = os.path.getsize(path+name)
+			self.size += self.files[name[:-4]]
+
+	def key(self, name, args, *inputs):
+		h = hashlib.sha256()
+		for data in inputs:
+			h.update(hashlib.sha256(data).digest())
+		h.update(json.dumps([name, args], default=str).encode())
+		return h.hexdigest()
+
+	#a stored file is the length of the message text, the text, then the image
+	def get(self, key):
+		with self.lock:
+			if key not in self.files:
+				self.misses += 1
+				return None
+			self.files.move_to_end(key)
+		try:
+			with open(self.path+key+'.bin', 'rb') as f:
+				data = f.read()
+			os.utime(self.path+key+'.bin')
+		except OSError:
+			with self.lock:
+				self.size -= self.files.pop(key, 0)
+				self.misses += 1
+			return None
+		with self.lock:
+			self.hits += 1
+		length = int.from_bytes(data[:4], 'big')
+		content = data[4:4+length].decode() if length else None
+		return data[4+length:], content
+
+	def set(self, key, data, content=None):
+		text = content.encode() if content else b''
+		tmp = self.path+key+'.tmp'
+		with open(tmp, 'wb') as f:
+			f.write(len(text).to_bytes(4, 'big'))
+			f.write(text)
+			f.write(data)
+		os.replace(tmp, self.path+key+'.bin')
+		evicted = []
+		with self.lock:
+			self.size -= self.files.pop(key, 0)
+			self.files[key] = 4+len(text)+len(data)
+			self.size += self.files[key]
+			while self.size > self.max_bytes and len(self.files) > 1:
+				old, size = self.files.popitem(last=False)
+				self.size -= size
+				evicted.append(old)
+		for old in evicted:
+			try:
+				os.remove(self.path+old+'.bin')
+			except OSError:
+				pass
+
+class ImageRejected(Exception):
+	def __init__(self, reason, probe):
+		super().__init__(reason)
+		self.reason = reason
+		self.probe = probe
+
+#fed the download as it streams, reads the format and size from the header and counts gif frames as they arrive
+#raises ImageRejected as soon as a limit is broken so the rest is never downloaded
+class ImageProbe():
+	def __init__(self, formats=None, max_bytes=None, max_dimensions=None, max_frames=None):
+		self.formats = formats
+		self.max_bytes = max_bytes
+		self.max_dimensions = max_dimensions
+		self.max_frames = max_frames
+		self.received = 0
+		#only the unparsed tail is kept, pos is relative to it and can run past it while skipping
+		self.data = bytearray()
+		self.format = None
+		self.width = None
+		self.height = None
+		self.frames = 0
+		self.pos = 0
+		self.done = False
+
+	def feed(self, chunk):
+		self.received += len(chunk)
+		if self.max_bytes and self.received > self.max_bytes:
+			raise ImageRejected('size', self)
+		if self.done:
+			return
+		self.data.extend(chunk)
+		data = self.data
+		if self.format is None:
+			if data[:8] == b'\x89PNG\r\n\x1a\n':
+				self.format = 'png'
+			elif data[:6] in (b'GIF87a', b'GIF89a'):
+				self.format = 'gif'
+			elif data[:2] == b'\xff\xd8':
+				self.format = 'jpeg'
+				self.pos = 2
+			elif len(data) < 8:
+				return
+			else:
+				#nothing more to read from it, only the byte count is still checked
+				self.format = 'unknown'
+				self.done = True
+			if self.formats and self.format not in self.formats:
+				raise ImageRejected('format', self)
+		if self.width is None:
+			if self.format == 'png' and len(data) >= 24:
+				self.width, self.height = int.from_bytes(data[16:20], 'big'), int.from_bytes(data[20:24], 'big')
+				self.frames = 1
+				self.done = True
+			elif self.format == 'gif' and len(data) >= 13:
+				self.width, self.height = int.from_bytes(data[6:8], 'little'), int.from_bytes(data[8:10], 'little')
+				self.pos = 13
+				if data[10] & 0x80:
+					self.pos += 3 << ((data[10] & 7) + 1)
+			elif self.format == 'jpeg':
+				self._jpeg()
+			if self.width is not None and self.max_dimensions and (self.width > self.max_dimensions[0] or self.height > self.max_dimensions[1]):
+				raise ImageRejected('dimensions', self)
+		if self.format == 'gif' and self.width is not None and not self.done:
+			self._gif()
+		if self.done:
+			del self.data[:]
+		elif self.width is not None or self.format == 'jpeg':
+			consumed = min(self.pos, len(self.data))
+			del self.data[:consumed]
+			self.pos -= consumed
+
+	#jpeg size is in the first start of frame segment, usually after the exif block
+	def _jpeg(self):
+		data = self.data
+		pos = self.pos
+		while pos + 9 <= len(data):
+			if data[pos] != 0xFF:
+				self.done = True
+				break
+			marker = data[pos+1]
+			if marker == 0xFF:
+				pos += 1
+				continue
+			if marker in (0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF):
+				self.height, self.width = int.from_bytes(data[pos+5:pos+7], 'big'), int.from_bytes(data[pos+7:pos+9], 'big')
+				self.frames = 1
+				self.done = True
+				break
+			pos += 2 + int.from_bytes(data[pos+2:pos+4], 'big')
+		self.pos = pos
+
+	#offset past a run of gif data sub-blocks, None until all of it has arrived
+	def _sub_blocks(self, pos):
+		data = self.data
+		while pos < len(data):
+			if data[pos] == 0:
+				return pos + 1
+			pos += data[pos] + 1
+		return None
+
+	def _gif(self):
+		data = self.data
+		pos = self.pos
+		while pos < len(data):
+			block = data[pos]
+			if block == 0x3B:
+				self.done = True
+				break
+			elif block == 0x21:
+				end = self._sub_blocks(pos + 2)
+			elif block == 0x2C:
+				if pos + 10 >= len(data):
+					break
+				flags = data[pos+9]
+				end = pos + 10
+				if flags & 0x80:
+					end += 3 << ((flags & 7) + 1)
+				end = self._sub_blocks(end + 1)
+				if end is not None:
+					self.frames += 1
+					if self.max_frames and self.frames > self.max_frames:
+						raise ImageRejected('frames', self)
+			else:
+				self.done = True
+				break
+			if end is None:
+				break
+			pos = end
+		self.pos = pos
+
+#rendered emoji pngs packed into one append-only file that is memory mapped for reads
+#an entry is added the first time an svg is asked for at one of emoji_atlas_sizes, the index is a log of [key, offset, length] lines
+class EmojiAtlas():
+	def __init__(self, path, max_bytes):
+		self.path = path
+		self.index_path = path+'.index'
+		self.max_bytes = max_bytes
+		self.lock = threading.Lock()
+		self.entries = {}
+		self.map = None
+		self.size = os.path.getsize(path) if os.path.isfile(path) else 0
+		if os.path.isfile(self.index_path):
+			with open(self.index_path) as f:
+				for line in f:
+					try:
+						key, offset, length = json.loads(line)
+					except ValueError:
+						continue
+					#the data is written before its index line, anything past the end is from a crash
+					if offset+length <= self.size:
+						self.entries[key] = (offset, length)
+
+	def get(self, key):
+		entry = self.entries.get(key)
+		if entry is None:
+			return None
+		offset, length = entry
+		with self.lock:
+			if self.map is None or len(self.map) < offset+length:
+				if self.map is not None:
+					self.map.close()
+				with open(self.path, 'rb') as f:
+					self.map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+			return self.map[offset:offset+length]
+
+	def add(self, key, data):
+		with self.lock:
+			if key in self.entries or self.size+len(data) > self.max_bytes:
+				return
+			with open(self.path, 'ab') as f:
+				offset = f.tell()
+				f.write(data)
+			with open(self.index_path, 'a') as f:
+				f.write(json.dumps([key, offset, len(data)])+'\n')
+			self.entries[key] = (offset, len(data))
+			self.size = offset+len(data)
+
+	def close(self):
+		with self.lock:
+			if self.map is not None:
+				self.map.close()
+				self.map = None
+
+#runs in the image pool
+def render_svg(path, size):
+	with open(path, 'rb') as f:
+		svg = f.read()
+	s = bytes(str(size), encoding="utf-8")
+	return cairosvg.svg2png(svg.replace(b"<svg ", b"<svg width=\"" + s + b"px\" height=\"" + s + b"px\" "))
+
+#pixels x frames, gif frames are counted from their graphic control blocks so nothing gets decoded
+def image_cost(b):
+	data = b.getvalue()
+	try:
+		width, height = PIL.Image.open(BytesIO(data)).size
+	except Exception:
+		return 1
+	frames = data.count(b'\x21\xf9\x04') if data[:3] == b'GIF' else 1
+	return width*height*max(frames, 1)
+
+class ImageJob():
+	def __init__(self, guild, user, cost, loop):
+		self.guild = guild
+		self.user = user
+		self.cost = cost
+		self.granted = asyncio.Future(loop=loop)
+		self.task = None
+		#True from being granted a slot until it's given back
+		self.slot = False
+		self.cancelled = False
+		#executor futures still running, the slot is held until they finish even if the task was cancelled
+		self.work = set()
+		self.finished = False
+
+#runs heavy jobs a few at a time, the next job comes from the guild and then the user that has used the least cost
+class ImageScheduler():
+	def __init__(self, loop, slots):
+		self.loop = loop
+		self.slots = slots
+		self.running = 0
+		#guild -> user -> jobs, in arrival order so ties go to whoever waited longest
+		self.queues = OrderedDict()
+		self.usage = {}
+		self.jobs = {}
+		self.stats = {'done': 0, 'cancelled': 0, 'cost': 0}
+		#for submit() without an executor, never busier than the slots anyway
+		self.threads = ThreadPoolExecutor(max_workers=slots)
+
+	def _pop(self, queues, usage):
+		guild = min(queues, key=lambda g: usage.get(g, 0))
+		users = queues[guild]
+		user = min(users, key=lambda u: usage.get((guild, u), 0))
+		jobs = users[user]
+		job = jobs.popleft()
+		if not jobs:
+			del users[user]
+		if not users:
+			del queues[guild]
+		usage[guild] = usage.get(guild, 0) + job.cost
+		usage[(guild, job.user)] = usage.get((guild, job.user), 0) + job.cost
+		return job
+
+	def _dispatch(self):
+		while self.queues and self.running < self.slots:
+			job = self._pop(self.queues, self.usage)
+			if job.granted.cancelled():
+				continue
+			self.running += 1
+			job.slot = True
+			job.granted.set_result(None)
+
+	def _enqueue(self, job):
+		if not self.queues and not self.running:
+			self.usage.clear()
+		elif job.guild not in self.queues and self.queues:
+			#an idle guild starts level with the busiest waiting guild instead of banking credit
+			floor = min(self.usage.get(g, 0) for g in self.queues)
+			self.usage[job.guild] = max(self.usage.get(job.guild, 0), floor)
+		users = self.queues.setdefault(job.guild, OrderedDict())
+		users.setdefault(job.user, deque()).append(job)
+
+	def _remove(self, job):
+		users = self.queues.get(job.guild)
+		if users is None or job not in users.get(job.user, ()):
+			return
+		users[job.user].remove(job)
+		if not users[job.user]:
+			del users[job.user]
+		if not users:
+			del self.queues[job.guild]
+
+	def position(self, job):
+		usage = dict(self.usage)
+		queues = OrderedDict((g, OrderedDict((u, deque(jobs)) for u, jobs in users.items())) for g, users in self.queues.items())
+		position = 0
+		while queues:
+			position += 1
+			if self._pop(queues, usage) is job:
+				break
+		return position
+
+	def queued(self):
+		return sum(len(jobs) for users in self.queues.values() for jobs in users.values())
+
+	def _release(self, job):
+		if job.slot:
+			job.slot = False
+			self.running -= 1
+
+	#jobs run their executor work through here so a cancelled job keeps its slot until that work is done
+	def submit(self, job, executor, func, *args):
+		future = (executor or self.threads).submit(func, *args)
+		job.work.add(future)
+		def done(future):
+			#called from the worker
+			if not self.loop.is_closed():
+				self.loop.call_soon_threadsafe(self._work_done, job, future)
+		future.add_done_callback(done)
+		return asyncio.wrap_future(future, loop=self.loop)
+
+	def _work_done(self, job, future):
+		job.work.discard(future)
+		if job.finished and not job.work:
+			self._release(job)
+			self._dispatch()
+
+	#func is called with the job first, raises CancelledError when cancel() is called for the job's message
+	async def run(self, key, guild, user, cost, func, *args, notify=None):
+		job = ImageJob(guild, user, cost, self.loop)
+		self.jobs[key] = job
+		self._enqueue(job)
+		self._dispatch()
+		waited = not job.granted.done() and notify is not None
+		try:
+			if waited:
+				await notify(self.position(job))
+			await job.granted
+			if waited:
+				await notify(0)
+			if job.cancelled:
+				raise asyncio.CancelledError()
+			job.task = asyncio.ensure_future(func(job, *args), loop=self.loop)
+			result = await job.task
+			self.stats['done'] += 1
+			self.stats['cost'] += cost
+			return result
+		except asyncio.CancelledError:
+			self.stats['cancelled'] += 1
+			raise
+		finally:
+			if self.jobs.get(key) is job:
+				del self.jobs[key]
+			if job.granted.done() and not job.granted.cancelled():
+				job.finished = True
+				if not job.work:
+					self._release(job)
+			else:
+				job.granted.cancel()
+				self._remove(job)
+			self._dispatch()
+
+	def cancel(self, key):
+		job = self.jobs.get(key)
+		if job is None:
+			return False
+		if job.task is not None:
+			job.task.cancel()
+			#work that hasn't started is dropped, running work still holds the slot
+			for future in list(job.work):
+				future.cancel()
+		elif job.granted.done():
+			#granted but not started yet, run() stops before starting it and the slot goes to the next job now
+			job.cancelled = True
+			self._release(job)
+			self._dispatch()
+		else:
+			job.granted.cancel()
+		return True
+
 class Main(Cog):
 	def __init__(self, bot):
 		super().__init__(bot)
 		self.discord_path = bot.path.discord
 		self.files_path = bot.path.files
-		self.download = bot.download
-		self.bytes_download = bot.bytes_download
 		self.isimage = bot.isimage
 		self.isgif = bot.isgif
 		self.get_json = bot.get_json
@@ -71,9 +968,16 @@ class Main(Cog):
 			self.imgur_client = ImgurClient("", "")
 		except:
 			bot.remove_command('imgur')
-		self.image_cache = {}
-		self.search_cache = {}
-		self.youtube_cache = {}
+		cache_dir = self.files_path('cache/')
+		os.makedirs(cache_dir, exist_ok=True)
+		self.search_caches = OrderedDict()
+		for name, limits in search_cache_limits.items():
+			self.search_caches[name] = SearchCache(*limits, path=cache_dir+'{0}.json'.format(name))
+		self.image_cache = self.search_caches['image']
+		self.search_cache = self.search_caches['search']
+		self.youtube_cache = self.search_caches['youtube']
+		self.landmark_cache = self.search_caches['landmarks']
+		self.landmark_backends = [name for name in landmark_backends if name != 'local' or cv2Available]
 		self.twitch_cache = []
 		self.api_count = 0
 		self.emojis = {"soccer": "⚽", "basketball": "🏀", "football": "🏈", "baseball": "⚾", "tennis": "🎾", "volleyball": "🏐", "rugby_football": "🏉", "8ball": "🎱", "golf": "⛳", "golfer": "🏌", "ping_pong": "🏓", "badminton": "🏸", "hockey": "🏒", "field_hockey": "🏑", "cricket": "🏏", "ski": "🎿", "skier": "⛷", "snowboarder": "🏂", "ice_skate": "⛸", "bow_and_arrow": "🏹", "fishing_pole_and_fish": "🎣", "rowboat": "🚣", "swimmer": "🏊", "surfer": "🏄", "bath": "🛀", "basketball_player": "⛹", "lifter": "🏋", "bicyclist": "🚴", "mountain_bicyclist": "🚵", "horse_racing": "🏇", "levitate": "🕴", "trophy": "🏆", "running_shirt_with_sash": "🎽", "medal": "🏅", "military_medal": "🎖", "reminder_ribbon": "🎗", "rosette": "🏵", "ticket": "🎫", "tickets": "🎟", "performing_arts": "🎭", "art": "🎨", "circus_tent": "🎪", "microphone": "🎤", "headphones": "🎧", "musical_score": "🎼", "musical_keyboard": "🎹", "saxophone": "🎷", "trumpet": "🎺", "guitar": "🎸", "violin": "🎻", "clapper": "🎬", "video_game": "🎮", "space_invader": "👾", "dart": "🎯", "game_die": "🎲", "slot_machine": "🎰", "bowling": "🎳", "♡": "heart", "green_apple": "🍏", "apple": "🍎", "pear": "🍐", "tangerine": "🍊", "lemon": "🍋", "banana": "🍌", "watermelon": "🍉", "grapes": "🍇", "strawberry": "🍓", "melon": "🍈", "cherries": "🍒", "peach": "🍑", "pineapple": "🍍", "tomato": "🍅", "eggplant": "🍆", "hot_pepper": "🌶", "corn": "🌽", "sweet_potato": "🍠", "honey_pot": "🍯", "bread": "🍞", "cheese": "🧀", "poultry_leg": "🍗", "meat_on_bone": "🍖", "fried_shrimp": "🍤", "egg": "🍳", "cooking": "🍳", "hamburger": "🍔", "fries": "🍟", "hotdog": "🌭", "pizza": "🍕", "spaghetti": "🍝", "taco": "🌮", "burrito": "🌯", "ramen": "🍜", "stew": "🍲", "fish_cake": "🍥", "sushi": "🍣", "bento": "🍱", "curry": "🍛", "rice_ball": "🍙", "rice": "🍚", "rice_cracker": "🍘", "oden": "🍢", "dango": "🍡", "shaved_ice": "🍧", "ice_cream": "🍨", "icecream": "🍦", "cake": "🍰", "birthday": "🎂", "custard": "🍮", "candy": "🍬", "lollipop": "🍭", "chocolate_bar": "🍫", "popcorn": "🍿", "doughnut": "🍩", "cookie": "🍪", "beer": "🍺", "beers": "🍻", "wine_glass": "🍷", "cocktail": "🍸", "tropical_drink": "🍹", "champagne": "🍾", "sake": "🍶", "tea": "🍵", "coffee": "☕", "baby_bottle": "🍼", "fork_and_knife": "🍴", "fork_knife_plate": "🍽", "dog": "🐶", "cat": "🐱", "mouse": "🐭", "hamster": "🐹", "rabbit": "🐰", "bear": "🐻", "panda_face": "🐼", "koala": "🐨", "tiger": "🐯", "lion_face": "🦁", "cow": "🐮", "pig": "🐷", "pig_nose": "🐽", "frog": "🐸", "octopus": "🐙", "monkey_face": "🐵", "see_no_evil": "🙈", "hear_no_evil": "🙉", "speak_no_evil": "🙊", "monkey": "🐒", "chicken": "🐔", "penguin": "🐧", "bird": "🐦", "baby_chick": "🐤", "hatching_chick": "🐣", "hatched_chick": "🐥", "wolf": "🐺", "boar": "🐗", "horse": "🐴", "unicorn": "🦄", "bee": "🐝", "honeybee": "🐝", "bug": "🐛", "snail": "🐌", "beetle": "🐞", "ant": "🐜", "spider": "🕷", "scorpion": "🦂", "crab": "🦀", "snake": "🐍", "turtle": "🐢", "tropical_fish": "🐠", "fish": "🐟", "blowfish": "🐡", "dolphin": "🐬", "flipper": "🐬", "whale": "🐳", "whale2": "🐋", "crocodile": "🐊", "leopard": "🐆", "tiger2": "🐅", "water_buffalo": "🐃", "ox": "🐂", "cow2": "🐄", "dromedary_camel": "🐪", "camel": "🐫", "elephant": "🐘", "goat": "🐐", "ram": "🐏", "sheep": "🐑", "racehorse": "🐎", "pig2": "🐖", "rat": "🐀", "mouse2": "🐁", "rooster": "🐓", "turkey": "🦃", "dove": "🕊", "dog2": "🐕", "poodle": "🐩", "cat2": "🐈", "rabbit2": "🐇", "chipmunk": "🐿", "feet": "🐾", "paw_prints": "🐾", "dragon": "🐉", "dragon_face": "🐲", "cactus": "🌵", "christmas_tree": "🎄", "evergreen_tree": "🌲", "deciduous_tree": "🌳", "palm_tree": "🌴", "seedling": "🌱", "herb": "🌿", "shamrock": "☘", "four_leaf_clover": "🍀", "bamboo": "🎍", "tanabata_tree": "🎋", "leaves": "🍃", "fallen_leaf": "🍂", "maple_leaf": "🍁", "ear_of_rice": "🌾", "hibiscus": "🌺", "sunflower": "🌻", "rose": "🌹", "tulip": "🌷", "blossom": "🌼", "cherry_blossom": "🌸", "bouquet": "💐", "mushroom": "🍄", "chestnut": "🌰", "jack_o_lantern": "🎃", "shell": "🐚", "spider_web": "🕸", "earth_americas": "🌎", "earth_africa": "🌍", "earth_asia": "🌏", "full_moon": "🌕", "waning_gibbous_moon": "🌖", "last_quarter_moon": "🌗", "waning_crescent_moon": "🌘", "new_moon": "🌑", "waxing_crescent_moon": "🌒", "first_quarter_moon": "🌓", "waxing_gibbous_moon": "🌔", "moon": "🌔", "new_moon_with_face": "🌚", "full_moon_with_face": "🌝", "first_quarter_moon_with_face": "🌛", "last_quarter_moon_with_face": "🌜", "sun_with_face": "🌞", "crescent_moon": "🌙", "star": "⭐", "star2": "🌟", "dizzy": "💫", "sparkles": "✨", "comet": "☄", "sunny": "☀", "white_sun_small_cloud": "🌤", "partly_sunny": "⛅", "white_sun_cloud": "🌥", "white_sun_rain_cloud": "🌦", "cloud": "☁", "cloud_rain": "🌧", "thunder_cloud_rain": "⛈", "cloud_lightning": "🌩", "zap": "⚡", "fire": "🔥", "boom": "💥", "collision": "💥", "snowflake": "❄", "cloud_snow": "🌨", "snowman2": "☃", "snowman": "⛄", "wind_blowing_face": "🌬", "dash": "💨", "cloud_tornado": "🌪", "fog": "🌫", "umbrella2": "☂", "umbrella": "☔", "droplet": "💧", "sweat_drops": "💦", "ocean": "🌊", "watch": "⌚", "iphone": "📱", "calling": "📲", "computer": "💻", "keyboard": "⌨", "desktop": "🖥", "printer": "🖨", "mouse_three_button": "🖱", "trackball": "🖲", "joystick": "🕹", "compression": "🗜", "minidisc": "💽", "floppy_disk": "💾", "cd": "💿", "dvd": "📀", "vhs": "📼", "camera": "📷", "camera_with_flash": "📸", "video_camera": "📹", "movie_camera": "🎥", "projector": "📽", "film_frames": "🎞", "telephone_receiver": "📞", "telephone": "☎", "phone": "☎", "pager": "📟", "fax": "📠", "tv": "📺", "radio": "📻", "microphone2": "🎙", "level_slider": "🎚", "control_knobs": "🎛", "stopwatch": "⏱", "timer": "⏲", "alarm_clock": "⏰", "clock": "🕰", "hourglass_flowing_sand": "⏳", "hourglass": "⌛", "satellite": "📡", "battery": "🔋", "electric_plug": "🔌", "bulb": "💡", "flashlight": "🔦", "candle": "🕯", "wastebasket": "🗑", "oil": "🛢", "money_with_wings": "💸", "dollar": "💵", "yen": "💴", "euro": "💶", "pound": "💷", "moneybag": "💰", "credit_card": "💳", "gem": "💎", "scales": "⚖", "wrench": "🔧", "hammer": "🔨", "hammer_pick": "⚒", "tools": "🛠", "pick": "⛏", "nut_and_bolt": "🔩", "gear": "⚙", "chains": "⛓", "gun": "🔫", "bomb": "💣", "knife": "🔪", "hocho": "🔪", "dagger": "🗡", "crossed_swords": "⚔", "shield": "🛡", "smoking": "🚬", "skull_crossbones": "☠", "coffin": "⚰", "urn": "⚱", "amphora": "🏺", "crystal_ball": "🔮", "prayer_beads": "📿", "barber": "💈", "alembic": "⚗", "telescope": "🔭", "microscope": "🔬", "hole": "🕳", "pill": "💊", "syringe": "💉", "thermometer": "🌡", "label": "🏷", "bookmark": "🔖", "toilet": "🚽", "shower": "🚿", "bathtub": "🛁", "key": "🔑", "key2": "🗝", "couch": "🛋", "sleeping_accommodation": "🛌", "bed": "🛏", "door": "🚪", "bellhop": "🛎", "frame_photo": "🖼", "map": "🗺", "beach_umbrella": "⛱", "moyai": "🗿", "shopping_bags": "🛍", "balloon": "🎈", "flags": "🎏", "ribbon": "🎀", "gift": "🎁", "confetti_ball": "🎊", "tada": "🎉", "dolls": "🎎", "wind_chime": "🎐", "crossed_flags": "🎌", "izakaya_lantern": "🏮", "lantern": "🏮", "envelope": "✉", "email": "📧", "envelope_with_arrow": "📩", "incoming_envelope": "📨", "love_letter": "💌", "postbox": "📮", "mailbox_closed": "📪", "mailbox": "📫", "mailbox_with_mail": "📬", "mailbox_with_no_mail": "📭", "package": "📦", "postal_horn": "📯", "inbox_tray": "📥", "outbox_tray": "📤", "scroll": "📜", "page_with_curl": "📃", "bookmark_tabs": "📑", "bar_chart": "📊", "chart_with_upwards_trend": "📈", "chart_with_downwards_trend": "📉", "page_facing_up": "📄", "date": "📅", "calendar": "📆", "calendar_spiral": "🗓", "card_index": "📇", "card_box": "🗃", "ballot_box": "🗳", "file_cabinet": "🗄", "clipboard": "📋", "notepad_spiral": "🗒", "file_folder": "📁", "open_file_folder": "📂", "dividers": "🗂", "newspaper2": "🗞", "newspaper": "📰", "notebook": "📓", "closed_book": "📕", "green_book": "📗", "blue_book": "📘", "orange_book": "📙", "notebook_with_decorative_cover": "📔", "ledger": "📒", "books": "📚", "book": "📖", "open_book": "📖", "link": "🔗", "paperclip": "📎", "paperclips": "🖇", "scissors": "✂", "triangular_ruler": "📐", "straight_ruler": "📏", "pushpin": "📌", "round_pushpin": "📍", "triangular_flag_on_post": "🚩", "flag_white": "🏳", "flag_black": "🏴", "closed_lock_with_key": "🔐", "lock": "🔒", "unlock": "🔓", "lock_with_ink_pen": "🔏", "pen_ballpoint": "🖊", "pen_fountain": "🖋", "black_nib": "✒", "pencil": "📝", "memo": "📝", "pencil2": "✏", "crayon": "🖍", "paintbrush": "🖌", "mag": "🔍", "mag_right": "🔎", "grinning": "😀", "grimacing": "😬", "grin": "😁", "joy": "😂", "smiley": "😃", "smile": "😄", "sweat_smile": "😅", "laughing": "😆", "satisfied": "😆", "innocent": "😇", "wink": "😉", "blush": "😊", "slight_smile": "🙂", "upside_down": "🙃", "relaxed": "☺", "yum": "😋", "relieved": "😌", "heart_eyes": "😍", "kissing_heart": "😘", "kissing": "😗", "kissing_smiling_eyes": "😙", "kissing_closed_eyes": "😚", "stuck_out_tongue_winking_eye": "😜", "stuck_out_tongue_closed_eyes": "😝", "stuck_out_tongue": "😛", "money_mouth": "🤑", "nerd": "🤓", "sunglasses": "😎", "hugging": "🤗", "smirk": "😏", "no_mouth": "😶", "neutral_face": "😐", "expressionless": "😑", "unamused": "😒", "rolling_eyes": "🙄", "thinking": "🤔", "flushed": "😳", "disappointed": "😞", "worried": "😟", "angry": "😠", "rage": "😡", "pensive": "😔", "confused": "😕", "slight_frown": "🙁", "frowning2": "☹", "persevere": "😣", "confounded": "😖", "tired_face": "😫", "weary": "😩", "triumph": "😤", "open_mouth": "😮", "scream": "😱", "fearful": "😨", "cold_sweat": "😰", "hushed": "😯", "frowning": "😦", "anguished": "😧", "cry": "😢", "disappointed_relieved": "😥", "sleepy": "😪", "sweat": "😓", "sob": "😭", "dizzy_face": "😵", "astonished": "😲", "zipper_mouth": "🤐", "mask": "😷", "thermometer_face": "🤒", "head_bandage": "🤕", "sleeping": "😴", "zzz": "💤", "poop": "💩", "shit": "💩", "smiling_imp": "😈", "imp": "👿", "japanese_ogre": "👹", "japanese_goblin": "👺", "skull": "💀", "ghost": "👻", "alien": "👽", "robot": "🤖", "smiley_cat": "😺", "smile_cat": "😸", "joy_cat": "😹", "heart_eyes_cat": "😻", "smirk_cat": "😼", "kissing_cat": "😽", "scream_cat": "🙀", "crying_cat_face": "😿", "pouting_cat": "😾", "raised_hands": "🙌", "clap": "👏", "wave": "👋", "thumbsup": "👍", "+1": "👍", "thumbsdown": "👎", "-1": "👎", "punch": "👊", "facepunch": "👊", "fist": "✊", "v": "✌", "ok_hand": "👌", "raised_hand": "✋", "hand": "✋", "open_hands": "👐", "muscle": "💪", "pray": "🙏", "point_up": "☝", "point_up_2": "👆", "point_down": "👇", "point_left": "👈", "point_right": "👉", "middle_finger": "🖕", "hand_splayed": "🖐", "metal": "🤘", "vulcan": "🖖", "writing_hand": "✍", "nail_care": "💅", "lips": "👄", "tongue": "👅", "ear": "👂", "nose": "👃", "eye": "👁", "eyes": "👀", "bust_in_silhouette": "👤", "busts_in_silhouette": "👥", "speaking_head": "🗣", "baby": "👶", "boy": "👦", "girl": "👧", "man": "👨", "woman": "👩", "person_with_blond_hair": "👱", "older_man": "👴", "older_woman": "👵", "man_with_gua_pi_mao": "👲", "man_with_turban": "👳", "cop": "👮", "construction_worker": "👷", "guardsman": "💂", "spy": "🕵", "santa": "🎅", "angel": "👼", "princess": "👸", "bride_with_veil": "👰", "walking": "🚶", "runner": "🏃", "running": "🏃", "dancer": "💃", "dancers": "👯", "couple": "👫", "two_men_holding_hands": "👬", "two_women_holding_hands": "👭", "bow": "🙇", "information_desk_person": "💁", "no_good": "🙅", "ok_woman": "🙆", "raising_hand": "🙋", "person_with_pouting_face": "🙎", "person_frowning": "🙍", "haircut": "💇", "massage": "💆", "couple_with_heart": "💑", "couple_ww": "👩‍❤️‍👩", "couple_mm": "👨‍❤️‍👨", "couplekiss": "💏", "kiss_ww": "👩‍❤️‍💋‍👩", "kiss_mm": "👨‍❤️‍💋‍👨", "family": "👪", "family_mwg": "👨‍👩‍👧", "family_mwgb": "👨‍👩‍👧‍👦", "family_mwbb": "👨‍👩‍👦‍👦", "family_mwgg": "👨‍👩‍👧‍👧", "family_wwb": "👩‍👩‍👦", "family_wwg": "👩‍👩‍👧", "family_wwgb": "👩‍👩‍👧‍👦", "family_wwbb": "👩‍👩‍👦‍👦", "family_wwgg": "👩‍👩‍👧‍👧", "family_mmb": "👨‍👨‍👦", "family_mmg": "👨‍👨‍👧", "family_mmgb": "👨‍👨‍👧‍👦", "family_mmbb": "👨‍👨‍👦‍👦", "family_mmgg": "👨‍👨‍👧‍👧", "womans_clothes": "👚", "shirt": "👕", "tshirt": "👕", "jeans": "👖", "necktie": "👔", "dress": "👗", "bikini": "👙", "kimono": "👘", "lipstick": "💄", "kiss": "💋", "footprints": "👣", "high_heel": "👠", "sandal": "👡", "boot": "👢", "mans_shoe": "👞", "shoe": "👞", "athletic_shoe": "👟", "womans_hat": "👒", "tophat": "🎩", "helmet_with_cross": "⛑", "mortar_board": "🎓", "crown": "👑", "school_satchel": "🎒", "pouch": "👝", "purse": "👛", "handbag": "👜", "briefcase": "💼", "eyeglasses": "👓", "dark_sunglasses": "🕶", "ring": "💍", "closed_umbrella": "🌂", "100": "💯", "1234": "🔢", "heart": "❤", "yellow_heart": "💛", "green_heart": "💚", "blue_heart": "💙", "purple_heart": "💜", "broken_heart": "💔", "heart_exclamation": "❣", "two_hearts": "💕", "revolving_hearts": "💞", "heartbeat": "💓", "heartpulse": "💗", "sparkling_heart": "💖", "cupid": "💘", "gift_heart": "💝", "heart_decoration": "💟", "peace": "☮", "cross": "✝", "star_and_crescent": "☪", "om_symbol": "🕉", "wheel_of_dharma": "☸", "star_of_david": "✡", "six_pointed_star": "🔯", "menorah": "🕎", "yin_yang": "☯", "orthodox_cross": "☦", "place_of_worship": "🛐", "ophiuchus": "⛎", "aries": "♈", "taurus": "♉", "gemini": "♊", "cancer": "♋", "leo": "♌", "virgo": "♍", "libra": "♎", "scorpius": "♏", "sagittarius": "♐", "capricorn": "♑", "aquarius": "♒", "pisces": "♓", "id": "🆔", "atom": "⚛", "u7a7a": "🈳", "u5272": "🈹", "radioactive": "☢", "biohazard": "☣", "mobile_phone_off": "📴", "vibration_mode": "📳", "u6709": "🈶", "u7121": "🈚", "u7533": "🈸", "u55b6": "🈺", "u6708": "🈷", "eight_pointed_black_star": "✴", "vs": "🆚", "accept": "🉑", "white_flower": "💮", "ideograph_advantage": "🉐", "secret": "㊙", "congratulations": "㊗", "u5408": "🈴", "u6e80": "🈵", "u7981": "🈲", "a": "🅰", "b": "🅱", "ab": "🆎", "cl": "🆑", "o2": "🅾", "sos": "🆘", "no_entry": "⛔", "name_badge": "📛", "no_entry_sign": "🚫", "x": "❌", "o": "⭕", "anger": "💢", "hotsprings": "♨", "no_pedestrians": "🚷", "do_not_litter": "🚯", "no_bicycles": "🚳", "non_potable_water": "🚱", "underage": "🔞", "no_mobile_phones": "📵", "exclamation": "❗", "heavy_exclamation_mark": "❗", "grey_exclamation": "❕", "question": "❓", "grey_question": "❔", "bangbang": "‼", "interrobang": "⁉", "low_brightness": "🔅", "high_brightness": "🔆", "trident": "🔱", "fleur_de_lis": "⚜", "part_alternation_mark": "〽", "warning": "⚠", "children_crossing": "🚸", "beginner": "🔰", "recycle": "♻", "u6307": "🈯", "chart": "💹", "sparkle": "❇", "eight_spoked_asterisk": "✳", "negative_squared_cross_mark": "❎", "white_check_mark": "✅", "diamond_shape_with_a_dot_inside": "💠", "cyclone": "🌀", "loop": "➿", "globe_with_meridians": "🌐", "m": "Ⓜ", "atm": "🏧", "sa": "🈂", "passport_control": "🛂", "customs": "🛃", "baggage_claim": "🛄", "left_luggage": "🛅", "wheelchair": "♿", "no_smoking": "🚭", "wc": "🚾", "parking": "🅿", "potable_water": "🚰", "mens": "🚹", "womens": "🚺", "baby_symbol": "🚼", "restroom": "🚻", "put_litter_in_its_place": "🚮", "cinema": "🎦", "signal_strength": "📶", "koko": "🈁", "ng": "🆖", "ok": "🆗", "up": "🆙", "cool": "🆒", "new": "🆕", "free": "🆓", "zero": "0⃣", "one": "1⃣", "two": "2⃣", "three": "3⃣", "four": "4⃣", "five": "5⃣", "six": "6⃣", "seven": "7⃣", "eight": "8⃣", "nine": "9⃣", "ten": "🔟","zero": "0⃣", "1": "1⃣", "2": "2⃣", "3": "3⃣", "4": "4⃣", "5": "5⃣", "6": "6⃣", "7": "7⃣", "8": "8⃣", "9": "9⃣", "10": "🔟", "keycap_ten": "🔟", "arrow_forward": "▶", "pause_button": "⏸", "play_pause": "⏯", "stop_button": "⏹", "record_button": "⏺", "track_next": "⏭", "track_previous": "⏮", "fast_forward": "⏩", "rewind": "⏪", "twisted_rightwards_arrows": "🔀", "repeat": "🔁", "repeat_one": "🔂", "arrow_backward": "◀", "arrow_up_small": "🔼", "arrow_down_small": "🔽", "arrow_double_up": "⏫", "arrow_double_down": "⏬", "arrow_right": "➡", "arrow_left": "⬅", "arrow_up": "⬆", "arrow_down": "⬇", "arrow_upper_right": "↗", "arrow_lower_right": "↘", "arrow_lower_left": "↙", "arrow_upper_left": "↖", "arrow_up_down": "↕", "left_right_arrow": "↔", "arrows_counterclockwise": "🔄", "arrow_right_hook": "↪", "leftwards_arrow_with_hook": "↩", "arrow_heading_up": "⤴", "arrow_heading_down": "⤵", "hash": "#⃣", "asterisk": "*⃣", "information_source": "ℹ", "abc": "🔤", "abcd": "🔡", "capital_abcd": "🔠", "symbols": "🔣", "musical_note": "🎵", "notes": "🎶", "wavy_dash": "〰", "curly_loop": "➰", "heavy_check_mark": "✔", "arrows_clockwise": "🔃", "heavy_plus_sign": "➕", "heavy_minus_sign": "➖", "heavy_division_sign": "➗", "heavy_multiplication_x": "✖", "heavy_dollar_sign": "💲", "currency_exchange": "💱", "copyright": "©", "registered": "®", "tm": "™", "end": "🔚", "back": "🔙", "on": "🔛", "top": "🔝", "soon": "🔜", "ballot_box_with_check": "☑", "radio_button": "🔘", "white_circle": "⚪", "black_circle": "⚫", "red_circle": "🔴", "large_blue_circle": "🔵", "small_orange_diamond": "🔸", "small_blue_diamond": "🔹", "large_orange_diamond": "🔶", "large_blue_diamond": "🔷", "small_red_triangle": "🔺", "black_small_square": "▪", "white_small_square": "▫", "black_large_square": "⬛", "white_large_square": "⬜", "small_red_triangle_down": "🔻", "black_medium_square": "◼", "white_medium_square": "◻", "black_medium_small_square": "◾", "white_medium_small_square": "◽", "black_square_button": "🔲", "white_square_button": "🔳", "speaker": "🔈", "sound": "🔉", "loud_sound": "🔊", "mute": "🔇", "mega": "📣", "loudspeaker": "📢", "bell": "🔔", "no_bell": "🔕", "black_joker": "🃏", "mahjong": "🀄", "spades": "♠", "clubs": "♣", "hearts": "♥", "diamonds": "♦", "flower_playing_cards": "🎴", "thought_balloon": "💭", "anger_right": "🗯", "speech_balloon": "💬", "clock1": "🕐", "clock2": "🕑", "clock3": "🕒", "clock4": "🕓", "clock5": "🕔", "clock6": "🕕", "clock7": "🕖", "clock8": "🕗", "clock9": "🕘", "clock10": "🕙", "clock11": "🕚", "clock12": "🕛", "clock130": "🕜", "clock230": "🕝", "clock330": "🕞", "clock430": "🕟", "clock530": "🕠", "clock630": "🕡", "clock730": "🕢", "clock830": "🕣", "clock930": "🕤", "clock1030": "🕥", "clock1130": "🕦", "clock1230": "🕧", "eye_in_speech_bubble": "👁‍🗨", "speech_left": "🗨", "eject": "⏏", "red_car": "🚗", "car": "🚗", "taxi": "🚕", "blue_car": "🚙", "bus": "🚌", "trolleybus": "🚎", "race_car": "🏎", "police_car": "🚓", "ambulance": "🚑", "fire_engine": "🚒", "minibus": "🚐", "truck": "🚚", "articulated_lorry": "🚛", "tractor": "🚜", "motorcycle": "🏍", "bike": "🚲", "rotating_light": "🚨", "oncoming_police_car": "🚔", "oncoming_bus": "🚍", "oncoming_automobile": "🚘", "oncoming_taxi": "🚖", "aerial_tramway": "🚡", "mountain_cableway": "🚠", "suspension_railway": "🚟", "railway_car": "🚃", "train": "🚋", "monorail": "🚝", "bullettrain_side": "🚄", "bullettrain_front": "🚅", "light_rail": "🚈", "mountain_railway": "🚞", "steam_locomotive": "🚂", "train2": "🚆", "metro": "🚇", "tram": "🚊", "station": "🚉", "helicopter": "🚁", "airplane_small": "🛩", "airplane": "✈", "airplane_departure": "🛫", "airplane_arriving": "🛬", "sailboat": "⛵", "boat": "⛵", "motorboat": "🛥", "speedboat": "🚤", "ferry": "⛴", "cruise_ship": "🛳", "rocket": "🚀", "satellite_orbital": "🛰", "seat": "💺", "anchor": "⚓", "construction": "🚧", "fuelpump": "⛽", "busstop": "🚏", "vertical_traffic_light": "🚦", "traffic_light": "🚥", "checkered_flag": "🏁", "ship": "🚢", "ferris_wheel": "🎡", "roller_coaster": "🎢", "carousel_horse": "🎠", "construction_site": "🏗", "foggy": "🌁", "tokyo_tower": "🗼", "factory": "🏭", "fountain": "⛲", "rice_scene": "🎑", "mountain": "⛰", "mountain_snow": "🏔", "mount_fuji": "🗻", "volcano": "🌋", "japan": "🗾", "camping": "🏕", "tent": "⛺", "park": "🏞", "motorway": "🛣", "railway_track": "🛤", "sunrise": "🌅", "sunrise_over_mountains": "🌄", "desert": "🏜", "beach": "🏖", "island": "🏝", "city_sunset": "🌇", "city_sunrise": "🌇", "city_dusk": "🌆", "cityscape": "🏙", "night_with_stars": "🌃", "bridge_at_night": "🌉", "milky_way": "🌌", "stars": "🌠", "sparkler": "🎇", "fireworks": "🎆", "rainbow": "🌈", "homes": "🏘", "european_castle": "🏰", "japanese_castle": "🏯", "stadium": "🏟", "statue_of_liberty": "🗽", "house": "🏠", "house_with_garden": "🏡", "house_abandoned": "🏚", "office": "🏢", "department_store": "🏬", "post_office": "🏣", "european_post_office": "🏤", "hospital": "🏥", "bank": "🏦", "hotel": "🏨", "convenience_store": "🏪", "school": "🏫", "love_hotel": "🏩", "wedding": "💒", "classical_building": "🏛", "church": "⛪", "mosque": "🕌", "synagogue": "🕍", "kaaba": "🕋", "shinto_shrine": "⛩"}
@@ -84,13 +988,162 @@ class Main(Cog):
 		self.voice_list = ['`Allison - English/US (Expressive)`', '`Michael - English/US`', '`Lisa - English/US`', '`Kate - English/UK`', '`Renee - French/FR`', '`Birgit - German/DE`', '`Dieter - German/DE`', '`Francesca - Italian/IT`', '`Emi - Japanese/JP`', '`Isabela - Portuguese/BR`', '`Enrique - Spanish`', '`Laura - Spanish`', '`Sofia - Spanish/NA`']
 		self.scrap_regex = re.compile(",\"ou\":\"([^`]*?)\"")
 		self.google_keys = bot.google_keys
-		self.interval_functions = {"random": pixelsort.interval.random, "threshold": pixelsort.interval.threshold, "edges": pixelsort.interval.edge, "waves": pixelsort.interval.waves, "file": pixelsort.interval.file_mask, "file-edges": pixelsort.interval.file_edges, "none": pixelsort.interval.none}
-		self.s_functions =  {"lightness": pixelsort.sorting.lightness, "intensity": pixelsort.sorting.intensity, "maximum": pixelsort.sorting.maximum, "minimum": pixelsort.sorting.minimum}
 		self.webmd_responses = ['redacted']
 		self.webmd_count = random.randint(0, len(self.webmd_responses)-1)
 		self.color_combinations = [[150, 50, -25], [135, 30, -10], [100, 50, -15], [75, 25, -15], [35, 20, -25], [0, 20, 0], [-25, 45, 35], [-25, 45, 65], [-45, 70, 75], [-65, 100, 135], [-45, 90, 100], [-10, 40, 70], [25, 25, 50], [65, 10, 10], [100, 25, 0], [135, 35, -10]]
-		self.fp_dir = os.listdir(self.files_path('fp/'))
+		#fp emote name -> file, pngs win over gifs of the same name
+		self.fp_files = {}
+		for f in sorted(os.listdir(self.files_path('fp/')), key=lambda f: f.endswith('.png')):
+			self.fp_files[f[:-4]] = f
+		self.emoji_atlas = EmojiAtlas(self.files_path('emoji_atlas.bin'), emoji_atlas_bytes)
 		self.more_cache = {}
+		self.image_pool = ProcessPoolExecutor(max_workers=image_workers)
+		self.image_jobs = ImageScheduler(bot.loop, image_workers)
+		result_dir = self.files_path('results/')
+		os.makedirs(result_dir, exist_ok=True)
+		self.result_cache = ResultCache(result_dir, result_cache_bytes)
+		self.cache_task = bot.loop.create_task(self.save_caches())
+
+	def __unload(self):
+		self.image_pool.shutdown(wait=False)
+		self.image_jobs.threads.shutdown(wait=False)
+		self.emoji_atlas.close()
+		self.cache_task.cancel()
+		for cache in self.search_caches.values():
+			try:
+				cache.save(cache.snapshot())
+			except Exception as e:
+				print(e)
+
+	#heavy image work is queued fairly between guilds and users, None means the requester deleted their message
+	#func gets the job as its first argument and runs executor work through self.image_jobs.submit
+	async def run_job(self, ctx, cost, func, *args, status=None):
+		message = ctx.message
+		guild = message.server.id if message.server else message.channel.id
+		queued = []
+		async def notify(position):
+			try:
+				if position:
+					text = ':hourglass: queued, position `{0}`'.format(position)
+					if status:
+						await self.bot.edit_message(status, text)
+					else:
+						queued.append(await self.bot.send_message(message.channel, text))
+				elif status:
+					await self.bot.edit_message(status, status.content)
+				elif queued:
+					await self.bot.delete_message(queued.pop())
+			except discord.errors.HTTPException:
+				pass
+		try:
+			return await self.image_jobs.run(message.id, guild, message.author.id, cost, func, *args, notify=notify)
+		except asyncio.CancelledError:
+			for m in queued:
+				try:
+					await self.bot.delete_message(m)
+				except discord.errors.HTTPException:
+					pass
+			return None
+
+	async def run_image(self, ctx, cost, executor, func, *args, status=None):
+		return await self.run_job(ctx, cost, self.image_jobs.submit, executor, func, *args, status=status)
+
+	#every frame goes to the image pool as one job, gather keeps their order
+	async def map_frames(self, job, func, frames, *args):
+		return await asyncio.gather(*[self.image_jobs.submit(job, self.image_pool, func, frame, *args) for frame in frames])
+
+	#compute returns (BytesIO, message text), anything else is passed through uncached
+	async def cached_result(self, name, args, inputs, compute):
+		key = self.result_cache.key(name, args, *[b.getvalue() for b in inputs])
+		hit = await self.bot.loop.run_in_executor(None, self.result_cache.get, key)
+		if hit is not None:
+			return BytesIO(hit[0]), hit[1]
+		result = await compute()
+		if isinstance(result, tuple) and isinstance(result[0], BytesIO):
+			#not awaited so the reply isn't held up by the disk write
+			write = self.bot.loop.run_in_executor(None, self.result_cache.set, key, result[0].getvalue(), result[1])
+			write.add_done_callback(self.write_failed('result cache'))
+		return result
+
+	#done callback for executor writes nobody awaits, prints the failure instead of leaving it unretrieved
+	def write_failed(self, what):
+		def done(future):
+			if not future.cancelled() and future.exception() is not None:
+				print('{0} write failed: {1}'.format(what, future.exception()))
+		return done
+
+	#runs one of the numpy effects in the image pool, returns the encoded result
+	async def apply_effect(self, ctx, effect, b, *args, status=None):
+		async def compute():
+			data = await self.run_image(ctx, image_cost(b), self.image_pool, run_effect, effect, b.getvalue(), *args, status=status)
+			if data is None:
+				return None
+			return BytesIO(data), None
+		if effect in random_effects:
+			result = await compute()
+		else:
+			result = await self.cached_result(effect.__name__, args, [b], compute)
+		if result is None:
+			return None
+		return result[0]
+
+	async def on_message_delete(self, message):
+		self.image_jobs.cancel(message.id)
+
+	@commands.command()
+	@checks.is_owner()
+	async def imagejobs(self):
+		scheduler = self.image_jobs
+		msg = 'running: {0}/{1}, queued: {2}\n'.format(scheduler.running, scheduler.slots, scheduler.queued())
+		msg += 'done: {0}, cancelled: {1}, total cost: {2:.1f} megapixels\n'.format(scheduler.stats['done'], scheduler.stats['cancelled'], scheduler.stats['cost']/1000000)
+		for guild, users in scheduler.queues.items():
+			msg += '{0}: {1} waiting from {2} users\n'.format(guild, sum(len(jobs) for jobs in users.values()), len(users))
+		await self.bot.say(code.format(msg))
+
+	async def save_caches(self):
+		while True:
+			await asyncio.sleep(search_cache_save_interval)
+			for cache in self.search_caches.values():
+				try:
+					await self.bot.loop.run_in_executor(None, cache.save, cache.snapshot())
+				except Exception as e:
+					print(e)
+
+	#downloads go through the pooled HTTPClient cog when it's loaded
+	async def bytes_download(self, url:str):
+		http = self.bot.get_cog('HTTPClient')
+		if http is None:
+			return await self.bot.bytes_download(url)
+		return await http.bytes_download(url)
+
+	async def download(self, url:str, path:str):
+		http = self.bot.get_cog('HTTPClient')
+		if http is None:
+			return await self.bot.download(url, path)
+		return await http.download(url, path)
+
+	#streams url through an ImageProbe so oversized or abusive images stop downloading as soon as the header shows it
+	#returns (BytesIO, None) or (None, reason), reason is 'download' or the ImageRejected reason
+	async def probe_download(self, url:str, **limits):
+		probe = ImageProbe(**limits)
+		http = self.bot.get_cog('HTTPClient')
+		try:
+			if http is None:
+				b = await self.bot.bytes_download(url)
+				if b is False:
+					return None, 'download'
+				probe.feed(b.getvalue())
+				return b, None
+			kwargs = {'max_size': limits['max_bytes']} if limits.get('max_bytes') else {}
+			try:
+				return BytesIO(await http.get(url, probe=probe, **kwargs)), None
+			except http.ResponseTooLarge:
+				return None, 'size'
+		except ImageRejected as e:
+			return None, e.reason
+		except Exception as e:
+			print(e)
+			return None, 'download'
 
 	async def gist(self, ctx, idk, content:str):
 		payload = {
@@ -179,14 +1232,22 @@ class Main(Cog):
 			msg = await self.bot.send_message(ctx.message.channel, "ok, processing")
 			list_imgs = []
 			for url in img_urls:
-				b = await self.bytes_download(url)
-				if b is False:
+				b, reason = await self.probe_download(url, max_dimensions=(3000, 3000))
+				if reason == 'dimensions':
+					await self.bot.say(':warning: `Image exceeds maximum resolution >= (3000, 3000).`')
+					return
+				if b is None:
 					if len(img_urls) > 1:
 						await self.bot.say(':warning: **Command download function failed...**')
 						return
 					continue
 				list_imgs.append(b)
-			final, content_msg = await self.bot.loop.run_in_executor(None, self.do_magik, scale, *list_imgs)
+			async def compute():
+				return await self.run_image(ctx, sum(image_cost(b) for b in list_imgs), None, self.do_magik, scale, *list_imgs, status=msg)
+			result = await self.cached_result('magik', [scale], list_imgs, compute)
+			if result is None:
+				return
+			final, content_msg = result
 			if type(final) == str:
 				await self.bot.say(final)
 				return
@@ -201,41 +1262,28 @@ class Main(Cog):
 		except Exception as e:
 			await self.bot.say(e)
 
-	def do_gmagik(self, ctx, gif, gif_dir, rand):
+	def do_gmagik(self, ctx, gif):
 		try:
 			try:
 				frame = PIL.Image.open(gif)
 			except:
 				return ':warning: Invalid Gif.'
 			if frame.size >= (3000, 3000):
-				os.remove(gif)
 				return ':warning: `GIF resolution exceeds maximum >= (3000, 3000).`'
-			nframes = 0
+			frames = []
+			durations = []
 			while frame:
-				frame.save('{0}/{1}_{2}.png'.format(gif_dir, nframes, rand), 'GIF')
-				nframes += 1
+				if len(frames) >= 150 and ctx.message.author.id != self.bot.owner.id:
+					return ":warning: `GIF has too many frames (>= 150 Frames).`"
+				b = BytesIO()
+				frame.convert('RGBA').save(b, 'PNG')
+				frames.append(b.getvalue())
+				durations.append(frame.info.get('duration') or 40)
 				try:
-					frame.seek(nframes)
+					frame.seek(len(frames))
 				except EOFError:
 					break
-			imgs = glob.glob(gif_dir+"*_{0}.png".format(rand))
-			if len(imgs) > 150 and ctx.message.author.id != self.bot.owner.id:
-				for image in imgs:
-					os.remove(image)
-				os.remove(gif)
-				return ":warning: `GIF has too many frames (>= 150 Frames).`"
-			for image in imgs:
-				try:
-					im = wand.image.Image(filename=image)
-				except:
-					continue
-				i = im.clone()
-				i.transform(resize='800x800>')
-				i.liquid_rescale(width=int(i.width*0.5), height=int(i.height*0.5), delta_x=1, rigidity=0)
-				i.liquid_rescale(width=int(i.width*1.5), height=int(i.height*1.5), delta_x=2, rigidity=0)
-				i.resize(i.width, i.height)
-				i.save(filename=image)
-			return True
+			return frames, durations
 		except Exception as e:
 			exc_type, exc_obj, tb = sys.exc_info()
 			f = tb.tb_frame
@@ -245,6 +1293,13 @@ class Main(Cog):
 			line = linecache.getline(filename, lineno, f.f_globals)
 			print('EXCEPTION IN ({}, LINE {} "{}"): {}'.format(filename, lineno, line.strip(), exc_obj))
 
+	def encode_gif(self, frames, durations):
+		imgs = [PIL.Image.open(BytesIO(frame)) for frame in frames]
+		final = BytesIO()
+		imgs[0].save(final, 'GIF', save_all=True, append_images=imgs[1:], duration=durations, loop=0)
+		final.seek(0)
+		return final
+
 	@commands.command(pass_context=True)
 	@commands.cooldown(1, 20, commands.BucketType.server)
 	async def gmagik(self, ctx, url:str=None, framerate:str=None):
@@ -254,39 +1309,54 @@ class Main(Cog):
 				url = url[0]
 			else:
 				return
-			gif_dir = self.files_path('gif/')
-			check = await self.isgif(url)
-			if check is False:
+			if framerate != None:
+				try:
+					frame_duration = int(1000/float(framerate))
+				except (ValueError, ZeroDivisionError):
+					await self.bot.say(':warning: `Invalid framerate.`')
+					return
+			x = await self.bot.send_message(ctx.message.channel, "ok, processing (this might take a while for big gifs)")
+			owner = ctx.message.author.id == self.bot.owner.id
+			b, reason = await self.probe_download(url, formats=('gif',), max_bytes=None if owner else 5000000, max_dimensions=(3000, 3000), max_frames=None if owner else 150)
+			if reason == 'format':
 				await self.bot.say("Invalid or Non-GIF!")
 				ctx.command.reset_cooldown(ctx)
 				return
-			x = await self.bot.send_message(ctx.message.channel, "ok, processing (this might take a while for big gifs)")
-			rand = self.bot.random()
-			gifin = gif_dir+'1_{0}.gif'.format(rand)
-			gifout = gif_dir+'2_{0}.gif'.format(rand)
-			await self.download(url, gifin)
-			if os.path.getsize(gifin) > 5000000 and ctx.message.author.id != self.bot.owner.id:
+			elif reason == 'size':
 				await self.bot.say(":no_entry: `GIF Too Large (>= 5 mb).`")
-				os.remove(gifin)
 				return
+			elif reason == 'dimensions':
+				await self.bot.say(':warning: `GIF resolution exceeds maximum >= (3000, 3000).`')
+				return
+			elif reason == 'frames':
+				await self.bot.say(":warning: `GIF has too many frames (>= 150 Frames).`")
+				return
+			elif b is None:
+				await self.bot.say(':warning: **Command download function failed...**')
+				return
+			#decoding and encoding hold as much memory as the frames, so they count against the job's slot too
+			async def work(job):
+				result = await self.image_jobs.submit(job, None, self.do_gmagik, ctx, b)
+				if result is None:
+					return ':warning: Gmagik failed...'
+				if type(result) == str:
+					return result
+				frames, durations = result
+				frames = await self.map_frames(job, gmagik_frame, frames)
+				if framerate != None:
+					durations = [frame_duration]*len(frames)
+				return await self.image_jobs.submit(job, None, self.encode_gif, frames, durations)
 			try:
-				result = await self.bot.loop.run_in_executor(None, self.do_gmagik, ctx, gifin, gif_dir, rand)
+				final = await self.run_job(ctx, image_cost(b), work, status=x)
 			except CancelledError:
 				await self.bot.say(':warning: Gmagik failed...')
 				return
-			if type(result) == str:
-				await self.bot.say(result)
+			if final is None:
 				return
-			if framerate != None:
-				args = ['ffmpeg', '-y', '-nostats', '-loglevel', '0', '-i', gif_dir+'%d_{0}.png'.format(rand), '-r', framerate, gifout]
-			else:
-				args = ['ffmpeg', '-y', '-nostats', '-loglevel', '0', '-i', gif_dir+'%d_{0}.png'.format(rand), gifout]
-			await self.bot.run_process(args)
-			await self.bot.upload(gifout, filename='gmagik.gif')
-			for image in glob.glob(gif_dir+"*_{0}.png".format(rand)):
-				os.remove(image)
-			os.remove(gifin)
-			os.remove(gifout)
+			if type(final) == str:
+				await self.bot.say(final)
+				return
+			await self.bot.upload(final, filename='gmagik.gif')
 			await self.bot.delete_message(x)
 		except Exception as e:
 			print(e)
@@ -392,47 +1462,13 @@ class Main(Cog):
 				if not get_images:
 					return
 				avatar = get_images[0]
-			path = self.files_path(self.bot.random(True))
-			path2 = path[:-3]+'gif'
-			await self.download(avatar, path)
-			t_path = self.files_path('triggered.jpg')
-			await self.bot.run_process(['convert',
-				'canvas:none',
-				'-size', '512x680!',
-				'-resize', '512x680!',
-				'-draw', 'image over -60,-60 640,640 "{0}"'.format(path),
-				'-draw', 'image over 0,512 0,0 "{0}"'.format(t_path),
-				'(',
-					'canvas:none',
-					'-size', '512x680!',
-					'-draw', 'image over -45,-50 640,640 "{0}"'.format(path),
-					'-draw', 'image over 0,512 0,0 "{0}"'.format(t_path),
-				')',
-				'(',
-					'canvas:none',
-					'-size', '512x680!',
-					'-draw', 'image over -50,-45 640,640 "{0}"'.format(path),
-					'-draw', 'image over 0,512 0,0 "{0}"'.format(t_path),
-				')',
-				'(',
-					'canvas:none',
-					'-size', '512x680!',
-					'-draw', 'image over -45,-65 640,640 "{0}"'.format(path),
-					'-draw', 'image over 0,512 0,0 "{0}"'.format(t_path),
-				')',
-				'-layers', 'Optimize',
-				'-set', 'delay', '2',
-			path2])
-			await self.bot.upload(path2, filename='triggered.gif')
-			os.remove(path)
-			os.remove(path2)
+			b = await self.bytes_download(avatar)
+			final = await self.apply_effect(ctx, effect_shake, b, self.files_path('triggered.jpg'))
+			if final is None:
+				return
+			await self.bot.upload(final, filename='triggered.gif')
 		except Exception as e:
 			await self.bot.say(e)
-			try:
-				os.remove(path)
-				os.remove(path2)
-			except:
-				pass
 
 	async def do_triggered(self, ctx, user, url, t_path):
 		try:
@@ -452,17 +1488,8 @@ class Main(Cog):
 				if not get_images:
 					return
 				avatar = get_images[0]
-			path = self.files_path(self.bot.random(True))
-			await self.download(avatar, path)
-			await self.bot.run_process(['convert',
-				'(',
-					path,
-					'-resize', '256', 
-				')',
-				t_path,
-				'-append', path
-			])
-			return path
+			b = await self.bytes_download(avatar)
+			return await self.apply_effect(ctx, effect_append, b, t_path)
 		except Exception as e:
 			print(e)
 			return False
@@ -472,32 +1499,26 @@ class Main(Cog):
 	async def triggered2(self, ctx, user:str=None, url:str=None):
 		"""Generate a Triggered Image for a User or Image"""
 		t_path = self.files_path('triggered.png')
-		path = await self.do_triggered(ctx, user, url, t_path)
-		if path is False:
+		final = await self.do_triggered(ctx, user, url, t_path)
+		if final is None:
+			return
+		if not final:
 			await self.bot.say(':warning: **Command Failed.**')
-			try:
-				os.remove(path)
-			except:
-				pass
 			return
-		await self.bot.upload(path, filename='triggered3.png')
-		os.remove(path)
+		await self.bot.upload(final, filename='triggered3.png')
 
 	@commands.command(pass_context=True)
 	@commands.cooldown(1, 5)
 	async def triggered3(self, ctx, user:str=None, url:str=None):
 		"""Generate a Triggered2 Image for a User or Image"""
 		t_path = self.files_path('triggered2.png')
-		path = await self.do_triggered(ctx, user, url, t_path)
-		if path is False:
+		final = await self.do_triggered(ctx, user, url, t_path)
+		if final is None:
+			return
+		if not final:
 			await self.bot.say(':warning: **Command Failed.**')
-			try:
-				os.remove(path)
-			except:
-				pass
 			return
-		await self.bot.upload(path, filename='triggered3.png')
-		os.remove(path)
+		await self.bot.upload(final, filename='triggered3.png')
 
 	@commands.command(pass_context=True, aliases=['aes'])
 	async def aesthetics(self, ctx, *, text:str):
@@ -551,25 +1572,6 @@ class Main(Cog):
 			msg = None
 		await self.bot.upload(final, filename='ascii.png', content=msg)
 
-	def generate_ascii(self, image):
-		font = PIL.ImageFont.truetype(self.files_path('FreeMonoBold.ttf'), 15, encoding="unic")
-		image_width, image_height = image.size
-		aalib_screen_width= int(image_width/24.9)*10
-		aalib_screen_height= int(image_height/41.39)*10
-		screen = aalib.AsciiScreen(width=aalib_screen_width, height=aalib_screen_height)
-		im = image.convert("L").resize(screen.virtual_size)
-		screen.put_image((0,0), im)
-		y = 0
-		how_many_rows = len(screen.render().splitlines()) 
-		new_img_width, font_size = font.getsize(screen.render().splitlines()[0])
-		img = PIL.Image.new("RGBA", (new_img_width, how_many_rows*15), (255,255,255))
-		draw = PIL.ImageDraw.Draw(img)
-		for lines in screen.render().splitlines():
-			draw.text((0,y), lines, (0,0,0), font=font)
-			y = y + 15
-		imagefit = PIL.ImageOps.fit(img, (image_width, image_height), PIL.Image.ANTIALIAS)
-		return imagefit
-
 	@commands.command(pass_context=True)
 	@commands.cooldown(1, 5, commands.BucketType.user)
 	async def iascii(self, ctx, url:str=None):
@@ -585,36 +1587,30 @@ class Main(Cog):
 						await self.bot.say(':warning: **Command download function failed...**')
 						return
 					continue
-				im = PIL.Image.open(b)
-				img = await self.bot.loop.run_in_executor(None, self.generate_ascii, im)
-				final = BytesIO()
-				img.save(final, 'png')
-				final.seek(0)
+				final = await self.apply_effect(ctx, effect_ascii, b, self.files_path('FreeMonoBold.ttf'), status=x)
+				if final is None:
+					return
 				await self.bot.delete_message(x)
 				await self.bot.upload(final, filename='iascii.png')
 		except Exception as e:
 			await self.bot.say(e)
 
-	def do_gascii(self, b, rand, gif_dir):
+	def do_gascii(self, ctx, b):
 		try:
 			try:
 				im = PIL.Image.open(b)
 			except IOError:
 				return ':warning: Cannot load gif.'
-			count = 0
-			mypalette = im.getpalette()
-			try:
-				while True:
-					im.putpalette(mypalette)
-					new_im = PIL.Image.new("RGBA", im.size)
-					new_im.paste(im)
-					new_im = self.generate_ascii(new_im)
-					new_im.save('{0}/{1}_{2}.png'.format(gif_dir, count, rand))
-					count += 1
+			frames = []
+			while True:
+				if len(frames) >= 120 and ctx.message.author.id != "130070621034905600":
+					return "Sorry, GIF has too many frames!"
+				frames.append((np.asarray(im.convert('RGBA')), im.info.get('duration') or 40))
+				try:
 					im.seek(im.tell() + 1)
-				return True
-			except EOFError:
-				pass
+				except EOFError:
+					break
+			return frames
 		except Exception as e:
 			print(e)
 
@@ -627,35 +1623,37 @@ class Main(Cog):
 			if not get_images:
 				await self.bot.say("Error: Invalid Syntax\n`.gascii <gif_url> <liquid_rescale>*`\n`* = Optional`")
 				return
+			font_path = self.files_path('FreeMonoBold.ttf')
 			for url in get_images:
-				rand = self.bot.random()
-				gif_dir = self.files_path('gascii/')
-				location = gif_dir+'1_{0}.gif'.format(rand)
-				location2 = gif_dir+'2_{0}.gif'.format(rand)
 				x = await self.bot.send_message(ctx.message.channel, "ok, processing")
-				await self.download(url, location)
-				if os.path.getsize(location) > 3000000 and ctx.message.author.id != self.bot.owner.id:
+				max_bytes = None if ctx.message.author.id == self.bot.owner.id else 3000000
+				max_frames = None if ctx.message.author.id == "130070621034905600" else 120
+				b, reason = await self.probe_download(url, max_bytes=max_bytes, max_frames=max_frames)
+				if reason == 'size':
 					await self.bot.say("Sorry, GIF Too Large!")
-					os.remove(location)
-					return
-				result = await self.bot.loop.run_in_executor(None, self.do_gascii, location, rand, gif_dir)
-				if type(result) == str:
-					await self.bot.say(result)
 					return
-				list_imgs = glob.glob(gif_dir+"*_{0}.png".format(rand))
-				if len(list_imgs) > 120 and ctx.message.author.id != "130070621034905600":
+				elif reason == 'frames':
 					await self.bot.say("Sorry, GIF has too many frames!")
-					for image in list_imgs:
-						os.remove(image)
-					os.remove(location)
 					return
-				await self.bot.run_process(['ffmpeg', '-y', '-nostats', '-loglevel', '0', '-i', self.files_path('gascii/')+'%d_{0}.png'.format(rand), location2])
+				elif b is None:
+					await self.bot.say(':warning: **Command download function failed...**')
+					return
+				async def work(job, b):
+					frames = await self.image_jobs.submit(job, None, self.do_gascii, ctx, b)
+					if frames is None:
+						return ':warning: Cannot load gif.'
+					if type(frames) == str:
+						return frames
+					rendered = await self.map_frames(job, effect_ascii, [frame for frame, duration in frames], font_path)
+					return await self.image_jobs.submit(job, None, encode_array, [(frame, duration) for frame, (_, duration) in zip(rendered, frames)])
+				data = await self.run_job(ctx, image_cost(b), work, b, status=x)
+				if data is None:
+					return
+				if type(data) == str:
+					await self.bot.say(data)
+					return
 				await self.bot.delete_message(x)
-				await self.bot.upload(location2, filename='gascii.gif')
-				for image in list_imgs:
-					os.remove(image)
-				os.remove(location)
-				os.remove(location2)
+				await self.bot.upload(BytesIO(data), filename='gascii.gif')
 		except Exception as e:
 			await self.bot.say(e)
 
@@ -698,14 +1696,28 @@ class Main(Cog):
 			except KeyError:
 				pass
 			if t == 0:
-				self.image_cache[search] = [result, level]
+				self.image_cache.set(search, level, result)
 			elif t == 1:
-				self.search_cache[search] = [result, level]
+				self.search_cache.set(search, level, result)
 			elif t == 2:
-				self.youtube_cache[search] = [result, level]
+				self.youtube_cache.set(search, level, result)
 		except Exception as e:
 			print(e)
 
+	@commands.command()
+	@checks.is_owner()
+	async def cachestats(self):
+		msg = ''
+		for name, cache in self.search_caches.items():
+			total = cache.hits+cache.misses
+			rate = cache.hits/total*100 if total else 0
+			msg += '{0}: {1}/{2} entries, {3} hits, {4} misses ({5:.1f}% hit rate), ttl {6}s\n'.format(name, len(cache.entries), cache.max_size, cache.hits, cache.misses, rate, cache.ttl)
+		cache = self.result_cache
+		total = cache.hits+cache.misses
+		rate = cache.hits/total*100 if total else 0
+		msg += 'results: {0} files, {1:.1f}/{2:.0f} MB, {3} hits, {4} misses ({5:.1f}% hit rate)\n'.format(len(cache.files), cache.size/1024/1024, cache.max_bytes/1024/1024, cache.hits, cache.misses, rate)
+		await self.bot.say(code.format(msg))
+
 	async def google_scrap(self, search:str, safe=True, image=False):
 		headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 6.1; Win64; x64; rv:43.0) Gecko/20100101 Firefox/43.0'}
 		search = quote(search)
@@ -841,12 +1853,8 @@ class Main(Cog):
 	@commands.cooldown(3, 5)
 	async def image(self, ctx, *, search:str):
 		level = await self.google_safety(ctx.message, True)
-		in_cache = False
-		if search in self.image_cache.keys():
-			load_level = self.image_cache[search][1]
-			if load_level == level:
-				load = self.image_cache[search][0]
-				in_cache = True
+		load = self.image_cache.get(search, level)
+		in_cache = load is not None
 		try:
 			if in_cache is False:
 				key = await self.google_keys()
@@ -857,7 +1865,8 @@ class Main(Cog):
 			rand = random.choice(load['items'])
 			image = rand['link']
 			await self.bot.say(image)
-			await self.add_cache(search, load, 0, level)
+			if in_cache is False:
+				await self.add_cache(search, load, 0, level)
 		except discord.errors.Forbidden:
 			await self.bot.say("no send_file permission asshole")
 			return
@@ -878,12 +1887,8 @@ class Main(Cog):
 			return
 		in_cache = False
 		level = await self.google_safety(ctx.message, True)
-		in_cache = False
-		if search in self.search_cache.keys():
-			load_level = self.search_cache[search][1]
-			if load_level == level:
-				load = self.search_cache[search][0]
-				in_cache = True
+		load = self.search_cache.get(search, level)
+		in_cache = load is not None
 		try:
 			if in_cache is False:
 				key = await self.google_keys()
@@ -896,7 +1901,8 @@ class Main(Cog):
 			title = rand['title']
 			snippet = rand['snippet']
 			await self.bot.say("**{0}**\n`{1}`\n{2}".format(title, snippet, result))
-			await self.add_cache(search, load, 1, level)
+			if in_cache is False:
+				await self.add_cache(search, load, 1, level)
 		except AssertionError:
 			scrap = await self.google_scrap(search, True if level != 'off' else False, False)
 			if scrap:
@@ -947,12 +1953,8 @@ class Main(Cog):
 			await self.bot.say("Error: Invalid Syntax\n`.yt/youtube <text>`")
 			return
 		level = await self.google_safety(ctx.message, True)
-		in_cache = False
-		if search in self.youtube_cache.keys():
-			load_level = self.youtube_cache[search][1]
-			if load_level == level:
-				load = self.youtube_cache[search][0]
-				in_cache = True
+		load = self.youtube_cache.get(search, level)
+		in_cache = load is not None
 		try:
 			if in_cache is False:
 				key = await self.google_keys()
@@ -965,7 +1967,8 @@ class Main(Cog):
 			title = rand['title']
 			snippet = rand['snippet']
 			await self.bot.say('**{0}**\n`{1}`\n{2}'.format(title, snippet, link))
-			await self.add_cache(search, load, 2, level)
+			if in_cache is False:
+				await self.add_cache(search, load, 2, level)
 		except AssertionError:
 			scrap = await self.youtube_scrap(search, True if level != 'off' else False)
 			if scrap:
@@ -1227,12 +2230,14 @@ class Main(Cog):
 		return path
 
 	async def png_svg(self, path, size):
-		with open(path, 'rb') as f:
-			path = f.read()
-		s = bytes(str(size), encoding="utf-8")
-		b = path.replace(b"<svg ", b"<svg width=\"" + s + b"px\" height=\"" + s + b"px\" ")
-		path = BytesIO(cairosvg.svg2png(b))
-		return path
+		key = '{0}:{1}:{2}'.format(path, size, int(os.path.getmtime(path)))
+		data = self.emoji_atlas.get(key)
+		if data is None:
+			data = await self.bot.loop.run_in_executor(self.image_pool, render_svg, path, size)
+			if size in emoji_atlas_sizes:
+				write = self.bot.loop.run_in_executor(None, self.emoji_atlas.add, key, data)
+				write.add_done_callback(self.write_failed('emoji atlas'))
+		return BytesIO(data)
 
 	fp_emotes = {
 		#redacted spam
@@ -1306,12 +2311,9 @@ class Main(Cog):
 						path = await self.bytes_download(url)
 				if not found:
 					match = em.strip(':')
-					if match in [x[:-4] for x in self.fp_dir]:
-						try:
-							f = self.fp_dir[self.fp_dir.index(match+'.png')]
-						except:
-							f = self.fp_dir[self.fp_dir.index(match+'.gif')]
-							gif = True
+					if match in self.fp_files:
+						f = self.fp_files[match]
+						gif = f.endswith('.gif')
 						found = True
 						path = self.files_path('fp/{0}'.format(f))
 				if not found:
@@ -1529,6 +2531,13 @@ class Main(Cog):
 		b = await self.bytes_download(r)
 		await self.bot.upload(b, filename='tti.png')
 
+	def do_jpeg(self, b, quality):
+		img = PIL.Image.open(b).convert('RGB')
+		final = BytesIO()
+		img.save(final, 'JPEG', quality=quality)
+		final.seek(0)
+		return final, None
+
 	@commands.command(pass_context=True, aliases=['needsmorejpeg', 'jpegify', 'magik2'])
 	@commands.cooldown(2, 5, commands.BucketType.user)
 	async def jpeg(self, ctx, url:str=None, quality:int=1):
@@ -1547,10 +2556,7 @@ class Main(Cog):
 					await self.bot.say(':warning: **Command download function failed...**')
 					return
 				continue
-			img = PIL.Image.open(b).convert('RGB')
-			final = BytesIO()
-			img.save(final, 'JPEG', quality=quality)
-			final.seek(0)
+			final, _ = await self.cached_result('jpeg', [quality], [b], lambda: self.bot.loop.run_in_executor(None, self.do_jpeg, b, quality))
 			await self.bot.upload(final, filename='needsmorejpeg.jpg')
 
 	# @commands.command(pass_context=True, aliases=['needsmorejpeg', 'nmj', 'jpegify'])
@@ -1660,6 +2666,85 @@ class Main(Cog):
 		await self.bot.say("```\n"+msg+"```")
 
 	# thanks RoadCrosser#3657
+	async def local_faces(self, b, url):
+		return await self.bot.loop.run_in_executor(self.image_pool, local_landmarks, b.getvalue())
+
+	async def oxford_faces(self, b, url):
+		data = {"url": url}
+		headers = {"Content-Type":"application/json","Ocp-Apim-Subscription-Key": '3bb232c5dcba448c8b1e95da94b286cd'}
+		async with aiohttp.ClientSession() as session:
+			async with session.post('https://api.projectoxford.ai/face/v1.0/detect?returnFaceId=false&returnFaceLandmarks=true&returnFaceAttributes=headPose', headers=headers, data=json.dumps(data)) as r:
+				faces = await r.json()
+		if "error" in faces:
+			return None
+		return [face_points((f['faceLandmarks']['pupilLeft']['x'], f['faceLandmarks']['pupilLeft']['y']), (f['faceLandmarks']['pupilRight']['x'], f['faceLandmarks']['pupilRight']['y']), f['faceRectangle']['height'], f['faceAttributes']['headPose']['yaw'], f['faceAttributes']['headPose']['pitch'], f['faceAttributes']['headPose']['roll']) for f in faces]
+
+	#first backend to find a face wins, an image that was seen before skips detection
+	#[] when no backend found one, None when every backend failed
+	async def face_landmarks(self, b, url):
+		key = hashlib.sha256(b.getvalue()).hexdigest()
+		faces = self.landmark_cache.get(key, '')
+		if faces:
+			return faces
+		result = None
+		for backend in self.landmark_backends:
+			try:
+				faces = await getattr(self, backend+'_faces')(b, url)
+			except Exception as e:
+				print(e)
+				continue
+			if faces:
+				self.landmark_cache.set(key, '', faces)
+				return faces
+			if faces is not None:
+				#the next backend may do better, nothing is cached so a later try can too
+				result = faces
+		return result
+
+	def do_eyes(self, b, eye_list, eye_location, eye_flipped_location, flipped, monocle, resize_amount):
+		img = PIL.Image.open(b).convert("RGBA")
+		eyes = PIL.Image.open(eye_location).convert("RGBA")
+		flipped_count = 1
+		for e in eye_list:
+			width, height = eyes.size
+			h = e[1]/resize_amount*50
+			width = h/height*width
+			if flipped:
+				if (flipped_count % 2 == 0):
+					s_image = wand.image.Image(filename=eye_flipped_location)
+				else:
+					s_image = wand.image.Image(filename=eye_location)
+				flipped_count += 1
+			else:
+				s_image = wand.image.Image(filename=eye_location)
+			i = s_image.clone()
+			i.resize(int(width), int(h))
+			s_image = BytesIO()
+			i.save(file=s_image)
+			s_image.seek(0)
+			inst = PIL.Image.open(s_image)
+			yaw = e[2]['yaw']
+			pitch = e[2]['pitch']
+			width, height = inst.size
+			pyaw = int(yaw/180*height)
+			ppitch = int(pitch/180*width)
+			new = PIL.Image.new('RGBA', (width+posnum(ppitch)*2, height+posnum(pyaw)*2), (255, 255, 255, 0))
+			new.paste(inst, (posnum(ppitch), posnum(pyaw)))
+			width, height = new.size
+			coeffs = find_coeffs([(0, 0), (width, 0), (width, height), (0, height)], [(ppitch, pyaw), (width-ppitch, -pyaw), (width+ppitch, height+pyaw), (-ppitch, height-pyaw)])
+			inst = new.transform((width, height), PIL.Image.PERSPECTIVE, coeffs, PIL.Image.BICUBIC).rotate(-e[2]['roll'], expand=1, resample=PIL.Image.BILINEAR)
+			eyel = PIL.Image.new('RGBA', img.size, (255, 255, 255, 0))
+			width, height = inst.size
+			if monocle:
+				eyel.paste(inst, (int(e[0][0]-width/2), int(e[0][1]-height/3.7)))
+			else:
+				eyel.paste(inst, (int(e[0][0]-width/2), int(e[0][1]-height/2)))
+			img = PIL.Image.alpha_composite(img, eyel)
+		final = BytesIO()
+		img.save(final, "png")
+		final.seek(0)
+		return final
+
 	@commands.group(pass_context=True, aliases=['eye'], invoke_without_command=True)
 	@commands.cooldown(2, 5)
 	async def eyes(self, ctx, url:str=None, eye:str=None, resize:str=None):
@@ -1670,7 +2755,7 @@ class Main(Cog):
 			resize_amount = None
 			monocle = False
 			flipped = False
-			flipped_count = 1
+			eye_flipped_location = None
 			if eye != None:
 				eye = eye.lower()
 			if eye is None or eye == 'default' or eye == '0':
@@ -1731,14 +2816,8 @@ class Main(Cog):
 					await self.bot.say(':warning: **Command download function failed...**')
 					return
 				continue
-			img = PIL.Image.open(b).convert("RGBA")
-			eyes = PIL.Image.open(eye_location).convert("RGBA")
-			data = {"url": url}
-			headers = {"Content-Type":"application/json","Ocp-Apim-Subscription-Key": '3bb232c5dcba448c8b1e95da94b286cd'}
-			async with aiohttp.ClientSession() as session:
-				async with session.post('https://api.projectoxford.ai/face/v1.0/detect?returnFaceId=false&returnFaceLandmarks=true&returnFaceAttributes=headPose', headers=headers, data=json.dumps(data)) as r:
-					faces = await r.json()
-			if "error" in faces:
+			faces = await self.face_landmarks(b, url)
+			if faces is None:
 				await self.bot.say(":warning: `Error occured in the API, could not process image url`")
 				await self.bot.delete_message(x)
 				return
@@ -1749,47 +2828,12 @@ class Main(Cog):
 			eye_list = []
 			for f in faces:
 				if monocle == True:
-					eye_list += ([((f['faceLandmarks']['pupilRight']['x'],f['faceLandmarks']['pupilRight']['y']),f['faceRectangle']['height'],(f['faceAttributes']['headPose']))])
+					eye_list += [(f['pupilRight'], f['height'], f['headPose'])]
 				else:
-					eye_list += (((f['faceLandmarks']['pupilLeft']['x'],f['faceLandmarks']['pupilLeft']['y']),f['faceRectangle']['height'],(f['faceAttributes']['headPose'])),((f['faceLandmarks']['pupilRight']['x'],f['faceLandmarks']['pupilRight']['y']),f['faceRectangle']['height'],(f['faceAttributes']['headPose'])))
-			for e in eye_list:
-				width, height = eyes.size
-				h = e[1]/resize_amount*50
-				width = h/height*width
-				if flipped:
-					if (flipped_count % 2 == 0):
-						s_image = wand.image.Image(filename=eye_flipped_location)
-					else:
-						s_image = wand.image.Image(filename=eye_location)
-					flipped_count += 1
-				else:
-					s_image = wand.image.Image(filename=eye_location)
-				i = s_image.clone()
-				i.resize(int(width), int(h))
-				s_image = BytesIO()
-				i.save(file=s_image)
-				s_image.seek(0)
-				inst = PIL.Image.open(s_image)
-				yaw = e[2]['yaw']
-				pitch = e[2]['pitch']
-				width, height = inst.size
-				pyaw = int(yaw/180*height)
-				ppitch = int(pitch/180*width)
-				new = PIL.Image.new('RGBA', (width+posnum(ppitch)*2, height+posnum(pyaw)*2), (255, 255, 255, 0))
-				new.paste(inst, (posnum(ppitch), posnum(pyaw)))
-				width, height = new.size
-				coeffs = find_coeffs([(0, 0), (width, 0), (width, height), (0, height)], [(ppitch, pyaw), (width-ppitch, -pyaw), (width+ppitch, height+pyaw), (-ppitch, height-pyaw)])
-				inst = new.transform((width, height), PIL.Image.PERSPECTIVE, coeffs, PIL.Image.BICUBIC).rotate(-e[2]['roll'], expand=1, resample=PIL.Image.BILINEAR)
-				eyel = PIL.Image.new('RGBA', img.size, (255, 255, 255, 0))
-				width, height = inst.size
-				if monocle:
-					eyel.paste(inst, (int(e[0][0]-width/2), int(e[0][1]-height/3.7)))
-				else:
-					eyel.paste(inst, (int(e[0][0]-width/2), int(e[0][1]-height/2)))
-				img = PIL.Image.alpha_composite(img, eyel)
-			final = BytesIO()
-			img.save(final, "png")
-			final.seek(0)
+					eye_list += [(f['pupilLeft'], f['height'], f['headPose']), (f['pupilRight'], f['height'], f['headPose'])]
+			final = await self.run_image(ctx, image_cost(b), None, self.do_eyes, b, eye_list, eye_location, eye_flipped_location, flipped, monocle, resize_amount, status=x)
+			if final is None:
+				return
 			await self.bot.upload(final, filename="eyes.png")
 			await self.bot.delete_message(x)
 		# except Exception as e:
@@ -2014,12 +3058,20 @@ class Main(Cog):
 				b = await self.bytes_download(url)
 				if not gif:
 					img = PIL.Image.open(b)
-					b = BytesIO()
-					img.save(b, format='JPEG')
-					final = await self.bot.loop.run_in_executor(None, self.do_glitch, b, amount, seed, iterations)
+					jpeg = BytesIO()
+					img.save(jpeg, format='JPEG')
+					async def compute():
+						final = await self.run_image(ctx, image_cost(b), None, self.do_glitch, jpeg, amount, seed, iterations)
+						return None if final is None else (final, None)
+					result = await self.cached_result('glitch', [amount, seed, iterations], [b], compute)
+					if result is None:
+						return
+					final = result[0]
 					await self.bot.upload(final, filename='glitch.jpeg', content='Iterations: `{0}` | Amount: `{1}` | Seed: `{2}`'.format(iterations, amount, seed))
 				else:
-					final = await self.bot.loop.run_in_executor(None, self.do_gglitch, b)
+					final = await self.run_image(ctx, image_cost(b), None, self.do_gglitch, b)
+					if final is None:
+						return
 					await self.bot.upload(final, filename='glitch.gif')
 		except:
 			await self.bot.say("sorry, can't reglitch an image.")
@@ -2035,7 +3087,13 @@ class Main(Cog):
 				path = self.files_path(self.bot.random(True))
 				await self.download(url, path)
 				args = ['convert', '(', path, '-resize', '1024x1024>', ')', '-alpha', 'on', '(', '-clone', '0', '-channel', 'RGB', '-separate', '-channel', 'A', '-fx', '0', '-compose', 'CopyOpacity', '-composite', ')', '(', '-clone', '0', '-roll', '+5', '-channel', 'R', '-fx', '0', '-channel', 'A', '-evaluate', 'multiply', '.3', ')', '(', '-clone', '0', '-roll', '-5', '-channel', 'G', '-fx', '0', '-channel', 'A', '-evaluate', 'multiply', '.3', ')', '(', '-clone', '0', '-roll', '+0+5', '-channel', 'B', '-fx', '0', '-channel', 'A', '-evaluate', 'multiply', '.3', ')', '(', '-clone', '0', '-channel', 'A', '-fx', '0', ')', '-delete', '0', '-background', 'none', '-compose', 'SrcOver', '-layers', 'merge', '-rotate', '90', '-wave', '1x5', '-rotate', '-90', path]
-				await self.bot.run_process(args)
+				async def convert(job):
+					await self.bot.run_process(args)
+					return path
+				#convert caps the image at 1024x1024
+				if await self.run_job(ctx, 1024*1024, convert) is None:
+					os.remove(path)
+					return
 				await self.bot.upload(path, filename='glitch2.png')
 				os.remove(path)
 		except:
@@ -2045,30 +3103,13 @@ class Main(Cog):
 				pass
 			raise
 
-	def do_sort(self, image, interval, angle, randomness, s_func):
-		input_img = PIL.Image.open(image)
-		input_img.convert('RGBA')
-		input_img.rotate(angle, expand=True)
-		data = input_img.load()
-		pixels = []
-		for y in range(input_img.size[1]):
-			pixels.append([])
-			for x in range(input_img.size[0]):
-				pixels[y].append(data[x, y])
-		intervals = self.interval_functions[interval](pixels, image, angle)
-		s_func = self.s_functions[s_func]
-		sorted_pixels = pixelsort.sorter.sort_image(pixels, intervals, randomness, s_func)
-		output_img = PIL.Image.new('RGBA', input_img.size)
-		for y in range(output_img.size[1]):
-			for x in range(output_img.size[0]):
-				output_img.putpixel((x, y), sorted_pixels[y][x])
-		if angle != 0:
-			output_img.rotate(-angle, expand=True)
-		output_img = pixelsort.util.crop_to(output_img, PIL.Image.open(image))
-		b = BytesIO()
-		output_img.save(b, 'png')
-		b.seek(0)
-		return b
+	async def pixel_sort(self, job, b, interval, angle, randomness, s_func):
+		size = PIL.Image.open(b).size
+		a, starts = await self.image_jobs.submit(job, self.image_pool, sort_prepare, b.getvalue(), interval, angle)
+		strips = zip(np.array_split(a, image_workers), np.array_split(starts, image_workers))
+		rows = await asyncio.gather(*[self.image_jobs.submit(job, self.image_pool, sort_rows, part, part_starts, s_func, randomness) for part, part_starts in strips])
+		data = await self.image_jobs.submit(job, self.image_pool, sort_finish, np.vstack(rows), angle, size)
+		return BytesIO(data)
 
 	@commands.command(aliases=['pixelsort'], pass_context=True)
 	@commands.cooldown(2, 5, commands.BucketType.user)
@@ -2087,11 +3128,11 @@ class Main(Cog):
 					interval = str(arg)
 				else:
 					s_func = str(arg)
-			if interval not in self.interval_functions.keys():
-				await self.bot.say(':warning: Invalid Interval Function.\nInterval Functions: `{0}`'.format(', '.join(list(self.interval_functions.keys()))))
+			if interval not in sort_intervals:
+				await self.bot.say(':warning: Invalid Interval Function.\nInterval Functions: `{0}`'.format(', '.join(sort_intervals)))
 				return
-			elif s_func not in self.s_functions.keys():
-				await self.bot.say(':warning: Invalid Sorting Function.\nSorting Functions: `{0}`'.format(', '.join(list(self.s_functions.keys()))))
+			elif s_func not in sort_keys:
+				await self.bot.say(':warning: Invalid Sorting Function.\nSorting Functions: `{0}`'.format(', '.join(sort_keys)))
 				return
 			if angle >= 360:
 				await self.bot.say(':warning: Angle must be less then `360`.')
@@ -2106,7 +3147,17 @@ class Main(Cog):
 						await self.bot.say(':warning: **Command download function failed...**')
 						return
 					continue
-				img = await self.bot.loop.run_in_executor(None, self.do_sort, b, interval, angle, randomness, s_func)
+				async def compute():
+					img = await self.run_job(ctx, image_cost(b), self.pixel_sort, b, interval, angle, randomness, s_func)
+					return None if img is None else (img, None)
+				#random intervals and randomness make a different sort every run
+				if interval == 'random' or randomness:
+					result = await compute()
+				else:
+					result = await self.cached_result('sort', [interval, angle, s_func], [b], compute)
+				if result is None:
+					return
+				img = result[0]
 				await self.bot.upload(img, filename='pixelsort.png', content='Interval: `{0}` | Sorting: `{1}`{2}{3}'.format(interval, s_func, ' | Angle: **{0}**'.format(angle) if angle != 0 else '', ' | Randomness: **{0}**'.format(randomness) if randomness != 0 else ''))
 		except Exception as e:
 			exc_type, exc_obj, tb = sys.exc_info()
@@ -2159,19 +3210,9 @@ class Main(Cog):
 						await self.bot.say(':warning: **Command download function failed...**')
 						return
 					continue
-				bg = (0, 0, 0)
-				img = PIL.Image.open(b)
-				img = img.resize((int(img.size[0]/pixels), int(img.size[1]/pixels)), PIL.Image.NEAREST)
-				img = img.resize((int(img.size[0]*pixels), int(img.size[1]*pixels)), PIL.Image.NEAREST)
-				load = img.load()
-				for i in range(0, img.size[0], pixels):
-					for j in range(0, img.size[1], pixels):
-						for r in range(pixels):
-							load[i+r, j] = bg
-							load[i, j+r] = bg
-				final = BytesIO()
-				img.save(final, 'png')
-				final.seek(0)
+				final = await self.apply_effect(ctx, effect_pixelate, b, int(pixels))
+				if final is None:
+					return
 				await self.bot.upload(final, filename='pixelated.png', content=scale_msg)
 				await asyncio.sleep(0.21)
 		except:
@@ -2241,30 +3282,6 @@ class Main(Cog):
 		else:
 			await self.bot.upload(retro_result, filename='retro.png')
 
-	def do_waaw(self, b):
-		f = BytesIO()
-		f2 = BytesIO()
-		with wand.image.Image(file=b, format='png') as img:
-			h1 = img.clone()
-			width = int(img.width/2) if int(img.width/2) > 0 else 1
-			h1.crop(width=width, height=int(img.height), gravity='east')
-			h2 = h1.clone()
-			h1.rotate(degree=180)
-			h1.flip()
-			h1.save(file=f)
-			h2.save(file=f2)
-		f.seek(0)
-		f2.seek(0)
-		list_im = [f2, f]
-		imgs = [PIL.ImageOps.mirror(PIL.Image.open(i).convert('RGBA')) for i in list_im]
-		min_shape = sorted([(np.sum(i.size), i.size) for i in imgs])[0][1]
-		imgs_comb = np.hstack((np.asarray(i.resize(min_shape)) for i in imgs))
-		imgs_comb = PIL.Image.fromarray(imgs_comb)
-		final = BytesIO()
-		imgs_comb.save(final, 'png')
-		final.seek(0)
-		return final
-
 	#Thanks to Iguniisu#9746 for the idea
 	@commands.command(pass_context=True, aliases=['magik3', 'mirror'])
 	@commands.cooldown(2, 5, commands.BucketType.user)
@@ -2279,32 +3296,11 @@ class Main(Cog):
 					await self.bot.say(':warning: **Command download function failed...**')
 					return
 				continue
-			final = await self.bot.loop.run_in_executor(None, self.do_waaw, b)
+			final = await self.apply_effect(ctx, effect_mirror, b, 'waaw')
+			if final is None:
+				return
 			await self.bot.upload(final, filename='waaw.png')
 
-	def do_haah(self, b):
-		f = BytesIO()
-		f2 = BytesIO()
-		with wand.image.Image(file=b, format='png') as img:
-			h1 = img.clone()
-			h1.transform('50%x100%')
-			h2 = h1.clone()
-			h2.rotate(degree=180)
-			h2.flip()
-			h1.save(file=f)
-			h2.save(file=f2)
-		f.seek(0)
-		f2.seek(0)
-		list_im = [f2, f]
-		imgs = [PIL.ImageOps.mirror(PIL.Image.open(i).convert('RGBA')) for i in list_im]
-		min_shape = sorted([(np.sum(i.size), i.size) for i in imgs])[0][1]
-		imgs_comb = np.hstack((np.asarray(i.resize(min_shape)) for i in imgs))
-		imgs_comb = PIL.Image.fromarray(imgs_comb)
-		final = BytesIO()
-		imgs_comb.save(final, 'png')
-		final.seek(0)
-		return final
-
 	@commands.command(pass_context=True, aliases=['magik4', 'mirror2'])
 	@commands.cooldown(2, 5, commands.BucketType.user)
 	async def haah(self, ctx, *urls:str):
@@ -2318,33 +3314,11 @@ class Main(Cog):
 					await self.bot.say(':warning: **Command download function failed...**')
 					return
 				continue
-			final = await self.bot.loop.run_in_executor(None, self.do_haah, b)
+			final = await self.apply_effect(ctx, effect_mirror, b, 'haah')
+			if final is None:
+				return
 			await self.bot.upload(final, filename='haah.png')
 
-	def do_woow(self, b):
-		f = BytesIO()
-		f2 = BytesIO()
-		with wand.image.Image(file=b, format='png') as img:
-			h1 = img.clone()
-			width = int(img.width) if int(img.width) > 0 else 1
-			h1.crop(width=width, height=int(img.height/2), gravity='north')
-			h2 = h1.clone()
-			h2.rotate(degree=180)
-			h2.flop()
-			h1.save(file=f)
-			h2.save(file=f2)
-		f.seek(0)
-		f2.seek(0)
-		list_im = [f, f2]
-		imgs = [PIL.Image.open(i).convert('RGBA') for i in list_im]
-		min_shape = sorted([(np.sum(i.size), i.size) for i in imgs])[0][1]
-		imgs_comb = np.vstack((np.asarray(i.resize(min_shape)) for i in imgs))
-		imgs_comb = PIL.Image.fromarray(imgs_comb)
-		final = BytesIO()
-		imgs_comb.save(final, 'png')
-		final.seek(0)
-		return final
-
 	@commands.command(pass_context=True, aliases=['magik5', 'mirror3'])
 	@commands.cooldown(2, 5, commands.BucketType.user)
 	async def woow(self, ctx, *urls:str):
@@ -2358,33 +3332,11 @@ class Main(Cog):
 					await self.bot.say(':warning: **Command download function failed...**')
 					return
 				continue
-			final = await self.bot.loop.run_in_executor(None, self.do_woow, b)
+			final = await self.apply_effect(ctx, effect_mirror, b, 'woow')
+			if final is None:
+				return
 			await self.bot.upload(final, filename='woow.png')
 
-	def do_hooh(self, b):
-		f = BytesIO()
-		f2 = BytesIO()
-		with wand.image.Image(file=b, format='png') as img:
-			h1 = img.clone()
-			width = int(img.width) if int(img.width) > 0 else 1
-			h1.crop(width=width, height=int(img.height/2), gravity='south')
-			h2 = h1.clone()
-			h1.rotate(degree=180)
-			h2.flop()
-			h1.save(file=f)
-			h2.save(file=f2)
-		f.seek(0)
-		f2.seek(0)
-		list_im = [f, f2]
-		imgs = [PIL.Image.open(i).convert('RGBA') for i in list_im]
-		min_shape = sorted([(np.sum(i.size), i.size) for i in imgs])[0][1]
-		imgs_comb = np.vstack((np.asarray(i.resize(min_shape)) for i in imgs))
-		imgs_comb = PIL.Image.fromarray(imgs_comb)
-		final = BytesIO()
-		imgs_comb.save(final, 'png')
-		final.seek(0)
-		return final
-
 	@commands.command(pass_context=True, aliases=['magik6', 'mirror4'])
 	@commands.cooldown(2, 5, commands.BucketType.user)
 	async def hooh(self, ctx, *urls:str):
@@ -2398,7 +3350,9 @@ class Main(Cog):
 					await self.bot.say(':warning: **Command download function failed...**')
 					return
 				continue
-			final = await self.bot.loop.run_in_executor(None, self.do_hooh, b)
+			final = await self.apply_effect(ctx, effect_mirror, b, 'hooh')
+			if final is None:
+				return
 			await self.bot.upload(final, filename='hooh.png')
 
 	@commands.command(pass_context=True)
@@ -2408,11 +3362,9 @@ class Main(Cog):
 			return
 		for url in get_images:		
 			b = await self.bytes_download(url)
-			img = PIL.Image.open(b)
-			img = PIL.ImageOps.flip(img)
-			final = BytesIO()
-			img.save(final, 'png')
-			final.seek(0)
+			final = await self.apply_effect(ctx, effect_flip, b)
+			if final is None:
+				return
 			await self.bot.upload(final, filename='flip.png')
 
 	@commands.command(pass_context=True)
@@ -2422,11 +3374,9 @@ class Main(Cog):
 			return
 		for url in get_images:		
 			b = await self.bytes_download(url)
-			img = PIL.Image.open(b)
-			img = PIL.ImageOps.mirror(img)
-			final = BytesIO()
-			img.save(final, 'png')
-			final.seek(0)
+			final = await self.apply_effect(ctx, effect_flop, b)
+			if final is None:
+				return
 			await self.bot.upload(final, filename='flop.png')
 
 	@commands.command(pass_context=True, aliases=['inverse', 'negate'])
@@ -2443,12 +3393,10 @@ class Main(Cog):
 			return
 		for url in get_images:		
 			b = await self.bytes_download(url)
-			img = PIL.Image.open(b).convert('RGBA')
-			img = PIL.ImageOps.invert(img)
-			final = BytesIO()
-			img.save(final, 'png')
-			final.seek(0)
-			await self.bot.upload(final, filename='flop.png')
+			final = await self.apply_effect(ctx, effect_invert, b)
+			if final is None:
+				return
+			await self.bot.upload(final, filename='invert.png')
 
 	@commands.command(aliases=['indicator'])
 	async def regional(self, *, txt:str):
@@ -2598,64 +3546,17 @@ class Main(Cog):
 	@commands.cooldown(1, 5)
 	async def wasted(self, ctx, *urls:str):
 		"""GTA5 Wasted Generator"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_wasted, b, self.files_path('pricedown.ttf'))
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				await self.download(url, path)
-				args = ['convert', path]
-				img = PIL.Image.open(path)
-				aspectRatio = img.height / img.width
-				aspectRatio2 = img.width / img.height
-				height = img.height
-				width = img.width
-				if img.width < 512:
-					args.append('-resize')
-					width = 512
-					height = math.floor(aspectRatio * 512)
-					args.append('512x{0}'.format(height))
-				if img.height < 512:
-					args.append('-resize')
-					height = 512
-					width = math.floor(aspectRatio2 * 512)
-					args.append(str(width))
-				if img.width > 1500:
-					args.append('-resize')
-					width = 1500
-					height = math.floor(aspectRatio * 1500)
-					args.append('1500x{0}'.format(height))
-				if img.height > 1500:
-					args.append('-resize')
-					height = 1500
-					width = math.floor(aspectRatio2 * 1500)
-					args.append(str(width))
-				args.extend(['-recolor', '.3 .1 .3 .3 .1 .3 .3 .1 .3', '-fill', 'rgba(0,0,0,0.5)'])
-				signHeight = height * 0.2
-				args.extend(['-draw', 'rectangle 0, {0}, {1}, {2}'.format(height / 2 - signHeight / 2, width, height / 2 + signHeight / 2)])
-				args.extend([
-					'-gravity', 'South',
-					'-font', self.files_path('pricedown.ttf'),
-					'-fill', 'rgb(200,30,30)',
-					'-stroke', 'black',
-					'-strokewidth', '3',
-					'-weight', '300'
-				])
-				args.extend([
-					'-pointsize', str(math.floor(signHeight * 0.8)), 
-					'-draw', 'text 0,{0} "wasted"'.format(math.floor(height / 2 - signHeight * 0.45)),
-				path])
-				await self.bot.run_process(args)
-				await self.bot.upload(path, filename='wasted.png')
-				del img
-				os.remove(path)
-		except:
-			try:
-				os.remove(path)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='wasted.png')
 
 	@commands.command(pass_context=True, aliases=['greentext', '>'])
 	async def green(self, ctx, *, txt:str):
@@ -2670,150 +3571,65 @@ class Main(Cog):
 	@commands.cooldown(1, 5)
 	async def rainbow(self, ctx, *urls:str):
 		"""Change images color matrix multiple times into a gif"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_rainbow, b, self.color_combinations)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				path2 = path[:-3]+'gif'
-				await self.download(url, path)
-				args = ['convert']
-				for c in self.color_combinations:
-					args.extend([
-						'(',
-							path,
-							'-resize', '256x256>',
-							'-colorize', '{0},{1},{2}'.format(c[0], c[1], c[2]),
-						')'
-					])
-				args.extend([
-					'-delay', '2',
-					'-set', 'delay', '2',
-					'-loop', '0',
-				path2])
-				await self.bot.run_process(args)
-				await self.bot.upload(path2, filename='rainbow.gif')
-				os.remove(path)
-				os.remove(path2)
-		except:
-			try:
-				os.remove(path)
-				os.remove(path2)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='rainbow.gif')
 
 	@commands.command(pass_context=True, aliases=['waves'])
 	@commands.cooldown(1, 5)
 	async def wave(self, ctx, *urls:str):
 		"""Wave image multiple times into a gif"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_wave, b)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				path2 = path[:-3]+'gif'
-				await self.download(url, path)
-				args = ['convert', '(', path, '-resize', '256x256>', ')', '-alpha', 'on', 'canvas:none', '-background', 'none']
-				amp = 5
-				while amp < 20:
-					args.extend([
-						'(',
-							'-clone', '0',
-							'-wave', '-' + str(amp) + 'x15',
-						')'
-					])
-					amp += 5
-				amp = 20
-				while amp >= 5:
-					args.extend([
-						'(',
-							'-clone', '0',
-							'-wave', '-' + str(amp) + 'x15',
-						')'
-					])
-					amp -= 5
-				args.extend([
-					'-delay', '4',
-					'-set', 'delay', '4',
-					'-loop', '0',
-				path2])
-				await self.bot.run_process(args)
-				await self.bot.upload(path2, filename='wave.gif')
-				os.remove(path)
-				os.remove(path2)
-		except:
-			try:
-				os.remove(path)
-				os.remove(path2)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='wave.gif')
 
 	@commands.command(pass_context=True)
 	@commands.cooldown(1, 5)
 	async def wall(self, ctx, *urls:str):
 		"""Image multiplied with curved perspective"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_wall, b)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				await self.download(url, path)
-				await self.bot.run_process(['convert', '(', path, '-resize', '128', ')', '-virtual-pixel', 'tile', '-mattecolor', 'none', '-background', 'none', '-resize', '512x512!', '-distort', 'Perspective', '0,0,57,42  0,128,63,130  128,0,140,60  128,128,140,140', path])
-				await self.bot.upload(path, filename='wall.png')
-				os.remove(path)
-		except:
-			try:
-				os.remove(path)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='wall.png')
 
 	@commands.command(pass_context=True, aliases=['cappend', 'layers'])
 	@commands.cooldown(1, 5)
 	async def layer(self, ctx, *urls:str):
 		"""Layers an image with its self"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_layer, b)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				await self.download(url, path)
-				args = ['convert', path]
-				args.extend([
-					'(',
-						path,
-						'-flop',
-					')',
-					'+append',
-					'(',
-						'(',
-							path,
-							'-flip',
-						')',
-						'(',
-							path,
-							'-flop',
-							'-flip',
-						')',
-						'+append',
-					')',
-					'-append',
-				path])
-				await self.bot.run_process(args)
-				await self.bot.upload(path, filename='layer.png')
-				os.remove(path)
-		except:
-			try:
-				os.remove(path)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='layer.png')
 
 	@commands.command(pass_context=True)
 	async def rotate(self, ctx, *urls:str):
@@ -2825,268 +3641,106 @@ class Main(Cog):
 		scale = get_images[1] if get_images[1] else random.choice([90, 180, 50, 45, 270, 120, 80])
 		for url in img_urls:
 			b = await self.bytes_download(url)
-			img = PIL.Image.open(b).convert('RGBA')
-			img = img.rotate(int(scale))
-			final = BytesIO()
-			img.save(final, 'png')
-			final.seek(0)
+			final = await self.apply_effect(ctx, effect_rotate, b, int(scale))
+			if final is None:
+				return
 			await self.bot.upload(final, filename='rotate.png', content='Rotated: `{0}°`'.format(scale))
 
 	@commands.command(pass_context=True)
 	@commands.cooldown(1, 5)
 	async def dice(self, ctx, *urls:str):
 		"""Dice up an image"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_tiles, b, False, True)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				path2 = path[:-3]+'miff'
-				await self.download(url, path)
-				img = PIL.Image.open(path)
-				width, height = img.size
-				size = min(math.ceil(width * .1), math.ceil(height * .1))
-				fragmentsW = math.ceil(width / size)
-				fragmentsH = math.ceil(height / size)
-				total = fragmentsW * fragmentsH
-				args = ['convert', '-quiet', path, '-crop', '{0}x{0}'.format(size), path2]
-				await self.bot.run_process(args)
-				args = ['montage', '-background', 'none', '-tile', '{0}x{1}'.format(fragmentsW, fragmentsH), '-geometry', '+0+0']
-				i = 0
-				while i < total:
-					rand = random.randint(-2, 2)
-					args.extend([
-						'(',
-							'{0}[{1}]'.format(path2, i), '-rotate', str(rand * 90), 
-						')'
-					])
-					i += 1
-				args.append(path)
-				await self.bot.run_process(args)
-				await self.bot.upload(path, filename='dice.png')
-				os.remove(path)
-				os.remove(path2)
-				del img
-		except:
-			try:
-				os.remove(path)
-				os.remove(path2)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='dice.png')
 
 	@commands.command(pass_context=True)
 	@commands.cooldown(1, 5)
 	async def scramble(self, ctx, *urls:str):
 		"""Scramble image"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_tiles, b, True, True)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				path2 = path[:-3]+'miff'
-				await self.download(url, path)
-				img = PIL.Image.open(path)
-				width, height = img.size
-				size = min(math.ceil(width * .1), math.ceil(height * .1))
-				fragmentsW = math.ceil(width / size)
-				fragmentsH = math.ceil(height / size)
-				total = fragmentsW * fragmentsH
-				left = []
-				i = 0
-				while i < total:
-					left.append(i)
-					i += 1
-				args = ['convert', '-quiet', path, '-crop', '{0}x{0}'.format(size), path2]
-				await self.bot.run_process(args)
-				args = ['montage', '-background', 'none', '-tile', '{0}x{1}'.format(fragmentsW, fragmentsH), '-geometry', '+0+0']
-				i = 0
-				while i < total:
-					r = random.randint(0, len(left)-1)
-					sli = left[r]
-					left.pop(r)
-					rand = random.randint(-2, 2)
-					args.extend(['(', '{0}[{1}]'.format(path2, sli), '-rotate', str(rand * 90), ')'])
-					i += 1
-				args.append(path)
-				await self.bot.run_process(args)
-				await self.bot.upload(path, filename='scramble.png')
-				os.remove(path)
-				os.remove(path2)
-				del img
-		except:
-			try:
-				os.remove(path)
-				os.remove(path2)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='scramble.png')
 
 	@commands.command(pass_context=True)
 	@commands.cooldown(1, 5)
 	async def scramble2(self, ctx, *urls:str):
 		"""Scramble image without rotation"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_tiles, b, True, False)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				path2 = path[:-3]+'miff'
-				await self.download(url, path)
-				img = PIL.Image.open(path)
-				width, height = img.size
-				size = min(math.ceil(width * .1), math.ceil(height * .1))
-				fragmentsW = math.ceil(width / size)
-				fragmentsH = math.ceil(height / size)
-				total = fragmentsW * fragmentsH
-				left = []
-				i = 0
-				while i < total:
-					left.append(i)
-					i += 1
-				args = ['convert', '-quiet', path, '-crop', '{0}x{0}'.format(size), path2]
-				await self.bot.run_process(args)
-				args = ['montage', '-background', 'none', '-tile', '{0}x{1}'.format(fragmentsW, fragmentsH), '-geometry', '+0+0']
-				i = 0
-				while i < total:
-					r = random.randint(0, len(left)-1)
-					sli = left[r]
-					left.pop(r)
-					args.extend(['{0}[{1}]'.format(path2, sli)])
-					i += 1
-				args.append(path)
-				await self.bot.run_process(args)
-				await self.bot.upload(path, filename='scramble2.png')
-				os.remove(path)
-				os.remove(path2)
-				del img
-		except:
-			try:
-				os.remove(path)
-				os.remove(path2)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='scramble2.png')
 
 	@commands.command(pass_context=True, aliases=['multi'])
 	@commands.cooldown(1, 10)
 	async def multiply(self, ctx, *urls:str):
 		"""Rotate and shrink image multiple times on a large canvas"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_tiles, b, False, True)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				await self.download(url, path)
-				img = PIL.Image.open(path)
-				width, height = img.size
-				size = min(math.ceil(width * .1), math.ceil(height * .1))
-				fragmentsW = math.ceil(width / size)
-				fragmentsH = math.ceil(height / size)
-				total = fragmentsW * fragmentsH
-				args = ['convert', '-quiet', path, '-crop', '{0}x{0}'.format(size), path]
-				await self.bot.run_process(args)
-				args = ['montage', '-background', 'none', '-tile', '{0}x{1}'.format(fragmentsW, fragmentsH), '-geometry', '+0+0']
-				i = 0
-				while i < total:
-					rand = random.randint(-2, 2)
-					args.extend([
-						'(',
-							'{0}[{1}]'.format(path, i), '-rotate', str(rand * 90), 
-						')'
-					])
-					i += 1
-				args.append(path)
-				await self.bot.run_process(args)
-				await self.bot.upload(path, filename='wtf.png')
-				os.remove(path)
-				del img
-		except:
-			try:
-				os.remove(path)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='wtf.png')
 
 	@commands.command(pass_context=True)
 	@commands.cooldown(1, 5)
 	async def shake(self, ctx, *urls:str):
 		"""Generate a Triggered Gif for a User or Image"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_shake, b)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				path2 = path[:-3]+'gif'
-				await self.download(url, path)
-				await self.bot.run_process(['convert',
-					'canvas:none',
-					'-size', '512x512!',
-					'-resize', '512x512!',
-					'-draw', 'image over -60,-60 640,640 "{0}"'.format(path),
-					'(',
-						'canvas:none',
-						'-size', '512x512!',
-						'-draw', 'image over -45,-50 640,640 "{0}"'.format(path),
-					')',
-					'(',
-						'canvas:none',
-						'-size', '512x512!',
-						'-draw', 'image over -50,-45 640,640 "{0}"'.format(path),
-					')',
-					'(',
-						'canvas:none',
-						'-size', '512x512!',
-						'-draw', 'image over -45,-65 640,640 "{0}"'.format(path),
-					')',
-					'-layers', 'Optimize',
-					'-set', 'delay', '2',
-				path2])
-				await self.bot.upload(path2, filename='shake.gif')
-				os.remove(path)
-				os.remove(path2)
-		except Exception as e:
-			await self.bot.say(e)
-			try:
-				os.remove(path)
-				os.remove(path2)
-			except:
-				pass
+			await self.bot.upload(final, filename='shake.gif')
 
 	@commands.command(pass_context=True, aliases=['360', 'grotate'])
 	@commands.cooldown(1, 5)
 	async def spin(self, ctx, *urls:str):
 		"""Make image into circular form and rotate it 360 into a gif"""
-		try:
-			get_images = await self.get_images(ctx, urls=urls, limit=3)
-			if not get_images:
+		get_images = await self.get_images(ctx, urls=urls, limit=3)
+		if not get_images:
+			return
+		for url in get_images:
+			b = await self.bytes_download(url)
+			if b is False:
+				continue
+			final = await self.apply_effect(ctx, effect_spin, b)
+			if final is None:
 				return
-			for url in get_images:
-				path = self.files_path(self.bot.random(True))
-				path2 = path[:3]+'gif'
-				await self.download(url, path)
-				args = ['convert', '-alpha', 'on', '(', path, '-scale', '256x256>', '-scale', '256x256<', ')', '(', '-size', '256x256', 'xc:none', '-fill', 'white', '-draw', 'circle 128,128 128,0', ')', '-compose', 'copyopacity', '-background', 'white']
-				i = 0
-				while i <= 340:
-					args.extend(['(', '-clone', '0', '-rotate', str(i), '-crop', '256x256+0+0!', '-clone', '1', '-composite', ')'])
-					i += 20
-				args.extend(['-compose', 'srcover', '-delete', '0', '-delete', '0', '-delay', '5', '-set', 'delay', '5', '-set', 'dispose', 'None', path2])
-				await self.bot.run_process(args)
-				await self.bot.upload(path, filename='spin.gif')
-				os.remove(path)
-				os.remove(path2)
-		except:
-			try:
-				os.remove(path)
-				os.remove(path2)
-			except:
-				pass
-			raise
+			await self.bot.upload(final, filename='spin.gif')
 
 def setup(bot):
 	bot.add_cog(Main(bot))
\ No newline at end of file
@@ -1,6 +1,7 @@
 import discord
 from discord.ext import commands
 from .utils.dataIO import dataIO
+from .jsonstore import load_json, save_json
 from .utils import checks
 from __main__ import send_cmd_help, settings
 from datetime import datetime
@@ -67,19 +68,19 @@ class Mod:
 
     def __init__(self, bot):
         self.bot = bot
-        self.whitelist_list = dataIO.load_json("data/mod/whitelist.json")
-        self.blacklist_list = dataIO.load_json("data/mod/blacklist.json")
-        self.ignore_list = dataIO.load_json("data/mod/ignorelist.json")
-        self.filter = dataIO.load_json("data/mod/filter.json")
-        self.past_names = dataIO.load_json("data/mod/past_names.json")
-        self.past_nicknames = dataIO.load_json("data/mod/past_nicknames.json")
-        settings = dataIO.load_json("data/mod/settings.json")
+        self.whitelist_list = load_json(self.bot, "data/mod/whitelist.json")
+        self.blacklist_list = load_json(self.bot, "data/mod/blacklist.json")
+        self.ignore_list = load_json(self.bot, "data/mod/ignorelist.json")
+        self.filter = load_json(self.bot, "data/mod/filter.json")
+        self.past_names = load_json(self.bot, "data/mod/past_names.json")
+        self.past_nicknames = load_json(self.bot, "data/mod/past_nicknames.json")
+        settings = load_json(self.bot, "data/mod/settings.json")
         self.settings = defaultdict(lambda: default_settings.copy(), settings)
         self.cache = defaultdict(lambda: deque(maxlen=3))
-        self.cases = dataIO.load_json("data/mod/modlog.json")
+        self.cases = load_json(self.bot, "data/mod/modlog.json")
         self.last_case = defaultdict(dict)
         self._tmp_banned_cache = []
-        perms_cache = dataIO.load_json("data/mod/perms_cache.json")
+        perms_cache = load_json(self.bot, "data/mod/perms_cache.json")
         self._perms_cache = defaultdict(dict, perms_cache)
         self.owners = ["173102900514521089", "152802677867282432"]
 
@@ -137,7 +138,7 @@ class Mod:
                 return
             self.settings[server.id]["mod-log"] = None
             await self.bot.say(embed=TTlovesEmbeds("Mod log deactivated."))
-        dataIO.save_json("data/mod/settings.json", self.settings)
+        save_json(self.bot, "data/mod/settings.json", self.settings)
 
     @modset.command(pass_context=True, no_pm=True)
     async def banmentionspam(self, ctx, max_mentions : int=False):
@@ -159,7 +160,7 @@ class Mod:
                 return
             self.settings[server.id]["ban_mention_spam"] = False
             await self.bot.say(embed=TTlovesEmbeds("Autoban for mention spam disabled."))
-        dataIO.save_json("data/mod/settings.json", self.settings)
+        save_json(self.bot, "data/mod/settings.json", self.settings)
 
     @modset.command(pass_context=True, no_pm=True)
     async def deleterepeats(self, ctx):
@@ -172,14 +173,14 @@ class Mod:
         else:
             self.settings[server.id]["delete_repeats"] = False
             await self.bot.say(embed=TTlovesEmbeds("Repeated messages will be ignored."))
-        dataIO.save_json("data/mod/settings.json", self.settings)
+        save_json(self.bot, "data/mod/settings.json", self.settings)
 
     @modset.command(pass_context=True, no_pm=True)
     async def resetcases(self, ctx):
         """Resets modlog's cases"""
         server = ctx.message.server
         self.cases[server.id] = {}
-        dataIO.save_json("data/mod/modlog.json", self.cases)
+        save_json(self.bot, "data/mod/modlog.json", self.cases)
         await self.bot.say(embed=TTlovesEmbeds("Cases have been reset."))
 
     @modset.command(pass_context=True, no_pm=True)
@@ -197,7 +198,7 @@ class Mod:
             else:
                 await self.bot.say(embed=TTlovesEmbeds("Delete delay set to {}"
                                    " seconds.".format(time)))
-            dataIO.save_json("data/mod/settings.json", self.settings)
+            save_json(self.bot, "data/mod/settings.json", self.settings)
         else:
             try:
                 delay = self.settings[server.id]["delete_delay"]
@@ -251,7 +252,7 @@ class Mod:
                                                  default_settings[action])
             if value != enabled:
                 self.settings[server.id][action] = enabled
-                dataIO.save_json("data/mod/settings.json", self.settings)
+                save_json(self.bot, "data/mod/settings.json", self.settings)
             msg = ('Case creation for %s actions %s %s.' %
                    (name.lower(),
                     'was already' if enabled == value else 'is now',
@@ -444,7 +445,7 @@ class Mod:
                                "permission and the user I'm muting must be "
                                "lower than myself in the role hierarchy."))
         else:
-            dataIO.save_json("data/mod/perms_cache.json", self._perms_cache)
+            save_json(self.bot, "data/mod/perms_cache.json", self._perms_cache)
             if self.settings[server.id].get('cmute_cases',
                             default_settings['cmute_cases']):
                 await self.new_case(server,
@@ -484,7 +485,7 @@ class Mod:
             await self.bot.say(embed=TTlovesEmbeds("That user is already muted in all channels."))
             return
         self._perms_cache[user.id] = register
-        dataIO.save_json("data/mod/perms_cache.json", self._perms_cache)
+        save_json(self.bot, "data/mod/perms_cache.json", self._perms_cache)
         if self.settings[server.id].get('smute_cases',
                         default_settings['smute_cases']):
             await self.new_case(server,
@@ -536,7 +537,7 @@ class Mod:
                 pass
             if user.id in self._perms_cache and not self._perms_cache[user.id]:
                 del self._perms_cache[user.id]  # cleanup
-            dataIO.save_json("data/mod/perms_cache.json", self._perms_cache)
+            save_json(self.bot, "data/mod/perms_cache.json", self._perms_cache)
             await self.bot.say(embed=TTlovesEmbeds("User has been unmuted in this channel."))
 
     @checks.mod_or_permissions(administrator=True)
@@ -575,7 +576,7 @@ class Mod:
                     await asyncio.sleep(0.1)
         if user.id in self._perms_cache and not self._perms_cache[user.id]:
             del self._perms_cache[user.id]  # cleanup
-        dataIO.save_json("data/mod/perms_cache.json", self._perms_cache)
+        save_json(self.bot, "data/mod/perms_cache.json", self._perms_cache)
         await self.bot.say(embed=TTlovesEmbeds("User has been unmuted in this server."))
 
     @commands.group(pass_context=True)
@@ -945,7 +946,7 @@ class Mod:
         """Adds user to bot's blacklist"""
         if user.id not in self.blacklist_list:
             self.blacklist_list.append(user.id)
-            dataIO.save_json("data/mod/blacklist.json", self.blacklist_list)
+            save_json(self.bot, "data/mod/blacklist.json", self.blacklist_list)
             await self.bot.say(embed=TTlovesEmbeds("User has been added to blacklist."))
         else:
             await self.bot.say(embed=TTlovesEmbeds("User is already blacklisted."))
@@ -955,7 +956,7 @@ class Mod:
         """Removes user from bot's blacklist"""
         if user.id in self.blacklist_list:
             self.blacklist_list.remove(user.id)
-            dataIO.save_json("data/mod/blacklist.json", self.blacklist_list)
+            save_json(self.bot, "data/mod/blacklist.json", self.blacklist_list)
             await self.bot.say(embed=TTlovesEmbeds("User has been removed from blacklist."))
         else:
             await self.bot.say(embed=TTlovesEmbeds("User is not in blacklist."))
@@ -964,7 +965,7 @@ class Mod:
     async def _blacklist_clear(self):
         """Clears the blacklist"""
         self.blacklist_list = []
-        dataIO.save_json("data/mod/blacklist.json", self.blacklist_list)
+        save_json(self.bot, "data/mod/blacklist.json", self.blacklist_list)
         await self.bot.say(embed=TTlovesEmbeds("Blacklist is now empty."))
 
     @commands.group(pass_context=True)
@@ -983,7 +984,7 @@ class Mod:
             else:
                 msg = ""
             self.whitelist_list.append(user.id)
-            dataIO.save_json("data/mod/whitelist.json", self.whitelist_list)
+            save_json(self.bot, "data/mod/whitelist.json", self.whitelist_list)
             await self.bot.say(embed=TTlovesEmbeds("User has been added to whitelist." + msg))
         else:
             await self.bot.say(embed=TTlovesEmbeds("User is already whitelisted."))
@@ -993,7 +994,7 @@ class Mod:
         """Removes user from bot's whitelist"""
         if user.id in self.whitelist_list:
             self.whitelist_list.remove(user.id)
-            dataIO.save_json("data/mod/whitelist.json", self.whitelist_list)
+            save_json(self.bot, "data/mod/whitelist.json", self.whitelist_list)
             await self.bot.say(embed=TTlovesEmbeds("User has been removed from whitelist."))
         else:
             await self.bot.say(embed=TTlovesEmbeds("User is not in whitelist."))
@@ -1002,7 +1003,7 @@ class Mod:
     async def _whitelist_clear(self):
         """Clears the whitelist"""
         self.whitelist_list = []
-        dataIO.save_json("data/mod/whitelist.json", self.whitelist_list)
+        save_json(self.bot, "data/mod/whitelist.json", self.whitelist_list)
         await self.bot.say(embed=TTlovesEmbeds("Whitelist is now empty."))
 
     @commands.group(pass_context=True, no_pm=True)
@@ -1022,14 +1023,14 @@ class Mod:
         if not channel:
             if current_ch.id not in self.ignore_list["CHANNELS"]:
                 self.ignore_list["CHANNELS"].append(current_ch.id)
-                dataIO.save_json("data/mod/ignorelist.json", self.ignore_list)
+                save_json(self.bot, "data/mod/ignorelist.json", self.ignore_list)
                 await self.bot.say(embed=TTlovesEmbeds("Channel added to ignore list."))
             else:
                 await self.bot.say(embed=TTlovesEmbeds("Channel already in ignore list."))
         else:
             if channel.id not in self.ignore_list["CHANNELS"]:
                 self.ignore_list["CHANNELS"].append(channel.id)
-                dataIO.save_json("data/mod/ignorelist.json", self.ignore_list)
+                save_json(self.bot, "data/mod/ignorelist.json", self.ignore_list)
                 await self.bot.say(embed=TTlovesEmbeds("Channel added to ignore list."))
             else:
                 await self.bot.say(embed=TTlovesEmbeds("Channel already in ignore list."))
@@ -1040,7 +1041,7 @@ class Mod:
         server = ctx.message.server
         if server.id not in self.ignore_list["SERVERS"]:
             self.ignore_list["SERVERS"].append(server.id)
-            dataIO.save_json("data/mod/ignorelist.json", self.ignore_list)
+            save_json(self.bot, "data/mod/ignorelist.json", self.ignore_list)
             await self.bot.say(embed=TTlovesEmbeds("This server has been added to the ignore list."))
         else:
             await self.bot.say(embed=TTlovesEmbeds("This server is already being ignored."))
@@ -1062,14 +1063,14 @@ class Mod:
         if not channel:
             if current_ch.id in self.ignore_list["CHANNELS"]:
                 self.ignore_list["CHANNELS"].remove(current_ch.id)
-                dataIO.save_json("data/mod/ignorelist.json", self.ignore_list)
+                save_json(self.bot, "data/mod/ignorelist.json", self.ignore_list)
                 await self.bot.say(embed=TTlovesEmbeds("This channel has been removed from the ignore list."))
             else:
                 await self.bot.say(embed=TTlovesEmbeds("This channel is not in the ignore list."))
         else:
             if channel.id in self.ignore_list["CHANNELS"]:
                 self.ignore_list["CHANNELS"].remove(channel.id)
-                dataIO.save_json("data/mod/ignorelist.json", self.ignore_list)
+                save_json(self.bot, "data/mod/ignorelist.json", self.ignore_list)
                 await self.bot.say(embed=TTlovesEmbeds("Channel removed from ignore list."))
             else:
                 await self.bot.say(embed=TTlovesEmbeds("That channel is not in the ignore list."))
@@ -1080,7 +1081,7 @@ class Mod:
         server = ctx.message.server
         if server.id in self.ignore_list["SERVERS"]:
             self.ignore_list["SERVERS"].remove(server.id)
-            dataIO.save_json("data/mod/ignorelist.json", self.ignore_list)
+            save_json(self.bot, "data/mod/ignorelist.json", self.ignore_list)
             await self.bot.say(embed=TTlovesEmbeds("This server has been removed from the ignore list."))
         else:
             await self.bot.say(embed=TTlovesEmbeds("This server is not in the ignore list."))
@@ -1133,7 +1134,7 @@ class Mod:
                 self.filter[server.id].append(w.lower())
                 added += 1
         if added:
-            dataIO.save_json("data/mod/filter.json", self.filter)
+            save_json(self.bot, "data/mod/filter.json", self.filter)
             await self.bot.say(embed=TTlovesEmbeds("Words added to filter."))
         else:
             await self.bot.say(embed=TTlovesEmbeds("Words already in the filter."))
@@ -1159,7 +1160,7 @@ class Mod:
                 self.filter[server.id].remove(w.lower())
                 removed += 1
         if removed:
-            dataIO.save_json("data/mod/filter.json", self.filter)
+            save_json(self.bot, "data/mod/filter.json", self.filter)
             await self.bot.say(embed=TTlovesEmbeds("Words removed from filter."))
         else:
             await self.bot.say(embed=TTlovesEmbeds("Those words weren't in the filter."))
@@ -1349,7 +1350,7 @@ class Mod:
         if mod:
             self.last_case[server.id][mod.id] = case_n
 
-        dataIO.save_json("data/mod/modlog.json", self.cases)
+        save_json(self.bot, "data/mod/modlog.json", self.cases)
 
     async def update_case(self, server, *, case, mod=None, reason=None,
                           until=False):
@@ -1380,7 +1381,7 @@ class Mod:
 
         case_msg = self.format_case_msg(case)
 
-        dataIO.save_json("data/mod/modlog.json", self.cases)
+        save_json(self.bot, "data/mod/modlog.json", self.cases)
 
         msg = await self.bot.get_message(channel, case["message"])
         if msg:
@@ -1559,7 +1560,7 @@ class Mod:
                     names = deque(self.past_names[before.id], maxlen=20)
                     names.append(after.name)
                     self.past_names[before.id] = list(names)
-            dataIO.save_json("data/mod/past_names.json", self.past_names)
+            save_json(self.bot, "data/mod/past_names.json", self.past_names)
 
         if before.nick != after.nick and after.nick is not None:
             server = before.server
@@ -1573,8 +1574,8 @@ class Mod:
             if after.nick not in nicks:
                 nicks.append(after.nick)
                 self.past_nicknames[server.id][before.id] = list(nicks)
-                dataIO.save_json("data/mod/past_nicknames.json",
-                                 self.past_nicknames)
+                save_json(self.bot, "data/mod/past_nicknames.json",
+                          self.past_nicknames)
 
     def are_overwrites_empty(self, overwrites):
         """There is currently no cleaner way to check if a
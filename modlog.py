@@ -2,6 +2,7 @@ from discord.ext import commands
 from cogs.utils import checks
 import datetime
 from cogs.utils.dataIO import fileIO
+from cogs.jsonstore import load_json, save_json
 import discord
 import asyncio
 import os
@@ -18,13 +19,15 @@ class ModLog:
     def __init__(self, bot):
         self.bot = bot
         self.direct = "data/modlogset/settings.json"
+        # kept in memory, every handler used to re-read the file from disk
+        self.db = load_json(self.bot, self.direct)
 
     @checks.admin_or_permissions(administrator=True)
     @commands.group(name='modlogtoggle', pass_context=True, no_pm=True)
     async def modlogtoggles(self, ctx):
         """toggle which server activity to log"""
         if ctx.invoked_subcommand is None:
-            db = fileIO(self.direct, "load")
+            db = self.db
             server = ctx.message.server
             await self.bot.send_cmd_help(ctx)
             try:
@@ -55,17 +58,17 @@ class ModLog:
     async def _channel(self, ctx):
         """Set the channel to send notifications too"""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if ctx.message.server.me.permissions_in(ctx.message.channel).send_messages:
             if server.id in db:
                 db[server.id]['Channel'] = ctx.message.channel.id
-                fileIO(self.direct, "save", db)
+                save_json(self.bot, self.direct, db)
                 await self.bot.say("Channel changed.")
                 return
             if not server.id in db:
-                db[server.id] = inv_settings
+                db[server.id] = inv_settings.copy()
                 db[server.id]["Channel"] = ctx.message.channel.id
-                fileIO(self.direct, "save", db)
+                save_json(self.bot, self.direct, db)
                 await self.bot.say("I will now send toggled modlog notifications here")
         else:
             return
@@ -74,171 +77,171 @@ class ModLog:
     async def embed(self, ctx):
         """Enables or disables embed modlog."""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["embed"] == False:
             db[server.id]["embed"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Enabled embed modlog.")
         elif db[server.id]["embed"] == True:
             db[server.id]["embed"] = False
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Disabled embed modlog.")
 
     @modlogset.command(pass_context=True, no_pm=True)
     async def disable(self, ctx):
         """disables the modlog"""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if not server.id in db:
             await self.bot.say("Server not found, use modlogset to set a channnel")
             return
         del db[server.id]
-        fileIO(self.direct, "save", db)
+        save_json(self.bot, self.direct, db)
         await self.bot.say("I will no longer send modlog notifications here")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def edit(self, ctx):
         """toggle notifications when a member edits theyre message"""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["toggleedit"] == False:
             db[server.id]["toggleedit"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Edit messages enabled")
         elif db[server.id]["toggleedit"] == True:
             db[server.id]["toggleedit"] = False
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Edit messages disabled")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def join(self, ctx):
         """toggles notofications when a member joins the server."""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["togglejoin"] == False:
             db[server.id]["togglejoin"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Enabled join logs.")
         elif db[server.id]['togglejoin'] == True:
             db[server.id]['togglejoin'] = False
-            fileIO(self.direct, 'save', db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Disabled join logs.")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def server(self, ctx):
         """toggles notofications when the server updates."""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["toggleserver"] == False:
             db[server.id]["toggleserver"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Enabled server logs.")
         elif db[server.id]['toggleserver'] == True:
             db[server.id]['toggleserver'] = False
-            fileIO(self.direct, 'save', db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Disabled server logs.")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def channel(self, ctx):
         """toggles channel update logging for the server."""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["togglechannel"] == False:
             db[server.id]["togglechannel"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Enabled channel logs.")
         elif db[server.id]['togglechannel'] == True:
             db[server.id]['togglechannel'] = False
-            fileIO(self.direct, 'save', db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Disabled channel logs.")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def leave(self, ctx):
         """toggles notofications when a member leaves the server."""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["toggleleave"] == False:
             db[server.id]["toggleleave"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Enabled leave logs.")
         elif db[server.id]['toggleleave'] == True:
             db[server.id]['toggleleave'] = False
-            fileIO(self.direct, 'save', db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Disabled leave logs.")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def delete(self, ctx):
         """toggle notifications when a member delete theyre message"""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["toggledelete"] == False:
             db[server.id]["toggledelete"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Delete messages enabled")
         elif db[server.id]["toggledelete"] == True:
             db[server.id]["toggledelete"] = False
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Delete messages disabled")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def user(self, ctx):
         """toggle notifications when a user changes his profile"""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["toggleuser"] == False:
             db[server.id]["toggleuser"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("User messages enabled")
         elif db[server.id]["toggleuser"] == True:
             db[server.id]["toggleuser"] = False
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("User messages disabled")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def roles(self, ctx):
         """toggle notifications when roles change"""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["toggleroles"] == False:
             db[server.id]["toggleroles"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Role messages enabled")
         elif db[server.id]["toggleroles"] == True:
             db[server.id]["toggleroles"] = False
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Role messages disabled")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def voice(self, ctx):
         """toggle notifications when voice status change"""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["togglevoice"] == False:
             db[server.id]["togglevoice"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Voice messages enabled")
         elif db[server.id]["togglevoice"] == True:
             db[server.id]["togglevoice"] = False
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Voice messages disabled")
 
     @modlogtoggles.command(pass_context=True, no_pm=True)
     async def ban(self, ctx):
         """toggle notifications when a user is banned"""
         server = ctx.message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if db[server.id]["toggleban"] == False:
             db[server.id]["toggleban"] = True
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Ban messages enabled")
         elif db[server.id]["toggleban"] == True:
             db[server.id]["toggleban"] = False
-            fileIO(self.direct, "save", db)
+            save_json(self.bot, self.direct, db)
             await self.bot.say("Ban messages disabled")
 
     async def on_message_delete(self, message):
         server = message.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['toggledelete'] == False:
@@ -274,7 +277,7 @@ class ModLog:
 
     async def on_member_join(self, member):
         server = member.server
-        db = fileIO(self.direct, 'load')
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['togglejoin'] == False:
@@ -305,7 +308,7 @@ class ModLog:
 
     async def on_member_remove(self, member):
         server = member.server
-        db = fileIO(self.direct, 'load')
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['toggleleave'] == False:
@@ -335,7 +338,7 @@ class ModLog:
 
     async def on_channel_update(self, before, after):
         server = before.server
-        db = fileIO(self.direct, 'load')
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['togglechannel'] == False:
@@ -465,7 +468,7 @@ class ModLog:
 
     async def on_message_edit(self, before, after):
         server = before.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['toggleedit'] == False:
@@ -507,7 +510,7 @@ class ModLog:
 
     async def on_server_update(self, before, after):
         server = before
-        db = fileIO(self.direct, "load")
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['toggleserver'] == False:
@@ -527,7 +530,7 @@ class ModLog:
 
     async def on_voice_state_update(self, before, after):
         server = before.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['togglevoice'] == False:
@@ -561,7 +564,7 @@ class ModLog:
 
     async def on_member_update(self, before, after):
         server = before.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['toggleuser'] and db[server.id]['toggleroles'] == False:
@@ -593,7 +596,7 @@ class ModLog:
 
     async def on_member_update(self, before, after):
         server = before.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['toggleuser'] and db[server.id]['toggleroles'] == False:
@@ -627,7 +630,7 @@ class ModLog:
 
     async def on_member_ban(self, member):
         server = member.server
-        db = fileIO(self.direct, "load")
+        db = self.db
         if not server.id in db:
             return
         if db[server.id]['toggleban'] == False:
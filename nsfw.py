@@ -48,6 +48,21 @@ class nsfw:
         self.bot = bot
         self.settings = dataIO.load_json(SETTINGS)
 
+    # requests go through the pooled HTTPClient cog when it is loaded
+    async def _get_text(self, url):
+        http = self.bot.get_cog('HTTPClient')
+        if http is not None:
+            return await http.get_text(url)
+        async with aiohttp.get(url) as r:
+            return await r.text()
+
+    async def _get_json(self, url):
+        http = self.bot.get_cog('HTTPClient')
+        if http is not None:
+            return await http.get_json(url)
+        async with aiohttp.get(url) as r:
+            return await r.json()
+
     @commands.group(name="nsfw", pass_context=True)
     async def _nsfw(self, ctx):
         """NSFW settings."""
@@ -84,10 +99,9 @@ class nsfw:
         try:
             rdm = random.randint(0, self.settings["ama_boobs"])
             search = ("http://api.oboobs.ru/boobs/{}".format(rdm))
-            async with aiohttp.get(search) as r:
-                result = await r.json()
-                boob = random.choice(result)
-                boob = "http://media.oboobs.ru/{}".format(boob["preview"])
+            result = await self._get_json(search)
+            boob = random.choice(result)
+            boob = "http://media.oboobs.ru/{}".format(boob["preview"])
         except Exception as e:
             await self.bot.reply("Error getting results.")
             return
@@ -130,10 +144,9 @@ class nsfw:
         try:
             rdm = random.randint(0, self.settings["ama_ass"])
             search = ("http://api.obutts.ru/butts/{}".format(rdm))
-            async with aiohttp.get(search) as r:
-                result = await r.json()
-                ass = random.choice(result)
-                ass = "http://media.obutts.ru/{}".format(ass["preview"])
+            result = await self._get_json(search)
+            ass = random.choice(result)
+            ass = "http://media.obutts.ru/{}".format(ass["preview"])
         except Exception as e:
             await self.bot.reply("Error getting results.")
             return
@@ -225,8 +238,7 @@ class nsfw:
             return
         try:
             query = ("https://yande.re/post/random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="highres").get("href")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -256,8 +268,7 @@ class nsfw:
             return
         try:
             query = ("https://konachan.com/post/random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="highres").get("href")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -292,8 +303,7 @@ class nsfw:
             return
         try:
             query = ("https://e621.net/post/random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="highres").get("href")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -323,8 +333,7 @@ class nsfw:
             return
         try:
             query = ("http://rule34.xxx/index.php?page=post&s=random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="image").get("src")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -354,8 +363,7 @@ class nsfw:
             return
         try:
             query = ("http://danbooru.donmai.us/posts/random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="image").get("src")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -386,8 +394,7 @@ class nsfw:
             return
         try:
             query = ("http://www.gelbooru.com/index.php?page=post&s=random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="image").get("src")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -422,8 +429,7 @@ class nsfw:
             return
         try:
             query = ("http://www.tbib.org/index.php?page=post&s=random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="image").get("src")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -454,8 +460,7 @@ class nsfw:
             return
         try:
             query = ("http://xbooru.com/index.php?page=post&s=random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="image").get("src")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -486,8 +491,7 @@ class nsfw:
             return
         try:
             query = ("http://furry.booru.org/index.php?page=post&s=random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="image").get("src")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -518,8 +522,7 @@ class nsfw:
             return
         try:
             query = ("http://drunkenpumken.booru.org/index.php?page=post&s=random")
-            page = await aiohttp.get(query)
-            page = await page.text()
+            page = await self._get_text(query)
             soup = BeautifulSoup(page, 'html.parser')
             image = soup.find(id="image").get("src")
             colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
@@ -587,8 +590,7 @@ class nsfw:
             try:
                 tags = ("+").join(tags)
                 query = ("https://yande.re/post.json?limit=42&tags=" + tags)
-                page = await aiohttp.get(query)
-                json = await page.json()
+                json = await self._get_json(query)
                 if json != []:
                     colour = ''.join([randchoice('0123456789ABCDEF') for x in range(6)])
                     colour = int(colour, 16)
@@ -0,0 +1,267 @@
+"""Leveler database code against mongomock: the executor wrapper, exp flushing, ranks and leaderboards."""
+import asyncio
+import importlib.util
+import os
+import sys
+import threading
+import time
+import types
+
+import pytest
+
+mongomock = pytest.importorskip("mongomock")
+pytest.importorskip("pymongo")
+pytest.importorskip("PIL")
+pytest.importorskip("aiohttp")
+
+from pymongo import UpdateOne, ASCENDING, DESCENDING
+from pymongo.errors import BulkWriteError
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _module(name, **attrs):
+    module = sys.modules.get(name)
+    if module is None:
+        module = sys.modules[name] = types.ModuleType(name)
+    for attr, value in attrs.items():
+        if not hasattr(module, attr):
+            setattr(module, attr, value)
+    return module
+
+
+class _Command:
+    def __init__(self, func):
+        self.callback = func
+
+    def command(self, *args, **kwargs):
+        return _Command
+
+    group = command
+
+
+# the parts of Red leveler imports, outside a running bot
+def _load_leveler():
+    passthrough = lambda *args, **kwargs: (lambda func: func)
+    _module("cogs", __path__=[ROOT])
+    checks = _module("cogs.utils.checks", is_owner=passthrough, admin_or_permissions=passthrough,
+                     mod_or_permissions=passthrough, serverowner_or_permissions=passthrough)
+    dataIO = _module("cogs.utils.dataIO", fileIO=lambda path, mode, data=None: {"PREFIXES": ["!"]})
+    formatting = _module("cogs.utils.chat_formatting", pagify=None)
+    _module("cogs.utils", __path__=[], checks=checks, dataIO=dataIO, chat_formatting=formatting)
+    import __main__
+    if not hasattr(__main__, "send_cmd_help"):
+        __main__.send_cmd_help = None
+    if importlib.util.find_spec("discord") is None:
+        commands = _module("discord.ext.commands", command=lambda *args, **kwargs: _Command,
+                           group=lambda *args, **kwargs: _Command,
+                           cooldown=passthrough, BucketType=types.SimpleNamespace(user=None))
+        _module("discord.ext", commands=commands)
+        _module("discord.utils", find=None)
+        _module("discord", Member=object, Role=object, Channel=object)
+    spec = importlib.util.spec_from_file_location("cogs.leveler", os.path.join(ROOT, "leveler.py"))
+    leveler = importlib.util.module_from_spec(spec)
+    sys.modules["cogs.leveler"] = leveler
+    spec.loader.exec_module(leveler)
+    return leveler
+
+
+leveler = _load_leveler()
+
+
+def run(coro_func):
+    async def main():
+        database = leveler.AsyncDatabase(mongomock.MongoClient().leveler, asyncio.get_event_loop(), max_workers=2)
+        try:
+            return await coro_func(database)
+        finally:
+            database.close()
+    return asyncio.run(main())
+
+
+def test_find_one_and_update_one():
+    async def check(database):
+        await database.users.insert_one({"user_id": "1", "total_exp": 5, "servers": {}})
+        await database.users.update_one({"user_id": "1"}, {"$set": {"servers.10.level": 2}, "$inc": {"total_exp": 3}})
+        await database.users.update_one({"user_id": "2"}, {"$set": {"total_exp": 1}}, upsert=True)
+        return (await database.users.find_one({"user_id": "1"}, {"_id": 0}),
+                await database.users.find_one({"user_id": "2"}, {"_id": 0}),
+                await database.users.find_one({"user_id": "3"}))
+
+    first, second, missing = run(check)
+    assert first == {"user_id": "1", "total_exp": 8, "servers": {"10": {"level": 2}}}
+    assert second == {"user_id": "2", "total_exp": 1}
+    assert missing is None
+
+
+def test_bulk_write():
+    async def check(database):
+        await database.users.insert_one({"user_id": "1", "total_exp": 0})
+        result = await database.users.bulk_write([
+            UpdateOne({"user_id": "1"}, {"$inc": {"total_exp": 10}}),
+            UpdateOne({"user_id": "1"}, {"$inc": {"total_exp": 5}}),
+            UpdateOne({"user_id": "2"}, {"$set": {"total_exp": 7}}, upsert=True),
+            ], ordered=False)
+        users = await database.users.find({}, {"_id": 0}, sort=[("user_id", ASCENDING)])
+        return result, users
+
+    result, users = run(check)
+    assert result.modified_count == 2
+    assert result.upserted_count == 1
+    assert users == [{"user_id": "1", "total_exp": 15}, {"user_id": "2", "total_exp": 7}]
+
+
+def test_find_pages_through_sorted_results():
+    async def check(database):
+        await database.server_exp.bulk_write([
+            UpdateOne({"server_id": "1", "user_id": str(i)}, {"$set": {"total": i % 7}}, upsert=True)
+            for i in range(20)])
+        await database.server_exp.insert_one({"server_id": "2", "user_id": "0", "total": 100})
+        pages = []
+        skip = 0
+        while True:
+            page = await database.server_exp.find({"server_id": "1"}, {"_id": 0, "user_id": 1, "total": 1},
+                sort=[("total", DESCENDING), ("user_id", ASCENDING)], skip=skip, limit=6)
+            pages.append(page)
+            if len(page) < 6:
+                return pages
+            skip += 6
+
+    pages = run(check)
+    assert [len(page) for page in pages] == [6, 6, 6, 2]
+    # find() hands back a list, not a cursor that would block the loop when iterated
+    assert all(isinstance(page, list) for page in pages)
+    entries = [entry for page in pages for entry in page]
+    expected = sorted(({"user_id": str(i), "total": i % 7} for i in range(20)),
+                      key=lambda entry: (-entry["total"], entry["user_id"]))
+    assert entries == expected
+
+
+def test_calls_run_on_the_executor():
+    async def check(database):
+        loop_thread = threading.get_ident()
+        seen = []
+        collection = database.users.collection
+        original = collection.find_one
+
+        def find_one(*args, **kwargs):
+            seen.append(threading.get_ident())
+            return original(*args, **kwargs)
+
+        collection.find_one = find_one
+        await database.users.find_one({"user_id": "1"})
+        return loop_thread, seen
+
+    loop_thread, seen = run(check)
+    assert len(seen) == 1 and seen[0] != loop_thread
+
+
+
+def make_cog(database):
+    cog = object.__new__(leveler.Leveler)
+    cog.db = database
+    cog.settings = {"chat_cooldown": 120}
+    cog.exp_cache = {}
+    cog.chat_blocks = {}
+    cog.pending_exp = {}
+    return cog
+
+
+def queue_exp(cog, userid, serverid, level, current_exp, exp):
+    cog.exp_cache[(userid, serverid)] = {"level": level, "current_exp": current_exp}
+    cog.chat_blocks[userid] = time.time()
+    cog.pending_exp[(userid, serverid)] = cog.pending_exp.get((userid, serverid), 0) + exp
+
+
+# applies every request but the first, then reports it as failed like an unordered bulk_write
+def fail_first(collection):
+    original = collection.bulk_write
+
+    def bulk_write(requests, **kwargs):
+        original(requests[1:], **kwargs)
+        raise BulkWriteError({"writeErrors": [{"index": 0, "code": 1, "errmsg": "forced"}]})
+
+    collection.bulk_write = bulk_write
+    return original
+
+
+def test_flush_restores_the_whole_batch_when_totals_fail():
+    async def check(database):
+        cog = make_cog(database)
+        for userid in ("1", "2", "3"):
+            await database.users.insert_one({"user_id": userid, "total_exp": 0, "servers": {}})
+            queue_exp(cog, userid, "10", 1, 5, 20)
+        original = fail_first(database.server_exp.collection)
+        with pytest.raises(BulkWriteError):
+            await cog._flush_exp()
+        # total_exp was never incremented, so every member's exp is still pending
+        assert cog.pending_exp == {(userid, "10"): 20 for userid in ("1", "2", "3")}
+        assert [user["total_exp"] for user in await database.users.find({})] == [0, 0, 0]
+
+        database.server_exp.collection.bulk_write = original
+        await cog._flush_exp()
+        assert cog.pending_exp == {}
+        users = await database.users.find({}, sort=[("user_id", ASCENDING)])
+        assert [user["total_exp"] for user in users] == [20, 20, 20]
+        assert [user["servers"]["10"] for user in users] == [{"level": 1, "current_exp": 5}] * 3
+        totals = await database.server_exp.find({"server_id": "10"})
+        assert [entry["total"] for entry in totals] == [70, 70, 70]
+
+    run(check)
+
+
+def test_flush_restores_only_failed_user_writes():
+    async def check(database):
+        cog = make_cog(database)
+        for userid in ("1", "2"):
+            await database.users.insert_one({"user_id": userid, "total_exp": 0, "servers": {}})
+            queue_exp(cog, userid, "10", 0, 15, 15)
+        fail_first(database.users.collection)
+        with pytest.raises(BulkWriteError):
+            await cog._flush_exp()
+        assert cog.pending_exp == {("1", "10"): 15}
+        assert (await database.users.find_one({"user_id": "2"}))["total_exp"] == 15
+
+    run(check)
+
+
+def test_server_and_global_rank():
+    async def check(database):
+        cog = make_cog(database)
+        server = types.SimpleNamespace(id="10")
+        other = types.SimpleNamespace(id="20")
+        for userid, total, total_exp in (("1", 300, 300), ("2", 500, 900), ("3", 300, 350), ("4", 100, 100)):
+            await database.users.insert_one({"user_id": userid, "total_exp": total_exp})
+            await database.server_exp.insert_one({"server_id": "10", "user_id": userid, "total": total})
+        await database.server_exp.insert_one({"server_id": "20", "user_id": "4", "total": 5000})
+        user = lambda userid: types.SimpleNamespace(id=userid)
+        return ([await cog._find_server_rank(user(userid), server) for userid in ("1", "2", "3", "4", "5")],
+                await cog._find_server_rank(user("4"), other),
+                [await cog._find_global_rank(user(userid), server) for userid in ("1", "2", "3", "4", "5")])
+
+    server_ranks, other_rank, global_ranks = run(check)
+    # equal totals share a rank, other servers' exp doesn't count
+    assert server_ranks == [2, 1, 2, 4, None]
+    assert other_rank == 1
+    assert global_ranks == [3, 1, 2, 4, None]
+
+
+def test_leaderboard_pages_past_departed_members():
+    async def check(database):
+        cog = make_cog(database)
+        await database.server_exp.bulk_write([
+            UpdateOne({"server_id": "10", "user_id": str(i)}, {"$set": {"total": 1000 - i}}, upsert=True)
+            for i in range(200)])
+        await database.server_exp.insert_one({"server_id": "20", "user_id": "7", "total": 10 ** 6})
+        # only every 13th user is still on the server, so the top 10 span three pages
+        members = {str(i): types.SimpleNamespace(name="member{}".format(i)) for i in range(0, 200, 13)}
+        board = await cog._leaderboard(database.server_exp, {"server_id": "10"}, "total",
+                                       members.get, lambda entry: entry["total"])
+        short = await cog._leaderboard(database.server_exp, {"server_id": "10"}, "total",
+                                       {"3": members["0"]}.get, lambda entry: entry["total"])
+        return board, short
+
+    board, short = run(check)
+    assert board == [("member{}".format(i), 1000 - i) for i in range(0, 130, 13)]
+    # fewer than 10 members stops at the last page
+    assert short == [("member0", 997)]